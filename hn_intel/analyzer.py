@@ -1,63 +1,226 @@
 """Trend analysis for HN blog posts using TF-IDF keyword extraction."""
 
-import html
-import re
-from collections import defaultdict
+from collections.abc import Mapping
+from datetime import date
 
-from sklearn.feature_extraction.text import TfidfVectorizer
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, TfidfVectorizer
 
 from hn_intel.db import get_all_posts
+from hn_intel.text import strip_html  # noqa: F401
+from hn_intel.tokens import TokenAnalyzer, fit_vectorizer, get_post_tokens, post_text, tokenize
+
+
+class KeywordModel:
+    """TF-IDF keyword model over all posts, fitted once and shared per run.
+
+    Holds the fitted vectorizer and matrix together with each row's post ID
+    and published date, so trend stages need no second pass over the posts.
+
+    Attributes:
+        vectorizer: Fitted TfidfVectorizer, or None for an empty corpus or
+            a model built from persisted counts (see hn_intel.tfidf).
+        matrix: Sparse (posts x features) TF-IDF matrix, or None when the
+            corpus is empty.
+        post_ids: Post ID of each matrix row.
+        published: Published date string of each matrix row.
+        max_features: Vocabulary cap the model was fitted with.
+        mode: hn_intel.tfidf vocabulary mode for models built from persisted
+            counts, "sharded" for out-of-core ones, None for fitted ones.
+        shards: hn_intel.shards.KeywordShards holding the rows of an
+            out-of-core model (whose matrix, post_ids and published are then
+            left empty), else None.
+    """
 
+    def __init__(self, vectorizer, matrix, post_ids, published, max_features=500,
+                 feature_names=None, mode=None, shards=None):
+        self.vectorizer = vectorizer
+        self.matrix = matrix
+        self.post_ids = post_ids
+        self.published = published
+        self.max_features = max_features
+        self._feature_names = feature_names
+        self.mode = mode
+        self.shards = shards
+        self._dates = None
+        self._period_keys = {}
+
+    @classmethod
+    def fit(cls, conn, max_features=500, jobs=1):
+        """Run TF-IDF on title + stripped description for all posts.
+
+        Posts are read from the pre-tokenized store (hn_intel.tokens), so
+        only posts not seen before are tokenized.
+
+        Args:
+            conn: sqlite3.Connection instance.
+            max_features: Maximum number of features for the vectorizer.
+            jobs: Worker processes for term counting (see
+                tokens.fit_vectorizer()); the result does not depend on it.
+
+        Returns:
+            KeywordModel; empty (vectorizer None) if there are no posts.
+        """
+        posts = get_all_posts(conn)
+        if not posts:
+            return cls(None, None, [], [], max_features)
+
+        documents = get_post_tokens(conn, posts)
+
+        # Adjust min_df when corpus is too small
+        min_df = min(3, len(documents))
+
+        vectorizer = TfidfVectorizer(
+            analyzer=TokenAnalyzer(ENGLISH_STOP_WORDS, ngram_range=(1, 2)),
+            max_features=max_features,
+            min_df=min_df,
+            max_df=0.7,
+        )
+        matrix = fit_vectorizer(vectorizer, documents, jobs=jobs)
+        return cls(
+            vectorizer, matrix,
+            [post["id"] for post in posts],
+            [post["published"] for post in posts],
+            max_features,
+        )
+
+    @property
+    def feature_names(self):
+        """Keyword for each matrix column."""
+        if self._feature_names is not None:
+            return self._feature_names
+        return self.vectorizer.get_feature_names_out()
+
+    @property
+    def dates(self):
+        """Published date of each row as datetime64[D] (NaT if unparseable), parsed once."""
+        if self._dates is None:
+            self._dates = parse_dates(self.published)
+        return self._dates
+
+    def period_keys(self, period):
+        """Return the period key of each row (one of PERIODS), memoized."""
+        if period not in self._period_keys:
+            self._period_keys[period] = period_keys(self.dates, period)
+        return self._period_keys[period]
+
+
+def extract_keywords(conn, max_features=500, jobs=1):
+    """Run TF-IDF on title + stripped description for all posts.
 
-def strip_html(text):
-    """Remove HTML tags from text.
+    Thin wrapper around KeywordModel.fit().
 
     Args:
-        text: Raw HTML string (or None).
+        conn: sqlite3.Connection instance.
+        max_features: Maximum number of features for the vectorizer.
+        jobs: Worker processes for term counting.
 
     Returns:
-        Plain text with tags removed.
+        Tuple of (fitted TfidfVectorizer, tfidf_matrix, list of post IDs).
+        Returns (None, None, []) if there are no posts.
     """
-    text = re.sub(r"<[^>]+>", " ", text or "")
-    text = html.unescape(text)
-    return text.strip()
+    model = KeywordModel.fit(conn, max_features=max_features, jobs=jobs)
+    return model.vectorizer, model.matrix, model.post_ids
 
 
-def extract_keywords(conn, max_features=500):
-    """Run TF-IDF on title + stripped description for all posts.
+# Trend granularities, finest first.
+PERIODS = ("day", "week", "month", "quarter")
+
+
+def _parse_date(text):
+    """Parse 'YYYY-M-D' leniently; None if it is not a valid date."""
+    try:
+        year, month, day = (int(part) for part in text.split("-")[:3])
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _is_iso_date(text):
+    return len(text) == 10 and text[4] == text[7] == "-"
+
+
+def parse_dates(published):
+    """Parse published strings once into a datetime64[D] array.
+
+    Only the date part (first 10 characters) is used, and it must name a
+    year, month and day ('YYYY-M-D', padded or not). Empty, partial
+    ('2024', '2024-03') and impossible ('2024-13-01', '2024-02-30')
+    dates become NaT, so no period counts them.
 
     Args:
-        conn: sqlite3.Connection instance.
-        max_features: Maximum number of features for the vectorizer.
+        published: Iterable of ISO date strings (or None).
 
     Returns:
-        Tuple of (fitted TfidfVectorizer, tfidf_matrix, list of post IDs).
-        Returns (None, None, []) if there are no posts.
+        numpy datetime64[D] array.
     """
-    posts = get_all_posts(conn)
-    if not posts:
-        return None, None, []
-
-    documents = []
-    post_ids = []
-    for post in posts:
-        text = (post["title"] or "") + " " + strip_html(post["description"])
-        documents.append(text)
-        post_ids.append(post["id"])
-
-    # Adjust min_df when corpus is too small
-    min_df = min(3, len(documents))
-
-    vectorizer = TfidfVectorizer(
-        max_features=max_features,
-        stop_words="english",
-        min_df=min_df,
-        max_df=0.7,
-        ngram_range=(1, 2),
-        token_pattern=r"(?u)\b[a-zA-Z][a-zA-Z0-9]{2,}\b",
-    )
-    tfidf_matrix = vectorizer.fit_transform(documents)
-    return vectorizer, tfidf_matrix, post_ids
+    heads = [(p or "")[:10] for p in published]
+    # NumPy would also read partial dates ('2024' as 2024-01-01), so it
+    # only parses arrays whose dates are all complete 'YYYY-MM-DD' strings.
+    if all(not h or _is_iso_date(h) for h in heads):
+        try:
+            return np.array(heads, dtype="datetime64[D]")
+        except ValueError:
+            pass
+    # Non-padded, partial or invalid dates somewhere; parse one by one.
+    return np.array([_parse_date(h) for h in heads], dtype="datetime64[D]")
+
+
+def _bucket_codes(dates, period):
+    """Map datetime64[D] values to consecutive integer bucket codes.
+
+    Codes of adjacent periods differ by one: days since the epoch, weeks
+    whose Monday is 7 * code - 3 days after it, months since January 1970
+    and quarters since 1970-Q1.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+    if period == "day":
+        return dates.astype(np.int64)
+    if period == "week":
+        # 1970-01-01 was a Thursday, so weeks start on days -3, 4, 11, ...
+        return (dates.astype(np.int64) + 3) // 7
+    months = dates.astype("datetime64[M]").astype(np.int64)
+    return months if period == "month" else months // 3
+
+
+def _bucket_labels(codes, period):
+    """Return the period key of each bucket code from _bucket_codes()."""
+    if period == "day":
+        return np.datetime_as_string(codes.astype("datetime64[D]")).tolist()
+    if period == "month":
+        return np.datetime_as_string(codes.astype("datetime64[M]")).tolist()
+    if period == "quarter":
+        return [f"{1970 + c // 4}-Q{c % 4 + 1}" for c in codes.tolist()]
+    # ISO weeks belong to the year of their Thursday.
+    thursdays = (codes * 7).astype("datetime64[D]")
+    years = thursdays.astype("datetime64[Y]")
+    weeks = (thursdays - years.astype("datetime64[D]")).astype(np.int64) // 7 + 1
+    return [f"{y}-W{w:02d}" for y, w in zip((years.astype(np.int64) + 1970).tolist(),
+                                            weeks.tolist())]
+
+
+def period_keys(dates, period):
+    """Bucket a datetime64[D] array into period keys.
+
+    Each distinct bucket is formatted once, so this is vectorized apart
+    from building the returned list.
+
+    Args:
+        dates: Array from parse_dates().
+        period: One of PERIODS.
+
+    Returns:
+        List of period keys ('2024-01-15', '2024-W03', '2024-01' or
+        '2024-Q1'), None where the date is NaT.
+    """
+    valid = ~np.isnat(dates)
+    codes, inverse = np.unique(_bucket_codes(dates[valid], period), return_inverse=True)
+    labels = np.array(_bucket_labels(codes, period) or [""], dtype=object)
+    keys = np.full(len(dates), None, dtype=object)
+    keys[valid] = labels[inverse]
+    return keys.tolist()
 
 
 def _period_key(published, period):
@@ -65,86 +228,480 @@ def _period_key(published, period):
 
     Args:
         published: ISO-format date string (e.g. '2024-01-15' or '2024-01-15T10:00:00').
-        period: 'month' or 'week'.
+        period: One of PERIODS.
 
     Returns:
         Period key string (e.g. '2024-01' for month, '2024-W03' for week).
         Returns None if the date cannot be parsed.
     """
-    if not published:
-        return None
+    return period_keys(parse_dates([published]), period)[0]
+
+
+def smoothing_weights(smoothing):
+    """Return the lag weights of a smoothing spec, newest period first.
+
+    'rolling:N' is the trailing mean of N periods and 'ewma:ALPHA' the
+    exponentially weighted mean alpha * sum((1 - alpha)^k * x[t - k]),
+    truncated once weights fall below 1e-6.
+
+    Raises:
+        ValueError: If the spec is not of either form.
+    """
+    method, _, arg = smoothing.partition(":")
     try:
-        # Handle ISO format dates: take just the date part
-        date_str = published[:10]
-        parts = date_str.split("-")
-        year, month, day = int(parts[0]), int(parts[1]), int(parts[2])
-
-        if period == "week":
-            from datetime import date
-
-            d = date(year, month, day)
-            iso_year, iso_week, _ = d.isocalendar()
-            return f"{iso_year}-W{iso_week:02d}"
-        else:
-            return f"{year}-{month:02d}"
-    except (ValueError, IndexError):
-        return None
+        value = float(arg)
+    except ValueError:
+        value = None
+    if method == "rolling" and value is not None and value >= 1 and value == int(value):
+        return np.full(int(value), 1.0 / value)
+    if method == "ewma" and value is not None and 0 < value <= 1:
+        lags = 1 if value == 1 else int(np.ceil(np.log(1e-6) / np.log(1 - value)))
+        return value * (1 - value) ** np.arange(lags)
+    raise ValueError(f"smoothing must be 'rolling:N' or 'ewma:ALPHA', not {smoothing!r}")
+
+
+def _smoothing_kernel(n, smoothing):
+    """Return the (n x n) lower-banded matrix that applies a smoothing.
+
+    Periods before the first count as zero.
+    """
+    weights = smoothing_weights(smoothing)[:n]
+    return sp.diags(
+        [np.full(n - lag, w) for lag, w in enumerate(weights)],
+        [-lag for lag in range(len(weights))],
+        shape=(n, n), format="csr",
+    )
+
+
+def _sum_by_day(matrix, dates):
+    """Sum matrix rows and count rows per day, skipping NaT dates.
+
+    Returns:
+        Tuple of (sorted day numbers, CSR day totals, float post counts).
+    """
+    rows = np.flatnonzero(~np.isnat(dates))
+    days, day_of_row = np.unique(dates[rows].astype(np.int64), return_inverse=True)
+    by_day = sp.csr_matrix(
+        (np.ones(len(rows)), (day_of_row, rows)), shape=(len(days), matrix.shape[0])
+    )
+    return (days, by_day @ sp.csr_matrix(matrix),
+            np.bincount(day_of_row, minlength=len(days)).astype(np.float64))
+
+
+def _day_totals(model):
+    """Per-day TF-IDF totals and post counts of a model, shard by shard if sharded."""
+    if model.shards is None:
+        return _sum_by_day(model.matrix, model.dates)
+    parts = [_sum_by_day(matrix, parse_dates(published)) for matrix, _, published in model.shards]
+    if not parts:
+        return np.empty(0, dtype=np.int64), None, None
+    days, inverse = np.unique(np.concatenate([part[0] for part in parts]), return_inverse=True)
+    merge = sp.csr_matrix(
+        (np.ones(len(inverse)), (inverse, np.arange(len(inverse)))),
+        shape=(len(days), len(inverse)),
+    )
+    return (days, merge @ sp.vstack([part[1] for part in parts], format="csr"),
+            merge @ np.concatenate([part[2] for part in parts]))
+
+
+def compute_trend_series(model, periods=("month",), smoothings=(None,)):
+    """Compute trends for several granularities and smoothings in one pass.
+
+    Posts are summed per day once, using the model's pre-parsed dates (or
+    one shard at a time for out-of-core models);
+    every granularity is then a roll-up of those day totals, and every
+    smoothing a banded matrix product over a gap-free range of periods
+    (periods without posts count as zero).
+
+    Args:
+        model: KeywordModel.
+        periods: Granularities from PERIODS.
+        smoothings: None for the plain per-period average, or
+            'rolling:N' / 'ewma:ALPHA'.
+
+    Returns:
+        Dict mapping (period, smoothing) to a TrendCube.
+    """
+    for period in periods:
+        if period not in PERIODS:
+            raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+    for smoothing in smoothings:
+        if smoothing is not None:
+            smoothing_weights(smoothing)
+    results = {(p, s): TrendCube.empty() for p in periods for s in smoothings}
+    if model.matrix is None and model.shards is None:
+        return results
+    days, day_totals, day_counts = _day_totals(model)
+    if not len(days):
+        return results
+
+    for period in periods:
+        codes = _bucket_codes(days.astype("datetime64[D]"), period)
+        first = codes.min()
+        n = codes.max() - first + 1
+        roll_up = sp.csr_matrix(
+            (np.ones(len(days)), (codes - first, np.arange(len(days)))), shape=(n, len(days))
+        )
+        counts = roll_up @ day_counts
+        inverse = np.divide(1.0, counts, out=np.zeros_like(counts), where=counts > 0)
+        averages = sp.diags(inverse) @ (roll_up @ day_totals)
+        labels = _bucket_labels(np.arange(first, first + n), period)
+        for smoothing in smoothings:
+            series = averages if smoothing is None else _smoothing_kernel(n, smoothing) @ averages
+            results[(period, smoothing)] = TrendCube(series, labels, model.feature_names)
+    return results
 
 
-def compute_trends(conn, period="month"):
+class TrendCube(Mapping):
+    """Period x keyword trend scores stored as one sparse matrix.
+
+    Behaves like the {period_key: {keyword: score}} dict compute_trends
+    used to return (periods iterate in sorted order, each period maps to
+    its positive scores in column order, and it compares equal to such a
+    dict) while holding the scores as a CSR matrix with period and keyword
+    index arrays. A period's scores are a CSR row slice and a keyword's
+    series a CSC column slice, so both cost O(nnz) of the slice.
+
+    Attributes:
+        matrix: CSR (periods x keywords) matrix of positive scores.
+        periods: Sorted array of period keys, one per matrix row; periods
+            without any positive score are dropped.
+        keywords: Array of keywords, one per matrix column.
+    """
+
+    def __init__(self, matrix, periods, keywords):
+        matrix = sp.csr_matrix(matrix, dtype=np.float64)
+        matrix.data[matrix.data < 0] = 0
+        matrix.eliminate_zeros()
+        matrix.sort_indices()
+        periods = np.asarray(periods, dtype=str)
+        keep = np.diff(matrix.indptr) > 0
+        order = np.argsort(periods[keep], kind="stable")
+        self.matrix = matrix[np.flatnonzero(keep)[order]]
+        self.periods = periods[keep][order]
+        self.keywords = np.asarray(keywords, dtype=object)
+        self._rows = {period: i for i, period in enumerate(self.periods.tolist())}
+        self._columns = None
+        self._csc = None
+
+    @classmethod
+    def empty(cls):
+        """Return a cube with no periods and no keywords."""
+        return cls(sp.csr_matrix((0, 0)), [], [])
+
+    @classmethod
+    def from_trends(cls, trends):
+        """Return trends as a TrendCube, converting a dict if needed."""
+        if isinstance(trends, cls):
+            return trends
+        matrix, periods, keywords = trend_matrix(trends)
+        return cls(matrix, periods, keywords)
+
+    def __getitem__(self, period):
+        row = self._rows[period]
+        start, end = self.matrix.indptr[row], self.matrix.indptr[row + 1]
+        return dict(zip(
+            self.keywords[self.matrix.indices[start:end]].tolist(),
+            self.matrix.data[start:end].tolist(),
+        ))
+
+    def __iter__(self):
+        return iter(self.periods.tolist())
+
+    def __len__(self):
+        return len(self.periods)
+
+    def __contains__(self, period):
+        return period in self._rows
+
+    def __repr__(self):
+        return (f"TrendCube({len(self.periods)} periods x {len(self.keywords)} keywords, "
+                f"{self.matrix.nnz} scores)")
+
+    def keyword_series(self, keyword):
+        """Return {period: score} for one keyword, in period order."""
+        if self._columns is None:
+            self._columns = {kw: i for i, kw in enumerate(self.keywords.tolist())}
+            self._csc = self.matrix.tocsc()
+        col = self._columns.get(keyword)
+        if col is None:
+            return {}
+        start, end = self._csc.indptr[col], self._csc.indptr[col + 1]
+        rows = self._csc.indices[start:end]
+        order = np.argsort(rows)
+        return dict(zip(
+            self.periods[rows[order]].tolist(), self._csc.data[start:end][order].tolist()
+        ))
+
+    def to_dict(self):
+        """Return the plain {period: {keyword: score}} dict."""
+        return {period: self[period] for period in self}
+
+    def replace_periods(self, other, periods):
+        """Return a cube with the given periods taken from other.
+
+        Args:
+            other: TrendCube with fresh scores.
+            periods: Period keys to drop from self before adding every
+                period of other.
+        """
+        drop = set(periods) | set(other.periods.tolist())
+        keep = np.array([p not in drop for p in self.periods.tolist()], dtype=bool)
+        index = {kw: i for i, kw in enumerate(self.keywords.tolist())}
+        remap = np.array(
+            [index.setdefault(kw, len(index)) for kw in other.keywords.tolist()], dtype=np.int64
+        )
+        width = len(index)
+        mine = self.matrix[np.flatnonzero(keep)]
+        mine = sp.csr_matrix((mine.data, mine.indices, mine.indptr), shape=(mine.shape[0], width))
+        theirs = sp.csr_matrix(
+            (other.matrix.data, remap[other.matrix.indices], other.matrix.indptr),
+            shape=(other.matrix.shape[0], width),
+        )
+        return TrendCube(
+            sp.vstack([mine, theirs], format="csr"),
+            np.concatenate([self.periods[keep], other.periods]),
+            list(index),
+        )
+
+    def save(self, path):
+        """Write the cube to a compressed .npz file."""
+        np.savez_compressed(
+            path,
+            data=self.matrix.data, indices=self.matrix.indices, indptr=self.matrix.indptr,
+            shape=np.array(self.matrix.shape), periods=self.periods,
+            keywords=self.keywords.astype(str),
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Read a cube written by save()."""
+        with np.load(path, allow_pickle=False) as f:
+            matrix = sp.csr_matrix(
+                (f["data"], f["indices"], f["indptr"]), shape=tuple(f["shape"])
+            )
+            return cls(matrix, f["periods"], f["keywords"].astype(object))
+
+    def to_json(self, precision=6):
+        """Return a compact JSON-ready dict in CSR layout.
+
+        The dict is marked with "format": "csr". Row i of the matrix is
+        periods[i]; its scores are scores[indptr[i]:indptr[i + 1]] for
+        keywords[indices[...]].
+        """
+        return {
+            "format": "csr",
+            "periods": self.periods.tolist(),
+            "keywords": self.keywords.tolist(),
+            "indptr": self.matrix.indptr.tolist(),
+            "indices": self.matrix.indices.tolist(),
+            "scores": np.round(self.matrix.data, precision).tolist(),
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        """Rebuild a cube from to_json() output or a nested {period: {keyword: score}} dict.
+
+        Args:
+            data: Dict with a "periods" key, as in trends.json.
+        """
+        if data.get("format") != "csr":
+            return cls.from_trends(data["periods"])
+        matrix = sp.csr_matrix(
+            (data["scores"], data["indices"], data["indptr"]),
+            shape=(len(data["periods"]), len(data["keywords"])),
+        )
+        return cls(matrix, data["periods"], data["keywords"])
+
+
+def compute_trends(conn=None, period="month", model=None, max_features=500, smoothing=None):
     """Bucket posts by period, sum TF-IDF per keyword per period, normalize by post count.
 
     Args:
-        conn: sqlite3.Connection instance.
-        period: 'month' or 'week'.
+        conn: sqlite3.Connection instance; only used to fit a model when
+            model is None.
+        period: One of PERIODS.
+        model: Fitted KeywordModel to reuse.
+        max_features: TF-IDF vocabulary size when fitting a new model.
+        smoothing: Optional 'rolling:N' or 'ewma:ALPHA' (see
+            compute_trend_series()).
 
     Returns:
-        Dict of {period_key: {keyword: normalized_score}}.
-        Empty dict if no posts or keywords found.
+        TrendCube, usable as {period_key: {keyword: normalized_score}}.
+        Empty if no posts or keywords found.
     """
-    vectorizer, tfidf_matrix, post_ids = extract_keywords(conn)
-    if vectorizer is None:
-        return {}
+    if model is None:
+        model = KeywordModel.fit(conn, max_features=max_features)
+    if model.shards is not None:
+        return compute_trend_series(model, (period,), (smoothing,))[(period, smoothing)]
+    if model.matrix is None:
+        return TrendCube.empty()
+    if smoothing is not None:
+        return compute_trend_series(model, (period,), (smoothing,))[(period, smoothing)]
+    return aggregate_trends(model.matrix, model.feature_names, model.period_keys(period))
 
-    posts = get_all_posts(conn)
-    id_to_post = {post["id"]: post for post in posts}
-    feature_names = vectorizer.get_feature_names_out()
-
-    # Group post indices by period
-    period_indices = defaultdict(list)
-    for idx, post_id in enumerate(post_ids):
-        post = id_to_post.get(post_id)
-        if post is None:
-            continue
-        key = _period_key(post["published"], period)
-        if key:
-            period_indices[key].append(idx)
-
-    trends = {}
-    for key, indices in sorted(period_indices.items()):
-        post_count = len(indices)
-        if post_count == 0:
-            continue
 
-        # Sum TF-IDF scores across posts in this period
-        period_scores = {}
-        for feat_idx, keyword in enumerate(feature_names):
-            total = sum(tfidf_matrix[i, feat_idx] for i in indices)
-            normalized = total / post_count
-            if normalized > 0:
-                period_scores[keyword] = float(normalized)
+def aggregate_trends(tfidf_matrix, feature_names, period_keys):
+    """Average TF-IDF rows per period with one sparse matrix product.
+
+    Builds a (periods x posts) indicator matrix and multiplies it with the
+    (posts x features) TF-IDF matrix, so every period/keyword total is
+    computed at once instead of by scalar sparse indexing.
+
+    Args:
+        tfidf_matrix: Sparse (posts x features) TF-IDF matrix.
+        feature_names: Keyword for each column.
+        period_keys: Period key for each row, or None to leave it out.
+
+    Returns:
+        TrendCube with periods in sorted order, keywords in column order,
+        and only positive scores.
+    """
+    keys = sorted({key for key in period_keys if key})
+    if not keys:
+        return TrendCube.empty()
+    slot = {key: i for i, key in enumerate(keys)}
+    cols = np.array([i for i, key in enumerate(period_keys) if key], dtype=np.int64)
+    rows = np.array([slot[key] for key in period_keys if key], dtype=np.int64)
+    indicator = sp.csr_matrix(
+        (np.ones(len(rows)), (rows, cols)), shape=(len(keys), tfidf_matrix.shape[0])
+    )
+    counts = np.bincount(rows, minlength=len(keys))
+    averages = sp.diags(1.0 / counts) @ (indicator @ sp.csr_matrix(tfidf_matrix))
+    return TrendCube(averages, keys, feature_names)
+
+
+def update_trends(trends, model, period, dates):
+    """Recompute only the trend periods touched by changed posts.
+
+    Exact when the model's columns and IDF weights did not change since
+    trends was computed, i.e. for hn_intel.tfidf models in "fixed" mode.
+
+    Args:
+        trends: TrendCube (or dict) from compute_trends for the same period
+            type.
+        model: KeywordModel reflecting the changed posts.
+        period: One of PERIODS.
+        dates: Published dates of added, changed and removed posts.
+
+    Returns:
+        New TrendCube with the affected periods replaced.
+    """
+    trends = TrendCube.from_trends(trends)
+    changed = {_period_key(d, period) for d in dates} - {None}
+    if not changed:
+        return trends
+    if model.matrix is None:
+        return trends.replace_periods(TrendCube.empty(), changed)
+    keys = [key if key in changed else None for key in model.period_keys(period)]
+    fresh = aggregate_trends(model.matrix, model.feature_names, keys)
+    return trends.replace_periods(fresh, changed)
+
 
-        if period_scores:
-            trends[key] = period_scores
+def trend_matrix(trends):
+    """Lay trends out as a sparse (periods x keywords) matrix.
 
-    return trends
+    Args:
+        trends: TrendCube, or dict {period_key: {keyword: score}}.
+
+    Returns:
+        Tuple of (CSR matrix, sorted period keys, keyword array). For a
+        dict, keywords are in order of first appearance.
+    """
+    if isinstance(trends, TrendCube):
+        return trends.matrix, trends.periods.tolist(), trends.keywords
+    periods = sorted(trends)
+    columns = {}
+    rows, cols, data = [], [], []
+    for row, period in enumerate(periods):
+        scores = trends[period]
+        rows.extend([row] * len(scores))
+        cols.extend(columns.setdefault(keyword, len(columns)) for keyword in scores)
+        data.extend(scores.values())
+    matrix = sp.csr_matrix(
+        (np.array(data, dtype=np.float64), (rows, cols)), shape=(len(periods), len(columns))
+    )
+    return matrix, periods, np.array(list(columns), dtype=object)
+
+
+def emerging_topics_from_matrix(matrix, keywords, windows=(3,), thresholds=(2.0,), limit=None):
+    """Detect emerging keywords for several windows and thresholds at once.
+
+    For each window, the mean score of the last window periods is compared
+    with the mean over all earlier periods, exactly as
+    detect_emerging_topics() does, but as column sums over the whole
+    matrix: one sum over the periods before the largest window plus a
+    cumulative sum over the rest serves every window.
+
+    Args:
+        matrix: (periods x keywords) dense array or sparse matrix of trend
+            scores, rows in period order.
+        keywords: Keyword of each column.
+        windows: Numbers of recent periods to compare against history.
+        thresholds: Minimum acceleration (exclusive) to report.
+        limit: Keep only this many top keywords per list; None keeps all.
+            Building the result dicts dominates the run time when many
+            keywords qualify.
+
+    Returns:
+        Dict mapping (window, threshold) to a list of dicts {keyword,
+        recent_score, historical_avg, acceleration}, sorted by acceleration
+        descending (ties in column order). Windows that leave no history
+        map to empty lists.
+    """
+    matrix = sp.csr_matrix(matrix)
+    keywords = np.asarray(keywords, dtype=object)
+    n_periods = matrix.shape[0]
+    usable = [w for w in windows if 0 < w < n_periods]
+    results = {(w, t): [] for w in windows for t in thresholds}
+    if not usable:
+        return results
+
+    # Sums are built from zero upwards (never total minus recent), so a
+    # keyword absent from a span gets an exact 0.0, not a rounding residue.
+    span = max(usable)
+    split = matrix.indptr[n_periods - span]
+    head = np.bincount(matrix.indices[:split], weights=matrix.data[:split],
+                       minlength=matrix.shape[1])
+    tail = matrix[n_periods - span:].toarray()
+
+    for window in usable:
+        recent = tail[span - window:].sum(axis=0) / window
+        historical = (head + tail[:span - window].sum(axis=0)) / (n_periods - window)
+        valid = (recent > 0) & (historical > 0)
+        acceleration = np.zeros_like(recent)
+        acceleration[valid] = recent[valid] / historical[valid]
+        for threshold in thresholds:
+            hits = np.flatnonzero(valid & (acceleration > threshold))
+            rounded = np.round(acceleration[hits], 2)
+            if limit is not None and len(hits) > limit:
+                # Drop everything below the limit-th score before sorting.
+                keep = rounded >= -np.partition(-rounded, limit - 1)[limit - 1]
+                hits, rounded = hits[keep], rounded[keep]
+            hits = hits[np.argsort(-rounded, kind="stable")[:limit]]
+            results[(window, threshold)] = [
+                {
+                    "keyword": keyword,
+                    "recent_score": recent_score,
+                    "historical_avg": historical_avg,
+                    "acceleration": accel,
+                }
+                for keyword, recent_score, historical_avg, accel in zip(
+                    keywords[hits].tolist(),
+                    np.round(recent[hits], 6).tolist(),
+                    np.round(historical[hits], 6).tolist(),
+                    np.round(acceleration[hits], 2).tolist(),
+                )
+            ]
+    return results
 
 
 def detect_emerging_topics(trends, window=3):
     """Compare recent period to historical average, flag acceleration > 2.0x.
 
     Args:
-        trends: Dict from compute_trends: {period_key: {keyword: score}}.
+        trends: TrendCube from compute_trends, or a dict
+            {period_key: {keyword: score}}.
         window: Number of recent periods to compare against history.
 
     Returns:
@@ -154,41 +711,205 @@ def detect_emerging_topics(trends, window=3):
     """
     if not trends:
         return []
+    matrix, _, keywords = trend_matrix(trends)
+    return emerging_topics_from_matrix(matrix, keywords, windows=(window,))[(window, 2.0)]
 
-    sorted_periods = sorted(trends.keys())
-    if len(sorted_periods) < window + 1:
-        return []
 
-    recent_periods = sorted_periods[-window:]
-    historical_periods = sorted_periods[:-window]
-
-    # Gather all keywords
-    all_keywords = set()
-    for scores in trends.values():
-        all_keywords.update(scores.keys())
-
-    emerging = []
-    for keyword in all_keywords:
-        recent_scores = [trends[p].get(keyword, 0.0) for p in recent_periods]
-        recent_avg = sum(recent_scores) / len(recent_scores)
-
-        historical_scores = [trends[p].get(keyword, 0.0) for p in historical_periods]
-        historical_avg = sum(historical_scores) / len(historical_scores)
-
-        if historical_avg > 0 and recent_avg > 0:
-            acceleration = recent_avg / historical_avg
-            if acceleration > 2.0:
-                emerging.append(
-                    {
-                        "keyword": keyword,
-                        "recent_score": round(recent_avg, 6),
-                        "historical_avg": round(historical_avg, 6),
-                        "acceleration": round(acceleration, 2),
-                    }
-                )
+def _model_chunks(model):
+    """Yield (matrix, post IDs, published) for a model, one shard at a time if sharded."""
+    if model.shards is not None:
+        yield from model.shards
+    elif model.matrix is not None:
+        yield model.matrix, model.post_ids, model.published
+
+
+def compute_segment_trends(model, period, post_blogs, segments):
+    """Compute trends for many segments of the corpus in one pass.
+
+    A segment is a set of blogs, e.g. a cluster from cluster_blogs() or a
+    single blog; segments may overlap. One (segment x period) x posts
+    indicator matrix is multiplied with the TF-IDF matrix (per shard for
+    out-of-core models), so every segment's trends come out of a single
+    sparse product instead of one compute_trends() call per segment.
+
+    Args:
+        model: KeywordModel.
+        period: One of PERIODS.
+        post_blogs: Dict mapping post ID to blog name (db.get_post_blogs()).
+        segments: Dict mapping segment name to an iterable of blog names.
+
+    Returns:
+        Dict mapping each segment name to a TrendCube, equal to
+        compute_trends() over just that segment's posts.
+    """
+    names = list(segments)
+    blog_code = {}
+    member_rows, member_cols = [], []
+    for index, name in enumerate(names):
+        for blog in set(segments[name]):
+            member_rows.append(blog_code.setdefault(blog, len(blog_code)))
+            member_cols.append(index)
+    # Blogs x segments membership; the extra last row stands for any other blog.
+    membership = sp.csr_matrix(
+        (np.ones(len(member_rows)), (member_rows, member_cols)),
+        shape=(len(blog_code) + 1, len(names)),
+    )
+
+    parts = []
+    for matrix, post_ids, published in _model_chunks(model):
+        keys = np.array(period_keys(parse_dates(published), period), dtype=object)
+        rows = np.flatnonzero([key is not None for key in keys])
+        blogs = np.array([blog_code.get(post_blogs.get(post_ids[row]), len(blog_code))
+                          for row in rows.tolist()], dtype=np.int64)
+        pairs = membership[blogs].tocoo()
+        if not pairs.nnz:
+            continue
+        local_keys, key_of_row = np.unique(keys[rows], return_inverse=True)
+        slots = pairs.col.astype(np.int64) * len(local_keys) + key_of_row[pairs.row]
+        indicator = sp.csr_matrix(
+            (np.ones(len(slots)), (slots, rows[pairs.row])),
+            shape=(len(names) * len(local_keys), matrix.shape[0]),
+        )
+        counts = np.bincount(slots, minlength=indicator.shape[0]).astype(np.float64)
+        parts.append((local_keys.tolist(), indicator @ sp.csr_matrix(matrix), counts))
+
+    cubes = {name: TrendCube.empty() for name in names}
+    if not parts:
+        return cubes
+    if len(parts) == 1:
+        keys, totals, counts = parts[0]
+    else:
+        keys = sorted({key for part in parts for key in part[0]})
+        slot = {key: i for i, key in enumerate(keys)}
+        targets = np.concatenate([
+            (np.arange(len(names))[:, None] * len(keys)
+             + np.array([slot[key] for key in part[0]])[None, :]).ravel()
+            for part in parts
+        ])
+        merge = sp.csr_matrix(
+            (np.ones(len(targets)), (targets, np.arange(len(targets)))),
+            shape=(len(names) * len(keys), len(targets)),
+        )
+        totals = merge @ sp.vstack([part[1] for part in parts], format="csr")
+        counts = merge @ np.concatenate([part[2] for part in parts])
+
+    inverse = np.divide(1.0, counts, out=np.zeros_like(counts), where=counts > 0)
+    averages = sp.diags(inverse) @ totals
+    for index, name in enumerate(names):
+        block = averages[index * len(keys):(index + 1) * len(keys)]
+        cubes[name] = TrendCube(block, keys, model.feature_names)
+    return cubes
+
+
+def segment_emerging_topics(segment_trends, window=3, threshold=2.0, limit=None):
+    """Run emerging-topic detection on every segment's trends.
+
+    Args:
+        segment_trends: Dict from compute_segment_trends().
+        window, threshold, limit: As for emerging_topics_from_matrix().
+
+    Returns:
+        Dict mapping segment name to its list of emerging topic dicts.
+    """
+    results = {}
+    for name, trends in segment_trends.items():
+        if not trends:
+            results[name] = []
+            continue
+        matrix, _, keywords = trend_matrix(trends)
+        results[name] = emerging_topics_from_matrix(
+            matrix, keywords, (window,), (threshold,), limit
+        )[(window, threshold)]
+    return results
+
 
-    emerging.sort(key=lambda x: x["acceleration"], reverse=True)
-    return emerging
+def find_leading_blogs_batch(conn, keywords):
+    """Find the leading blogs of many keywords in one pass over the corpus.
+
+    A post mentions a keyword when the keyword is one of its terms under
+    the keyword model's analyzer (the same tokens, stop words and n-grams
+    as the TF-IDF columns), case-insensitively. Posts are read through the
+    stored token lists, and one pass over their terms builds a keyword x
+    post inverted index, so the cost does not grow with the number of
+    keywords. Keywords with no terms of their own (stop words, or shorter
+    than three characters like "ai") fall back to a case-insensitive
+    substring match on the post text. Mentions are tallied per blog with
+    NumPy.
+
+    Args:
+        conn: sqlite3.Connection instance.
+        keywords: Iterable of keyword strings.
+
+    Returns:
+        Dict mapping each keyword to a list of dicts {blog_name,
+        first_mention, mention_count}, sorted by first_mention ascending
+        (blogs without dated mentions last).
+    """
+    keywords = list(dict.fromkeys(keywords))
+    if not keywords:
+        return {}
+    # Keywords normalized to analyzer terms; several may share one term.
+    terms = [" ".join(t for t in tokenize(kw) if t not in ENGLISH_STOP_WORDS)
+             for kw in keywords]
+    term_ids = {term: i for i, term in enumerate(dict.fromkeys(t for t in terms if t))}
+    needles = list(dict.fromkeys(kw.lower() for kw, term in zip(keywords, terms)
+                                 if not term and kw.strip()))
+    if not term_ids and not needles:
+        return {kw: [] for kw in keywords}
+    posts = get_all_posts(conn)
+
+    # Inverted index: (term, post) pairs, each post's terms counted once
+    hit_terms, hit_posts = [], []
+    if term_ids:
+        max_n = max(term.count(" ") + 1 for term in term_ids)
+        analyzer = TokenAnalyzer(ENGLISH_STOP_WORDS, ngram_range=(1, max_n))
+        for i, tokens in enumerate(get_post_tokens(conn, posts)):
+            found = {term_ids[t] for t in analyzer(tokens) if t in term_ids}
+            hit_terms.extend(found)
+            hit_posts.extend([i] * len(found))
+    # Keywords the analyzer drops get rows after the terms
+    if needles:
+        texts = [post_text(p).lower() for p in posts]
+        for needle in needles:
+            term_ids[needle] = len(term_ids)
+            found = [i for i, text in enumerate(texts) if needle in text]
+            hit_terms.extend([term_ids[needle]] * len(found))
+            hit_posts.extend(found)
+    hit_terms = np.array(hit_terms, dtype=np.int64)
+    hit_posts = np.array(hit_posts, dtype=np.int64)
+
+    blog_names, blog_of_post = np.unique(
+        np.array([p["blog_name"] for p in posts], dtype=object), return_inverse=True
+    )
+    # Rank published dates so the earliest mention is a minimum over ints;
+    # undated posts get a rank past every real date.
+    dates = sorted({p["published"] for p in posts if p["published"]})
+    rank_of = {d: i for i, d in enumerate(dates)}
+    date_rank = np.array([rank_of.get(p["published"] or "", len(dates)) for p in posts],
+                         dtype=np.int64)
+
+    shape = (len(term_ids), len(blog_names))
+    cells = hit_terms * shape[1] + blog_of_post[hit_posts]
+    counts = np.bincount(cells, minlength=shape[0] * shape[1]).reshape(shape)
+    first = np.full(shape[0] * shape[1], len(dates), dtype=np.int64)
+    np.minimum.at(first, cells, date_rank[hit_posts])
+    first = first.reshape(shape)
+
+    by_term = []
+    for t in range(shape[0]):
+        leading = [
+            {
+                "blog_name": blog_names[b],
+                "first_mention": dates[first[t, b]] if first[t, b] < len(dates) else "",
+                "mention_count": int(counts[t, b]),
+            }
+            for b in np.flatnonzero(counts[t])
+        ]
+        leading.sort(key=lambda x: x["first_mention"] or "9999")
+        by_term.append(leading)
+    rows = [term_ids.get(term or kw.lower()) for kw, term in zip(keywords, terms)]
+    return {kw: [] if row is None else [dict(b) for b in by_term[row]]
+            for kw, row in zip(keywords, rows)}
 
 
 def find_leading_blogs(conn, keyword):
@@ -202,28 +923,4 @@ def find_leading_blogs(conn, keyword):
         List of dicts: {blog_name, first_mention, mention_count},
         sorted by first_mention ascending.
     """
-    posts = get_all_posts(conn)
-    keyword_lower = keyword.lower()
-
-    blog_stats = defaultdict(lambda: {"count": 0, "first": None})
-
-    for post in posts:
-        text = ((post["title"] or "") + " " + strip_html(post["description"])).lower()
-        if keyword_lower in text:
-            blog_name = post["blog_name"]
-            blog_stats[blog_name]["count"] += 1
-            published = post["published"] or ""
-            current_first = blog_stats[blog_name]["first"]
-            if published and (current_first is None or published < current_first):
-                blog_stats[blog_name]["first"] = published
-
-    results = [
-        {
-            "blog_name": name,
-            "first_mention": stats["first"] or "",
-            "mention_count": stats["count"],
-        }
-        for name, stats in blog_stats.items()
-    ]
-    results.sort(key=lambda x: x["first_mention"] or "9999")
-    return results
+    return find_leading_blogs_batch(conn, [keyword])[keyword]
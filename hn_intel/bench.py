@@ -0,0 +1,436 @@
+"""Micro-benchmarks for storage and analysis throughput."""
+
+import html
+import os
+import re
+import tempfile
+import time
+
+from hn_intel.db import (
+    PROFILES,
+    READONLY_PROFILES,
+    MemoryCopy,
+    compress_posts,
+    database_size,
+    get_all_posts,
+    get_connection,
+    init_db,
+    insert_post,
+    upsert_blogs,
+)
+
+_BENCH_BLOG = {
+    "name": "Bench Blog",
+    "feed_url": "https://bench.example/feed",
+    "site_url": "https://bench.example",
+}
+
+
+def _synthetic_entry(i):
+    """Build a deterministic fake post roughly the size of a real feed entry."""
+    body = " ".join(f"word{(i * 7 + j) % 997}" for j in range(120))
+    return {
+        "title": f"Synthetic post {i}",
+        "description": f"<p>{body}</p>",
+        "url": f"https://bench.example/posts/{i}",
+        "published": f"2024-{(i % 12) + 1:02d}-{(i % 28) + 1:02d}",
+        "author": "bench",
+    }
+
+
+def _seed(conn, rows, blogs=1):
+    """Insert rows synthetic posts one at a time, as the fetcher does.
+
+    With blogs > 1 the posts are spread round-robin over that many blogs.
+    """
+    init_db(conn)
+    if blogs == 1:
+        upsert_blogs(conn, [_BENCH_BLOG])
+    else:
+        upsert_blogs(conn, [
+            {"name": f"Bench Blog {n}", "feed_url": f"https://bench{n}.example/feed",
+             "site_url": f"https://bench{n}.example"}
+            for n in range(blogs)
+        ])
+    blog_ids = [row["id"] for row in conn.execute("SELECT id FROM blogs ORDER BY id")]
+    for i in range(rows):
+        insert_post(conn, blog_ids[i % len(blog_ids)], _synthetic_entry(i))
+
+
+def _best_of(fn, repeat, setup=None):
+    """Return the fastest wall-clock time of repeat calls to fn.
+
+    With setup, each call is fn(setup()), and setup() is not timed.
+    """
+    best = None
+    for _ in range(repeat):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_profiles(profiles=None, rows=2000, repeat=3, workdir=None):
+    """Measure insert and full-scan throughput under each connection profile.
+
+    Each profile gets a fresh database file. Inserts go through insert_post
+    (one commit per row, like the fetcher); scans go through get_all_posts.
+    Read-only profiles are seeded with the default profile and only scanned.
+
+    Args:
+        profiles: Iterable of profile names; defaults to every profile.
+        rows: Number of synthetic posts to insert.
+        repeat: Number of scans to run; the fastest is reported.
+        workdir: Directory for the temporary databases.
+
+    Returns:
+        List of dicts: {profile, rows, insert_rows_per_s, scan_rows_per_s}.
+        insert_rows_per_s is None for read-only profiles.
+    """
+    results = []
+    for name in profiles or sorted(PROFILES):
+        with tempfile.TemporaryDirectory(dir=workdir) as tmpdir:
+            path = os.path.join(tmpdir, "bench.db")
+            readonly = name in READONLY_PROFILES
+
+            conn = get_connection(path, profile="default" if readonly else name)
+            start = time.perf_counter()
+            _seed(conn, rows)
+            insert_s = time.perf_counter() - start
+            conn.close()
+
+            conn = get_connection(path, profile=name)
+            scan_s = _best_of(lambda: get_all_posts(conn), repeat)
+            conn.close()
+
+        results.append({
+            "profile": name,
+            "rows": rows,
+            "insert_rows_per_s": None if readonly else rows / insert_s,
+            "scan_rows_per_s": rows / scan_s if scan_s else float("inf"),
+        })
+    return results
+
+
+def bench_compression(rows=2000, repeat=3, workdir=None):
+    """Compare database size and scan throughput with and without compression.
+
+    Seeds one database, scans it, then compresses the descriptions with
+    compress_posts(), vacuums and scans again.
+
+    Args:
+        rows: Number of synthetic posts to insert.
+        repeat: Number of scans per mode; the fastest is reported.
+        workdir: Directory for the temporary database.
+
+    Returns:
+        List of two dicts {mode, rows, bytes, scan_rows_per_s, scan_mb_per_s}
+        for 'plain' and 'compressed'; scan_mb_per_s counts decoded text.
+    """
+    results = []
+    with tempfile.TemporaryDirectory(dir=workdir) as tmpdir:
+        path = os.path.join(tmpdir, "bench.db")
+        conn = get_connection(path)
+        _seed(conn, rows)
+        text_mb = sum(len(p["description"] or "") for p in get_all_posts(conn)) / 1e6
+
+        for mode in ("plain", "compressed"):
+            if mode == "compressed":
+                compress_posts(conn)
+                conn.execute("VACUUM")
+            scan_s = _best_of(lambda: get_all_posts(conn), repeat)
+            results.append({
+                "mode": mode,
+                "rows": rows,
+                "bytes": database_size(conn),
+                "scan_rows_per_s": rows / scan_s if scan_s else float("inf"),
+                "scan_mb_per_s": text_mb / scan_s if scan_s else float("inf"),
+            })
+        conn.close()
+    return results
+
+
+def _report_workload(conn, n_clusters):
+    """Run the analysis behind ``hn-intel report``, minus writing files."""
+    from hn_intel.analyzer import KeywordModel, compute_trends, detect_emerging_topics
+    from hn_intel.clusters import cluster_blogs, compute_blog_vectors, compute_similarity_matrix
+    from hn_intel.ideas import generate_ideas
+    from hn_intel.network import build_citation_graph, compute_centrality, extract_citations
+
+    extract_citations(conn, full=True)
+    model = KeywordModel.fit(conn)
+    detect_emerging_topics(compute_trends(model=model))
+    compute_centrality(build_citation_graph(conn))
+    blog_vectors, blog_names, vectorizer = compute_blog_vectors(conn)
+    cluster_blogs(blog_vectors, blog_names, vectorizer, n_clusters=n_clusters)
+    compute_similarity_matrix(blog_vectors)
+    generate_ideas(conn, model=model)
+
+
+def bench_in_memory(rows=2000, blogs=8, repeat=3, workdir=None):
+    """Compare the report analysis on the database file and on a MemoryCopy.
+
+    Args:
+        rows: Number of synthetic posts to insert.
+        blogs: Number of blogs the posts are spread over.
+        repeat: Number of runs per mode; the fastest is reported.
+        workdir: Directory for the temporary database.
+
+    Returns:
+        List of two dicts {mode, rows, load_s, run_s} for 'disk' and
+        'memory'; load_s is the time taken to copy the file into memory.
+    """
+    n_clusters = min(8, blogs)
+    with tempfile.TemporaryDirectory(dir=workdir) as tmpdir:
+        path = os.path.join(tmpdir, "bench.db")
+        conn = get_connection(path)
+        _seed(conn, rows, blogs=blogs)
+        conn.close()
+
+        conn = get_connection(path, profile="analyze")
+        disk_s = _best_of(lambda: _report_workload(conn, n_clusters), repeat)
+        conn.close()
+
+        start = time.perf_counter()
+        copy = MemoryCopy(path)
+        load_s = time.perf_counter() - start
+        memory_s = _best_of(lambda: _report_workload(copy.conn, n_clusters), repeat)
+        copy.close()
+
+    return [
+        {"mode": "disk", "rows": rows, "load_s": 0.0, "run_s": disk_s},
+        {"mode": "memory", "rows": rows, "load_s": load_s, "run_s": memory_s},
+    ]
+
+
+def _legacy_aggregate_trends(tfidf_matrix, feature_names, period_keys):
+    """The original compute_trends loop: one scalar sparse lookup per cell."""
+    period_indices = {}
+    for idx, key in enumerate(period_keys):
+        if key:
+            period_indices.setdefault(key, []).append(idx)
+    trends = {}
+    for key, indices in sorted(period_indices.items()):
+        period_scores = {}
+        for feat_idx, keyword in enumerate(feature_names):
+            total = sum(tfidf_matrix[i, feat_idx] for i in indices)
+            normalized = total / len(indices)
+            if normalized > 0:
+                period_scores[keyword] = float(normalized)
+        if period_scores:
+            trends[key] = period_scores
+    return trends
+
+
+def _synthetic_tfidf(posts, features, periods, terms_per_post, seed=0):
+    """Random L2-normalized sparse TF-IDF matrix and monthly period keys."""
+    import numpy as np
+    import scipy.sparse as sp
+    from sklearn.preprocessing import normalize
+
+    rng = np.random.default_rng(seed)
+    rows = np.repeat(np.arange(posts), terms_per_post)
+    cols = rng.integers(0, features, size=posts * terms_per_post)
+    data = rng.random(posts * terms_per_post)
+    matrix = normalize(sp.csr_matrix((data, (rows, cols)), shape=(posts, features)))
+    months = [f"{2000 + m // 12}-{m % 12 + 1:02d}" for m in range(periods)]
+    keys = [months[m] for m in rng.integers(0, periods, size=posts)]
+    feature_names = np.array([f"term{i}" for i in range(features)], dtype=object)
+    return matrix, feature_names, keys
+
+
+def bench_trends(sizes=(10_000, 100_000, 1_000_000), features=500, periods=36,
+                 terms_per_post=20, sample_posts=2000, sample_features=5):
+    """Time trend aggregation: sparse matrix product versus the original loop.
+
+    Runs on synthetic TF-IDF matrices, so large sizes need no database.
+    The original loop costs one scalar sparse lookup per (post, feature),
+    which is far too slow to run at these sizes; it is timed on a
+    sample_posts x sample_features corner and scaled linearly.
+
+    Args:
+        sizes: Numbers of posts to test.
+        features: TF-IDF vocabulary size.
+        periods: Number of monthly periods the posts fall into.
+        terms_per_post: Non-zero TF-IDF entries per post.
+        sample_posts: Posts in the sample used to time the original loop.
+        sample_features: Features in that sample.
+
+    Returns:
+        List of dicts {posts, vectorized_s, legacy_s, speedup}; legacy_s
+        is the extrapolated estimate.
+    """
+    from hn_intel.analyzer import aggregate_trends
+
+    results = []
+    for posts in sizes:
+        matrix, feature_names, keys = _synthetic_tfidf(posts, features, periods, terms_per_post)
+        vectorized_s = _best_of(lambda: aggregate_trends(matrix, feature_names, keys), 1)
+
+        n = min(sample_posts, posts)
+        k = min(sample_features, features)
+        sample_s = _best_of(
+            lambda: _legacy_aggregate_trends(matrix[:n, :k], feature_names[:k], keys[:n]), 1
+        )
+        legacy_s = sample_s * (posts / n) * (features / k)
+        results.append({
+            "posts": posts,
+            "vectorized_s": vectorized_s,
+            "legacy_s": legacy_s,
+            "speedup": legacy_s / vectorized_s if vectorized_s else float("inf"),
+        })
+    return results
+
+
+def _legacy_detect_emerging(trends, window=3):
+    """The original per-keyword detect_emerging_topics loop."""
+    sorted_periods = sorted(trends.keys())
+    if len(sorted_periods) < window + 1:
+        return []
+    recent_periods = sorted_periods[-window:]
+    historical_periods = sorted_periods[:-window]
+    all_keywords = set()
+    for scores in trends.values():
+        all_keywords.update(scores.keys())
+
+    emerging = []
+    for keyword in all_keywords:
+        recent_scores = [trends[p].get(keyword, 0.0) for p in recent_periods]
+        recent_avg = sum(recent_scores) / len(recent_scores)
+        historical_scores = [trends[p].get(keyword, 0.0) for p in historical_periods]
+        historical_avg = sum(historical_scores) / len(historical_scores)
+        if historical_avg > 0 and recent_avg > 0:
+            acceleration = recent_avg / historical_avg
+            if acceleration > 2.0:
+                emerging.append({
+                    "keyword": keyword,
+                    "recent_score": round(recent_avg, 6),
+                    "historical_avg": round(historical_avg, 6),
+                    "acceleration": round(acceleration, 2),
+                })
+    emerging.sort(key=lambda x: x["acceleration"], reverse=True)
+    return emerging
+
+
+def _synthetic_trends(keywords, periods, density, seed=0):
+    """Random sparse (periods x keywords) trend matrix and keyword names."""
+    import numpy as np
+    import scipy.sparse as sp
+
+    matrix = sp.random(periods, keywords, density=density, format="csr",
+                       random_state=np.random.default_rng(seed))
+    names = np.array([f"term{i}" for i in range(keywords)], dtype=object)
+    return matrix, names
+
+
+def bench_emerging(keywords=50_000, periods=500, density=0.05, windows=(1, 3, 6, 12),
+                   thresholds=(1.5, 2.0, 3.0), limit=None, sample_keywords=500, repeat=3):
+    """Time multi-window emerging-topic detection against the original loop.
+
+    The vectorized engine runs every window and threshold in one call on a
+    synthetic sparse trend matrix. The original loop handles one window and
+    threshold per call and is timed on sample_keywords columns, then scaled
+    to all keywords and every (window, threshold) pair.
+
+    Args:
+        keywords: Number of keyword columns.
+        periods: Number of periods.
+        density: Fraction of non-zero (period, keyword) scores.
+        windows: Windows to evaluate.
+        thresholds: Acceleration thresholds to evaluate.
+        limit: Top keywords kept per (window, threshold); None keeps all.
+        sample_keywords: Keywords in the sample used to time the original loop.
+        repeat: Timing repetitions (best-of) for the vectorized engine.
+
+    Returns:
+        Dict {keywords, periods, combinations, vectorized_s, legacy_s,
+        speedup}; legacy_s is the extrapolated estimate.
+    """
+    from hn_intel.analyzer import emerging_topics_from_matrix
+
+    matrix, names = _synthetic_trends(keywords, periods, density)
+    vectorized_s = _best_of(
+        lambda: emerging_topics_from_matrix(matrix, names, windows, thresholds, limit), repeat
+    )
+
+    k = min(sample_keywords, keywords)
+    sample = matrix[:, :k].tocoo()
+    trends = {}
+    for row, col, value in zip(sample.row, sample.col, sample.data):
+        trends.setdefault(f"p{row:04d}", {})[names[col]] = float(value)
+    sample_s = _best_of(lambda: _legacy_detect_emerging(trends, windows[0]), 1)
+    legacy_s = sample_s * (keywords / k) * len(windows) * len(thresholds)
+    return {
+        "keywords": keywords,
+        "periods": periods,
+        "combinations": len(windows) * len(thresholds),
+        "vectorized_s": vectorized_s,
+        "legacy_s": legacy_s,
+        "speedup": legacy_s / vectorized_s if vectorized_s else float("inf"),
+    }
+
+
+def _legacy_strip_html(text):
+    """The original strip_html copies: tag regex, then entity decoding."""
+    text = re.sub(r"<[^>]+>", " ", text or "")
+    text = html.unescape(text)
+    return text.strip()
+
+
+def _synthetic_html(i):
+    """Deterministic description with markup typical of feed entries."""
+    body = " ".join(f"word{(i * 7 + j) % 997}" for j in range(120))
+    return (
+        f"<div class=\"post\"><style>.post {{ margin: 0 }}</style>"
+        f"<p>{body[:400]} &amp; <a href=\"https://example.com/{i}\">link</a></p>"
+        f"<script>window.track({i}, \"<b>\");</script>"
+        f"<!-- generated --><p>{body[400:]} &mdash; <em>end</em></p></div>"
+    )
+
+
+def bench_strip_html(conn=None, rows=2000, repeat=3):
+    """Compare HTML stripping throughput with the original regex approach.
+
+    Strips every post description of conn (the real corpus), or rows
+    synthetic descriptions when conn is None, three ways: the original
+    regex, text.strip_html() with an empty memo (the first stage of a
+    command), and text.strip_html() again on fresh copies of the texts
+    (later stages, which re-read the posts and so must hash each text
+    again before it is served from the memo).
+
+    Args:
+        conn: Optional sqlite3.Connection whose descriptions are stripped.
+        rows: Number of synthetic descriptions without conn.
+        repeat: Passes per method; the fastest is reported.
+
+    Returns:
+        List of three dicts {method, posts, mb, mb_per_s} for 'regex',
+        'tokenizer' and 'memoized'; mb counts raw description text.
+    """
+    from hn_intel.text import clear_memo, strip_html
+
+    if conn is None:
+        texts = [_synthetic_html(i) for i in range(rows)]
+    else:
+        texts = [p["description"] or "" for p in get_all_posts(conn)]
+    mb = sum(len(t) for t in texts) / 1e6
+
+    def cold():
+        clear_memo()
+        for text in texts:
+            strip_html(text)
+
+    timings = [
+        ("regex", _best_of(lambda: [_legacy_strip_html(t) for t in texts], repeat)),
+        ("tokenizer", _best_of(cold, repeat)),
+        ("memoized", _best_of(lambda copies: [strip_html(t) for t in copies], repeat,
+                              setup=lambda: [t.encode().decode() for t in texts])),
+    ]
+    clear_memo()
+    return [
+        {"method": method, "posts": len(texts), "mb": mb,
+         "mb_per_s": mb / seconds if seconds else float("inf")}
+        for method, seconds in timings
+    ]
@@ -0,0 +1,135 @@
+"""Persisted cache of analysis artifacts keyed by corpus version."""
+
+import json
+import pickle
+import sqlite3
+from datetime import datetime, timezone
+
+from hn_intel.db import get_meta
+
+
+def corpus_version(conn):
+    """Return a string that changes whenever the analysed corpus changes.
+
+    Combines the highest post and blog IDs (which grow on every insert) with
+    the 'content_version' counter that triggers bump on post updates and
+    deletes and on blog renames or site changes.
+
+    Args:
+        conn: sqlite3.Connection instance.
+
+    Returns:
+        Version string such as '1234.92.0'.
+    """
+    max_post = conn.execute("SELECT COALESCE(MAX(id), 0) FROM posts").fetchone()[0]
+    max_blog = conn.execute("SELECT COALESCE(MAX(id), 0) FROM blogs").fetchone()[0]
+    content = get_meta(conn, "content_version", "0")
+    return f"{max_post}.{max_blog}.{content}"
+
+
+def _params_key(params):
+    """Serialize stage parameters to a canonical string."""
+    return json.dumps(params or {}, sort_keys=True)
+
+
+def load_artifact(conn, stage, params, version=None, allow_stale=False):
+    """Load a cached artifact if it was computed for the current corpus.
+
+    Args:
+        conn: sqlite3.Connection instance.
+        stage: Stage name, e.g. 'trends'.
+        params: Dict of stage parameters that affect the result.
+        version: Corpus version to match; computed when None.
+        allow_stale: Return the entry whatever corpus version it was
+            computed for, e.g. to warm-start an iterative computation.
+
+    Returns:
+        The cached object, or None on a miss or stale entry.
+    """
+    row = conn.execute(
+        "SELECT corpus_version, payload FROM artifacts WHERE stage = ? AND params = ?",
+        (stage, _params_key(params)),
+    ).fetchone()
+    if row is None:
+        return None
+    if not allow_stale and row["corpus_version"] != (version or corpus_version(conn)):
+        return None
+    return pickle.loads(row["payload"])
+
+
+def artifact_version(conn, stage, params):
+    """Return the corpus version a cached artifact was computed for, or None.
+
+    Args:
+        conn: sqlite3.Connection instance.
+        stage: Stage name.
+        params: Dict of stage parameters that affect the result.
+    """
+    row = conn.execute(
+        "SELECT corpus_version FROM artifacts WHERE stage = ? AND params = ?",
+        (stage, _params_key(params)),
+    ).fetchone()
+    return None if row is None else row[0]
+
+
+def store_artifact(conn, stage, params, value, version=None):
+    """Persist an artifact, replacing any older entry for the same stage/params.
+
+    Args:
+        conn: sqlite3.Connection instance.
+        stage: Stage name.
+        params: Dict of stage parameters that affect the result.
+        value: Picklable object to store.
+        version: Corpus version the value was computed from.
+    """
+    conn.execute(
+        "INSERT OR REPLACE INTO artifacts (stage, params, corpus_version, payload, created) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (
+            stage,
+            _params_key(params),
+            version or corpus_version(conn),
+            pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+            datetime.now(timezone.utc).isoformat(),
+        ),
+    )
+    conn.commit()
+
+
+def cached(conn, stage, params, compute, enabled=True):
+    """Return the cached artifact for stage/params, computing it on a miss.
+
+    Read-only connections still get cache hits; storing is skipped.
+
+    Args:
+        conn: sqlite3.Connection instance.
+        stage: Stage name.
+        params: Dict of stage parameters that affect the result.
+        compute: Zero-argument callable producing the artifact.
+        enabled: When False, always call compute and leave the cache alone.
+
+    Returns:
+        The artifact.
+    """
+    if not enabled:
+        return compute()
+    version = corpus_version(conn)
+    value = load_artifact(conn, stage, params, version)
+    if value is None:
+        value = compute()
+        try:
+            store_artifact(conn, stage, params, value, version)
+        except sqlite3.OperationalError:
+            pass  # read-only database
+    return value
+
+
+def clear_artifacts(conn):
+    """Delete every cached artifact.
+
+    Returns:
+        Number of entries removed.
+    """
+    count = conn.execute("DELETE FROM artifacts").rowcount
+    conn.commit()
+    return count
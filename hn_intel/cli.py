@@ -1,14 +1,378 @@
 """CLI entry point for HN Blog Intelligence."""
 
+import sqlite3
+
 import click
 
-from hn_intel.db import get_connection, init_db
+from hn_intel.db import (
+    DEFAULT_DB_PATH,
+    PROFILE_ENV_VAR,
+    PROFILES,
+    READONLY_PROFILES,
+    get_connection,
+    init_db,
+    is_read_only,
+    needs_migration,
+    resolve_profile,
+)
 
 
 @click.group()
-def main():
+@click.option("--profile", default=None, envvar=PROFILE_ENV_VAR, show_envvar=True,
+              type=click.Choice(sorted(PROFILES)),
+              help="SQLite connection profile (defaults to one suited to the command).")
+@click.option("--snapshot", default=None, type=click.Path(exists=True, file_okay=False),
+              help="Analyse a columnar snapshot directory instead of the database.")
+@click.option("--in-memory", is_flag=True,
+              help="Copy the database into memory first and analyse the copy.")
+@click.option("--write-back", is_flag=True,
+              help="With --in-memory, save the copy (citations, cache) back to disk.")
+@click.pass_context
+def main(ctx, profile, snapshot, in_memory, write_back):
     """HN Blog Intelligence Platform."""
-    pass
+    if snapshot and in_memory:
+        raise click.UsageError("--snapshot and --in-memory are mutually exclusive.")
+    if write_back and not in_memory:
+        raise click.UsageError("--write-back requires --in-memory.")
+    ctx.ensure_object(dict)
+    ctx.obj["profile"] = profile
+    ctx.obj["snapshot"] = snapshot
+    ctx.obj["in_memory"] = in_memory
+    ctx.obj["write_back"] = write_back
+
+
+def _connect(default_profile="default", analysis=False, writes=False):
+    """Open and initialize the database using the selected connection profile.
+
+    The --profile option (or HN_INTEL_DB_PROFILE) wins over the
+    command's own default_profile. Analysis commands (analysis=True) also
+    honour --snapshot, getting an in-memory copy of the snapshot, and
+    --in-memory, getting a db.MemoryCopy of the database; the other
+    commands refuse both, since their writes would be lost. Commands that
+    exist to write (writes=True) refuse the readonly profile; analysis
+    commands accept it and skip their writes (see db.is_read_only()).
+    Close the connection with _close().
+    """
+    obj = click.get_current_context().find_root().obj or {}
+    if (obj.get("snapshot") or obj.get("in_memory")) and not analysis:
+        raise click.UsageError("--snapshot and --in-memory only apply to analysis commands.")
+    profile = resolve_profile(obj.get("profile") or default_profile)
+    if writes and profile in READONLY_PROFILES:
+        raise click.UsageError(f"The {profile} profile cannot be used by a command that "
+                               "writes to the database.")
+    if obj.get("snapshot"):
+        from hn_intel.snapshot import open_snapshot
+
+        try:
+            return open_snapshot(obj["snapshot"])
+        except (ImportError, FileNotFoundError) as exc:
+            raise click.ClickException(str(exc))
+    if obj.get("in_memory"):
+        from hn_intel.db import MemoryCopy
+
+        try:
+            copy = MemoryCopy(DEFAULT_DB_PATH)
+        except FileNotFoundError as exc:
+            raise click.ClickException(str(exc))
+        init_db(copy.conn)
+        obj["memory_copy"] = copy
+        return copy.conn
+    if profile not in READONLY_PROFILES:
+        conn = get_connection(DEFAULT_DB_PATH, profile=profile)
+        init_db(conn)
+        return conn
+    # A read-only connection cannot create or migrate the schema
+    hint = "run a command with a writable profile (e.g. hn-intel status) first."
+    try:
+        conn = get_connection(DEFAULT_DB_PATH, profile=profile)
+    except sqlite3.OperationalError:
+        raise click.ClickException(f"Cannot open {DEFAULT_DB_PATH} read-only; {hint}")
+    if needs_migration(conn):
+        conn.close()
+        raise click.ClickException(f"{DEFAULT_DB_PATH} has an older schema; {hint}")
+    return conn
+
+
+def _close(conn):
+    """Close a connection from _connect(), saving an --in-memory copy if asked."""
+    obj = click.get_current_context().find_root().obj or {}
+    copy = obj.pop("memory_copy", None)
+    if copy is None or copy.conn is not conn:
+        conn.close()
+        return
+    try:
+        if obj.get("write_back"):
+            try:
+                copy.save()
+            except RuntimeError as exc:
+                raise click.ClickException(str(exc))
+    finally:
+        copy.close()
+
+
+def _check_smoothing(ctx, param, value):
+    """Validate --smoothing before any work starts."""
+    from hn_intel.analyzer import smoothing_weights
+
+    if value is not None:
+        try:
+            smoothing_weights(value)
+        except ValueError as exc:
+            raise click.BadParameter(str(exc))
+    return value
+
+
+def _analysis_stages(max_features, n_clusters, period, models=None, incremental=None,
+                     smoothing=None, jobs=1, shard_dir=None, chunk_size=5000, matrix_dir=None,
+                     centrality_backend="networkx", vocabulary=None):
+    """Build the read-only analysis stages shared by analyze and report.
+
+    Each stage is a (params, callable) pair. The callable takes a
+    connection, so it can run either on the command's own connection or on
+    a pooled read-only one; params are the options that affect its result
+    and key the artifact cache. Citation extraction,
+    tokens.tokenize_new_posts() and (with incremental) _prepare_incremental()
+    write and are therefore not stages; run them beforehand. When the
+    trends stage runs, it stores its analyzer.KeywordModel in
+    models["keywords"] for later reuse.
+
+    With incremental set to one of tfidf.MODES, the keyword model is built
+    from persisted term counts instead of being refitted. In "fixed" mode,
+    vocabulary is the frozen vocabulary's digest from _prepare_incremental()
+    and keys the trends, and unsmoothed trends cached for an older corpus
+    are brought up to date by _update_cached_trends(). smoothing is
+    passed on to analyzer.compute_trends(). jobs is the number of worker
+    processes used to fit TF-IDF vectorizers; it does not change results,
+    so it is not part of any stage's params. With shard_dir set, keywords
+    are extracted out of core into CSR shards there (shards.py), chunk_size
+    posts at a time. With matrix_dir set, the post x term and blog x term
+    TF-IDF matrices are opened memory-mapped from there while the corpus is
+    unchanged, and refitted and saved otherwise (matrices.py); like jobs,
+    it does not change results. centrality_backend is passed to
+    network.compute_network().
+    """
+    from hn_intel.analyzer import KeywordModel, compute_trends, detect_emerging_topics
+    from hn_intel.network import compute_network, network_params
+    from hn_intel.clusters import compute_blog_vectors, cluster_blogs, compute_similarity_matrix
+    from hn_intel.matrices import load_or_compute_blog_vectors, load_or_fit_keyword_model
+    from hn_intel.shards import extract_keyword_shards, load_sharded_model
+    from hn_intel.tfidf import load_keyword_model
+
+    if models is None:
+        models = {}
+    trends_params = {"period": period, "max_features": max_features}
+    if incremental:
+        trends_params["incremental"] = incremental
+    if vocabulary:
+        trends_params["vocabulary"] = vocabulary
+    if shard_dir:
+        trends_params["sharded"] = True
+    if smoothing:
+        trends_params["smoothing"] = smoothing
+
+    def trends_stage(conn):
+        if incremental:
+            model = load_keyword_model(conn, max_features=max_features, mode=incremental)
+        elif shard_dir:
+            extract_keyword_shards(conn, shard_dir, max_features=max_features,
+                                   chunk_size=chunk_size)
+            model = load_sharded_model(shard_dir)
+        elif matrix_dir:
+            model = load_or_fit_keyword_model(conn, matrix_dir, max_features=max_features,
+                                              jobs=jobs)
+        else:
+            model = KeywordModel.fit(conn, max_features=max_features, jobs=jobs)
+        models["keywords"] = model
+        trends = None
+        if incremental == "fixed" and not smoothing:
+            trends = _update_cached_trends(conn, trends_params, model, period)
+        if trends is None:
+            trends = compute_trends(period=period, model=model, smoothing=smoothing)
+        return trends, detect_emerging_topics(trends)
+
+    def network_stage(conn):
+        return compute_network(conn, centrality_backend)
+
+    def clusters_stage(conn):
+        if matrix_dir:
+            blog_vectors, blog_names, vectorizer = load_or_compute_blog_vectors(
+                conn, matrix_dir, max_features=max_features, jobs=jobs
+            )
+        else:
+            blog_vectors, blog_names, vectorizer = compute_blog_vectors(
+                conn, max_features=max_features, jobs=jobs
+            )
+        clusters = cluster_blogs(blog_vectors, blog_names, vectorizer, n_clusters=n_clusters)
+        sim_matrix = compute_similarity_matrix(blog_vectors)
+        return blog_vectors, blog_names, vectorizer, clusters, sim_matrix
+
+    return {
+        "trends": (trends_params, trends_stage),
+        "network": (network_params(centrality_backend), network_stage),
+        "clusters": ({"max_features": max_features, "n_clusters": n_clusters}, clusters_stage),
+    }
+
+
+def _segment_emerging(conn, stages, models, clusters, centrality, n_clusters, top_blogs,
+                      use_cache=True):
+    """Detect emerging topics per blog cluster and per top-PageRank blog.
+
+    Segment trends come from analyzer.compute_segment_trends() over the
+    trends stage's keyword model; if that stage was loaded from the cache,
+    it is rerun to rebuild the model. The result is cached under the trends
+    params plus the segment options (smoothing is not applied).
+
+    Returns:
+        List of dicts {segment, type ('cluster' or 'blog'), blogs,
+        emerging_topics}.
+    """
+    from hn_intel.analyzer import compute_segment_trends, segment_emerging_topics
+    from hn_intel.cache import cached
+    from hn_intel.db import get_post_blogs
+
+    trends_params, trends_stage = stages["trends"]
+    params = {k: v for k, v in trends_params.items() if k != "smoothing"}
+    params.update(n_clusters=n_clusters, top_blogs=top_blogs)
+
+    def compute():
+        if "keywords" not in models:
+            trends_stage(conn)
+        segments = {}
+        kinds = {}
+        for cluster in clusters:
+            name = f"cluster {cluster['cluster_id']}: {cluster['label']}"
+            segments[name], kinds[name] = cluster["blogs"], "cluster"
+        ranked = sorted(centrality.items(), key=lambda x: x[1]["pagerank"], reverse=True)
+        for blog, _ in ranked[:top_blogs]:
+            segments[blog], kinds[blog] = [blog], "blog"
+        segment_trends = compute_segment_trends(
+            models["keywords"], trends_params["period"], get_post_blogs(conn), segments
+        )
+        emerging = segment_emerging_topics(segment_trends, limit=10)
+        return [
+            {"segment": name, "type": kinds[name], "blogs": len(segments[name]),
+             "emerging_topics": emerging[name]}
+            for name in segments
+        ]
+
+    return cached(conn, "segments", params, compute, use_cache)
+
+
+def _sketch_emerging(conn, period, trends):
+    """Return accelerating terms from the --sketch term sketches.
+
+    Terms already in the trends' keyword vocabulary are left out, since the
+    regular emerging-topic detection covers them.
+    """
+    from hn_intel.sketch import load_term_sketches, sketch_emerging_topics
+
+    return sketch_emerging_topics(load_term_sketches(conn, period),
+                                  exclude=trends.keywords.tolist(), limit=20)
+
+
+def _prepare_incremental(conn, mode, max_features):
+    """Update persisted term counts (and the frozen vocabulary) for --incremental.
+
+    Returns:
+        A digest of the frozen vocabulary in "fixed" mode, else None.
+    """
+    import hashlib
+
+    from hn_intel.db import get_meta
+    from hn_intel.tfidf import freeze_vocabulary, update_term_counts
+
+    update_term_counts(conn)
+    if mode != "fixed":
+        return None
+    freeze_vocabulary(conn, max_features=max_features)
+    frozen = get_meta(conn, "keyword_vocabulary", "")
+    return hashlib.blake2b(frozen.encode(), digest_size=8).hexdigest()
+
+
+def _update_cached_trends(conn, params, model, period):
+    """Bring trends cached for an older corpus up to date with new posts.
+
+    Only valid for a "fixed" model, whose columns and IDF weights do not
+    change, and only when posts were added since: the cached trends must
+    share the current corpus version apart from its highest post ID.
+    analyzer.update_trends() then recomputes the periods of the new posts.
+
+    Returns:
+        The updated TrendCube, or None when the cached trends cannot be
+        reused.
+    """
+    from hn_intel.analyzer import update_trends
+    from hn_intel.cache import artifact_version, corpus_version, load_artifact
+    from hn_intel.db import get_posts_since
+
+    version = artifact_version(conn, "trends", params)
+    if version is None:
+        return None
+    last_post, _, rest = version.partition(".")
+    if rest != corpus_version(conn).partition(".")[2]:
+        return None
+    trends, _ = load_artifact(conn, "trends", params, allow_stale=True)
+    dates = [post["published"] for post in get_posts_since(conn, int(last_post))]
+    return update_trends(trends, model, period, dates)
+
+
+def _check_read_only(conn, incremental, sketch):
+    """Return whether conn is read-only, refusing options that need writes."""
+    if not is_read_only(conn):
+        return False
+    if incremental or sketch:
+        _close(conn)
+        raise click.UsageError("--incremental and --sketch store term counts and cannot be "
+                               "used with the readonly profile.")
+    return True
+
+
+def _run_stages(conn, stages, workers=1, use_cache=True):
+    """Run independent read-only stages, in threads when workers > 1.
+
+    Stages whose artifacts are cached for the current corpus version are
+    loaded instead of recomputed, and fresh results are stored through
+    conn unless it is read-only. With workers > 1 each remaining stage checks out its own
+    connection from a db.ReadPool pinned to one snapshot, so pending
+    writes on conn must be committed first. An in-memory conn (from
+    --snapshot or --in-memory) cannot be pooled and always runs the stages
+    serially.
+
+    Returns:
+        Dict mapping stage name to its return value.
+    """
+    from hn_intel.cache import corpus_version, load_artifact, store_artifact
+
+    version = corpus_version(conn)
+    results = {}
+    pending = {}
+    for name, (params, stage) in stages.items():
+        value = load_artifact(conn, name, params, version) if use_cache else None
+        if value is None:
+            pending[name] = stage
+        else:
+            results[name] = value
+
+    in_memory = not conn.execute("PRAGMA database_list").fetchone()[2]
+    if workers <= 1 or len(pending) <= 1 or in_memory:
+        computed = {name: stage(conn) for name, stage in pending.items()}
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+
+        from hn_intel.db import ReadPool
+
+        size = min(workers, len(pending))
+        with ReadPool(DEFAULT_DB_PATH, size=size) as pool, \
+                ThreadPoolExecutor(max_workers=size) as executor:
+            futures = {name: executor.submit(pool.run, stage) for name, stage in pending.items()}
+            computed = {name: future.result() for name, future in futures.items()}
+
+    store = use_cache and not is_read_only(conn)
+    for name, value in computed.items():
+        if store:
+            store_artifact(conn, name, stages[name][0], value, version)
+        results[name] = value
+    return results
 
 
 @main.command()
@@ -19,8 +383,7 @@ def fetch(opml, timeout, delay):
     """Fetch all RSS feeds and store posts."""
     from hn_intel.fetcher import fetch_all_feeds
 
-    conn = get_connection()
-    init_db(conn)
+    conn = _connect("ingest", writes=True)
     summary = fetch_all_feeds(conn, opml_path=opml, timeout=timeout, delay=delay)
     conn.close()
 
@@ -33,53 +396,98 @@ def fetch(opml, timeout, delay):
 @main.command()
 def status():
     """Show database status."""
-    conn = get_connection()
-    init_db(conn)
+    from hn_intel.db import get_corpus_summary
+
+    conn = _connect(analysis=True)
 
-    blog_count = conn.execute("SELECT COUNT(*) FROM blogs").fetchone()[0]
-    post_count = conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+    summary = get_corpus_summary(conn)
     last_fetch = conn.execute(
         "SELECT MAX(last_fetched) FROM blogs"
     ).fetchone()[0]
 
-    conn.close()
+    _close(conn)
 
-    click.echo(f"Blogs: {blog_count}")
-    click.echo(f"Posts: {post_count}")
+    click.echo(f"Blogs: {summary['blogs']}")
+    click.echo(f"Posts: {summary['posts']}")
     click.echo(f"Last fetch: {last_fetch or 'never'}")
 
 
 @main.command()
 @click.option("--max-features", default=500, type=int, help="Max TF-IDF features.")
 @click.option("--n-clusters", default=8, type=int, help="Number of blog clusters.")
-@click.option("--period", default="month", type=click.Choice(["month", "week"]), help="Trend period.")
-def analyze(max_features, n_clusters, period):
+@click.option("--period", default="month", type=click.Choice(["day", "week", "month", "quarter"]),
+              help="Trend period.")
+@click.option("--smoothing", default=None, metavar="rolling:N|ewma:ALPHA",
+              callback=_check_smoothing,
+              help="Smooth trend series with an N-period trailing mean or an EWMA.")
+@click.option("--workers", default=1, type=int,
+              help="Run read-only stages in parallel on this many pooled connections.")
+@click.option("--jobs", default=1, type=click.IntRange(min=1),
+              help="Count TF-IDF terms in this many worker processes.")
+@click.option("--no-cache", is_flag=True, help="Recompute every stage, ignoring cached artifacts.")
+@click.option("--incremental", type=click.Choice(["dynamic", "fixed", "hashing"]),
+              is_flag=False, flag_value="dynamic", default=None,
+              help="Build keywords from persisted term counts instead of refitting "
+                   "(vocabulary mode, default dynamic).")
+@click.option("--shard-dir", default=None, type=click.Path(file_okay=False),
+              help="Extract keywords out of core, streaming posts into CSR shards in this directory.")
+@click.option("--chunk-size", default=5000, type=click.IntRange(min=1),
+              help="Posts per chunk and shard with --shard-dir.")
+@click.option("--matrix-dir", default=None, type=click.Path(file_okay=False),
+              help="Keep the TF-IDF matrices memory-mapped in this directory and reuse them "
+                   "while the corpus is unchanged.")
+@click.option("--sketch", is_flag=True,
+              help="Track every term in fixed-memory per-period sketches and report "
+                   "accelerating terms outside the keyword vocabulary.")
+@click.option("--centrality", "centrality_backend", default="networkx",
+              type=click.Choice(["networkx", "sparse"]),
+              help="Centrality backend: networkx, or sparse-matrix PageRank warm-started from "
+                   "the previous run, with sampled betweenness on large graphs.")
+def analyze(max_features, n_clusters, period, smoothing, workers, jobs, no_cache, incremental,
+            shard_dir, chunk_size, matrix_dir, sketch, centrality_backend):
     """Run full analysis pipeline and print summary."""
-    from hn_intel.analyzer import compute_trends, detect_emerging_topics
-    from hn_intel.network import extract_citations, build_citation_graph, compute_centrality
-    from hn_intel.clusters import compute_blog_vectors, cluster_blogs, compute_similarity_matrix
-
-    conn = get_connection()
-    init_db(conn)
+    from hn_intel.network import extract_citations
+    from hn_intel.sketch import update_term_sketches
+    from hn_intel.tokens import tokenize_new_posts
+
+    if incremental and shard_dir:
+        raise click.UsageError("--incremental and --shard-dir are mutually exclusive.")
+    if matrix_dir and (incremental or shard_dir):
+        raise click.UsageError("--matrix-dir cannot be combined with --incremental or --shard-dir.")
+    conn = _connect("analyze", analysis=True)
+    read_only = _check_read_only(conn, incremental, sketch)
+
+    # Citation extraction and tokenization write, so they run on the main
+    # connection before the read-only stages (which may run in parallel)
+    # take their snapshot. The readonly profile uses what is already stored.
+    new_citations = 0 if read_only else extract_citations(conn)
+    if not read_only:
+        tokenize_new_posts(conn)
+    vocabulary = _prepare_incremental(conn, incremental, max_features) if incremental else None
+    if sketch:
+        update_term_sketches(conn, period)
+    citation_count = conn.execute("SELECT COUNT(*) FROM citations").fetchone()[0]
+    results = _run_stages(
+        conn, _analysis_stages(max_features, n_clusters, period, incremental=incremental,
+                               smoothing=smoothing, jobs=jobs, shard_dir=shard_dir,
+                               chunk_size=chunk_size, matrix_dir=matrix_dir,
+                               centrality_backend=centrality_backend, vocabulary=vocabulary),
+        workers=workers, use_cache=not no_cache,
+    )
+    trends, emerging = results["trends"]
+    graph, centrality = results["network"]
+    blog_vectors, blog_names, vectorizer, clusters, sim_matrix = results["clusters"]
 
     click.echo("Computing trends...")
-    trends = compute_trends(conn, period=period)
-    emerging = detect_emerging_topics(trends)
     click.echo(f"  Periods: {len(trends)}")
     click.echo(f"  Emerging topics: {len(emerging)}")
 
     click.echo("Extracting citations...")
-    citation_count = extract_citations(conn)
-    graph = build_citation_graph(conn)
-    centrality = compute_centrality(graph)
-    click.echo(f"  Citations: {citation_count}")
+    click.echo(f"  Citations: {citation_count} ({new_citations} new)")
     click.echo(f"  Graph nodes: {graph.number_of_nodes()}")
     click.echo(f"  Graph edges: {graph.number_of_edges()}")
 
     click.echo("Clustering blogs...")
-    blog_vectors, blog_names, vectorizer = compute_blog_vectors(conn, max_features=max_features)
-    clusters = cluster_blogs(blog_vectors, blog_names, vectorizer, n_clusters=n_clusters)
-    sim_matrix = compute_similarity_matrix(blog_vectors)
     click.echo(f"  Blogs clustered: {len(blog_names)}")
     click.echo(f"  Clusters: {len(clusters)}")
 
@@ -88,34 +496,52 @@ def analyze(max_features, n_clusters, period):
         for e in emerging[:5]:
             click.echo(f"  {e['keyword']} ({e['acceleration']:.2f}x acceleration)")
 
+    if sketch:
+        beyond = _sketch_emerging(conn, period, trends)
+        click.echo(f"\nEmerging terms beyond the vocabulary: {len(beyond)}")
+        for e in beyond[:5]:
+            click.echo(f"  {e['keyword']} ({e['acceleration']:.2f}x acceleration)")
+
     if centrality:
         top_blogs = sorted(centrality.items(), key=lambda x: x[1]["pagerank"], reverse=True)[:5]
         click.echo("\nTop blogs by PageRank:")
         for name, m in top_blogs:
             click.echo(f"  {name} (PR: {m['pagerank']:.4f})")
 
-    conn.close()
+    _close(conn)
     click.echo("\nAnalysis complete.")
 
 
 @main.command()
 @click.option("--max-features", default=500, type=int, help="Max TF-IDF features.")
 @click.option("--top-n", default=20, type=int, help="Number of ideas to surface.")
-@click.option("--period", default="month", type=click.Choice(["month", "week"]), help="Trend period.")
+@click.option("--period", default="month", type=click.Choice(["day", "week", "month", "quarter"]),
+              help="Trend period.")
 @click.option("--output-dir", default=None, type=str, help="Optional directory to write report files.")
-def ideas(max_features, top_n, period, output_dir):
+@click.option("--no-cache", is_flag=True, help="Recompute trends and centrality, ignoring cached artifacts.")
+@click.option("--matrix-dir", default=None, type=click.Path(file_okay=False),
+              help="Keep the TF-IDF matrices memory-mapped in this directory and reuse them "
+                   "while the corpus is unchanged.")
+@click.option("--centrality", "centrality_backend", default="networkx",
+              type=click.Choice(["networkx", "sparse"]),
+              help="Centrality backend: networkx, or sparse-matrix PageRank warm-started from "
+                   "the previous run, with sampled betweenness on large graphs.")
+def ideas(max_features, top_n, period, output_dir, no_cache, matrix_dir, centrality_backend):
     """Surface high-impact project ideas from blog pain signals."""
     from hn_intel.ideas import generate_ideas
+    from hn_intel.matrices import load_or_fit_keyword_model
 
-    conn = get_connection()
-    init_db(conn)
+    conn = _connect("analyze", analysis=True)
+    model = load_or_fit_keyword_model(conn, matrix_dir, max_features) if matrix_dir else None
 
     click.echo("Surfacing project ideas...")
-    idea_list = generate_ideas(conn, max_features=max_features, period=period, top_n=top_n)
+    idea_list = generate_ideas(conn, max_features=max_features, period=period, top_n=top_n,
+                               use_cache=not no_cache, model=model,
+                               centrality_backend=centrality_backend)
 
     if not idea_list:
         click.echo("No project ideas found. Try fetching more posts first.")
-        conn.close()
+        _close(conn)
         return
 
     click.echo(f"Found {len(idea_list)} project ideas:\n")
@@ -149,39 +575,97 @@ def ideas(max_features, top_n, period, output_dir):
         click.echo(f"  {md_path}")
         click.echo(f"  {json_path}")
 
-    conn.close()
+    _close(conn)
 
 
 @main.command()
 @click.option("--output-dir", default="output", help="Directory for report files.")
 @click.option("--max-features", default=500, type=int, help="Max TF-IDF features.")
 @click.option("--n-clusters", default=8, type=int, help="Number of blog clusters.")
-@click.option("--period", default="month", type=click.Choice(["month", "week"]), help="Trend period.")
-def report(output_dir, max_features, n_clusters, period):
+@click.option("--period", default="month", type=click.Choice(["day", "week", "month", "quarter"]),
+              help="Trend period.")
+@click.option("--smoothing", default=None, metavar="rolling:N|ewma:ALPHA",
+              callback=_check_smoothing,
+              help="Smooth trend series with an N-period trailing mean or an EWMA.")
+@click.option("--workers", default=1, type=int,
+              help="Run read-only stages in parallel on this many pooled connections.")
+@click.option("--jobs", default=1, type=click.IntRange(min=1),
+              help="Count TF-IDF terms in this many worker processes.")
+@click.option("--no-cache", is_flag=True, help="Recompute every stage, ignoring cached artifacts.")
+@click.option("--incremental", type=click.Choice(["dynamic", "fixed", "hashing"]),
+              is_flag=False, flag_value="dynamic", default=None,
+              help="Build keywords from persisted term counts instead of refitting "
+                   "(vocabulary mode, default dynamic).")
+@click.option("--shard-dir", default=None, type=click.Path(file_okay=False),
+              help="Extract keywords out of core, streaming posts into CSR shards in this directory.")
+@click.option("--chunk-size", default=5000, type=click.IntRange(min=1),
+              help="Posts per chunk and shard with --shard-dir.")
+@click.option("--matrix-dir", default=None, type=click.Path(file_okay=False),
+              help="Keep the TF-IDF matrices memory-mapped in this directory and reuse them "
+                   "while the corpus is unchanged.")
+@click.option("--sketch", is_flag=True,
+              help="Track every term in fixed-memory per-period sketches and report "
+                   "accelerating terms outside the keyword vocabulary.")
+@click.option("--centrality", "centrality_backend", default="networkx",
+              type=click.Choice(["networkx", "sparse"]),
+              help="Centrality backend: networkx, or sparse-matrix PageRank warm-started from "
+                   "the previous run, with sampled betweenness on large graphs.")
+@click.option("--segment-blogs", default=10, type=click.IntRange(min=0),
+              help="Also detect emerging topics for this many top-PageRank blogs "
+                   "(besides every cluster).")
+@click.option("--trends-format", default="nested", type=click.Choice(["nested", "csr"]),
+              help="Layout of the scores in trends.json: nested {period: {keyword: score}} "
+                   "objects, or compact CSR arrays for large vocabularies.")
+def report(output_dir, max_features, n_clusters, period, smoothing, workers, jobs, no_cache,
+           incremental, shard_dir, chunk_size, matrix_dir, sketch, centrality_backend,
+           segment_blogs, trends_format):
     """Run analysis and generate all reports."""
-    from hn_intel.analyzer import compute_trends, detect_emerging_topics
-    from hn_intel.network import extract_citations, build_citation_graph, compute_centrality
-    from hn_intel.clusters import compute_blog_vectors, cluster_blogs, compute_similarity_matrix
+    from hn_intel.analyzer import find_leading_blogs_batch
+    from hn_intel.network import extract_citations
     from hn_intel.ideas import generate_ideas
+    from hn_intel.matrices import load_or_fit_keyword_model
     from hn_intel.reports import generate_all_reports
+    from hn_intel.sketch import update_term_sketches
+    from hn_intel.tokens import tokenize_new_posts
 
-    conn = get_connection()
-    init_db(conn)
+    if incremental and shard_dir:
+        raise click.UsageError("--incremental and --shard-dir are mutually exclusive.")
+    if matrix_dir and (incremental or shard_dir):
+        raise click.UsageError("--matrix-dir cannot be combined with --incremental or --shard-dir.")
+    conn = _connect("analyze", analysis=True)
+    read_only = _check_read_only(conn, incremental, sketch)
 
     click.echo("Running analysis...")
-    trends = compute_trends(conn, period=period)
-    emerging = detect_emerging_topics(trends)
+    if not read_only:
+        extract_citations(conn)
+        tokenize_new_posts(conn)
+    vocabulary = _prepare_incremental(conn, incremental, max_features) if incremental else None
+    if sketch:
+        update_term_sketches(conn, period)
+    models = {}
+    stages = _analysis_stages(max_features, n_clusters, period, models, incremental, smoothing,
+                              jobs, shard_dir, chunk_size, matrix_dir, centrality_backend,
+                              vocabulary)
+    results = _run_stages(conn, stages, workers=workers, use_cache=not no_cache)
+    trends, emerging = results["trends"]
+    graph, centrality = results["network"]
+    blog_vectors, blog_names, vectorizer, clusters, sim_matrix = results["clusters"]
+    if matrix_dir and "keywords" not in models:
+        # The trends stage came from the cache; reopen its matrix instead of refitting.
+        models["keywords"] = load_or_fit_keyword_model(conn, matrix_dir, max_features, jobs)
 
-    extract_citations(conn)
-    graph = build_citation_graph(conn)
-    centrality = compute_centrality(graph)
+    click.echo("Surfacing project ideas...")
+    idea_list = generate_ideas(conn, max_features=max_features, period=period,
+                               use_cache=not no_cache, model=models.get("keywords"),
+                               centrality=centrality)
 
-    blog_vectors, blog_names, vectorizer = compute_blog_vectors(conn, max_features=max_features)
-    clusters = cluster_blogs(blog_vectors, blog_names, vectorizer, n_clusters=n_clusters)
-    sim_matrix = compute_similarity_matrix(blog_vectors)
+    click.echo("Finding leading blogs...")
+    leading_blogs = find_leading_blogs_batch(conn, [e["keyword"] for e in emerging])
+    sketch_emerging = _sketch_emerging(conn, period, trends) if sketch else None
 
-    click.echo("Surfacing project ideas...")
-    idea_list = generate_ideas(conn, max_features=max_features, period=period)
+    click.echo("Detecting emerging topics per segment...")
+    segment_emerging = _segment_emerging(conn, stages, models, clusters, centrality, n_clusters,
+                                         segment_blogs, use_cache=not no_cache)
 
     click.echo("Generating reports...")
     paths = generate_all_reports(
@@ -195,14 +679,255 @@ def report(output_dir, max_features, n_clusters, period):
         conn=conn,
         output_dir=output_dir,
         ideas=idea_list,
+        leading_blogs=leading_blogs,
+        sketch_emerging=sketch_emerging,
+        segment_emerging=segment_emerging,
+        trends_format=trends_format,
     )
 
-    conn.close()
+    _close(conn)
 
     click.echo(f"\nReports written to {output_dir}/:")
     for path in paths:
         click.echo(f"  {path}")
 
 
+@main.command()
+@click.option("--format", "fmt", default="parquet", type=click.Choice(["parquet", "arrow"]),
+              help="Columnar file format.")
+@click.option("--output-dir", default="data/snapshot", help="Directory for the snapshot files.")
+@click.option("--columns", "column_specs", multiple=True, metavar="TABLE=COL,COL",
+              help="Only export these columns of a table (repeatable), e.g. posts=title,published.")
+@click.option("--since", default=None, help="Only export posts published on or after this ISO date.")
+@click.option("--until", default=None, help="Only export posts published before this ISO date.")
+def export(fmt, output_dir, column_specs, since, until):
+    """Export blogs, posts and citations as a columnar snapshot."""
+    from hn_intel.snapshot import TABLES, export_snapshot
+
+    columns = {}
+    for spec in column_specs:
+        table, _, names = spec.partition("=")
+        if table not in TABLES or not names:
+            raise click.BadParameter(f"expected TABLE=COL,COL with TABLE one of "
+                                     f"{', '.join(TABLES)}", param_hint="--columns")
+        columns[table] = names.split(",")
+
+    conn = _connect()
+    try:
+        counts = export_snapshot(conn, output_dir, fmt=fmt, columns=columns,
+                                 since=since, until=until)
+    except (ImportError, ValueError) as exc:
+        raise click.ClickException(str(exc))
+    finally:
+        conn.close()
+
+    for table, count in counts.items():
+        click.echo(f"  {table}: {count} rows")
+    click.echo(f"Snapshot written to {output_dir}/")
+
+
+@main.command("import-snapshot")
+@click.argument("snapshot_dir", type=click.Path(exists=True, file_okay=False))
+@click.option("--since", default=None, help="Only import posts published on or after this ISO date.")
+@click.option("--until", default=None, help="Only import posts published before this ISO date.")
+def import_snapshot_cmd(snapshot_dir, since, until):
+    """Load a columnar snapshot into the database."""
+    from hn_intel.snapshot import import_snapshot
+
+    conn = _connect("ingest", writes=True)
+    try:
+        counts = import_snapshot(conn, snapshot_dir, since=since, until=until)
+    except ImportError as exc:
+        raise click.ClickException(str(exc))
+    finally:
+        conn.close()
+
+    for table, count in counts.items():
+        click.echo(f"  {table}: {count} rows imported")
+
+
+@main.group()
+def db():
+    """Database maintenance and benchmarking."""
+    pass
+
+
+def _bench_profiles(rows, repeat, profiles):
+    """Insert and scan throughput per connection profile."""
+    from hn_intel.bench import bench_profiles
+
+    click.echo(f"Benchmarking {rows} rows per profile...")
+    results = bench_profiles(profiles=profiles or None, rows=rows, repeat=repeat)
+    table = [
+        [
+            r["profile"],
+            "-" if r["insert_rows_per_s"] is None else f"{r['insert_rows_per_s']:,.0f}",
+            f"{r['scan_rows_per_s']:,.0f}",
+        ]
+        for r in results
+    ]
+    return table, ["Profile", "Insert rows/s", "Scan rows/s"]
+
+
+def _bench_compression(rows, repeat, profiles):
+    """Database size and scan throughput with and without compression."""
+    from hn_intel.bench import bench_compression
+
+    click.echo(f"Benchmarking compression on {rows} rows...")
+    table = [
+        [r["mode"], f"{r['bytes']:,}", f"{r['scan_rows_per_s']:,.0f}",
+         f"{r['scan_mb_per_s']:,.1f}"]
+        for r in bench_compression(rows=rows, repeat=repeat)
+    ]
+    return table, ["Mode", "DB bytes", "Scan rows/s", "Scan MB/s"]
+
+
+def _bench_in_memory(rows, repeat, profiles):
+    """The report analysis on the database file versus an in-memory copy."""
+    from hn_intel.bench import bench_in_memory
+
+    click.echo(f"Benchmarking report analysis on {rows} rows...")
+    table = [
+        [r["mode"], f"{r['load_s']:.3f}", f"{r['run_s']:.3f}"]
+        for r in bench_in_memory(rows=rows, repeat=repeat)
+    ]
+    return table, ["Mode", "Load s", "Report s"]
+
+
+def _bench_trends(rows, repeat, profiles):
+    """Trend aggregation against the original per-cell loop."""
+    from hn_intel.bench import bench_trends
+
+    click.echo("Benchmarking trend aggregation...")
+    table = [
+        [f"{r['posts']:,}", f"{r['vectorized_s']:.3f}", f"{r['legacy_s']:,.1f}",
+         f"{r['speedup']:,.0f}x"]
+        for r in bench_trends()
+    ]
+    return table, ["Posts", "Sparse matmul s", "Loop s (est.)", "Speedup"]
+
+
+def _bench_emerging(rows, repeat, profiles):
+    """Multi-window emerging-topic detection against the per-keyword loop."""
+    from hn_intel.bench import bench_emerging
+
+    click.echo("Benchmarking emerging-topic detection...")
+    table = []
+    for limit in (None, 50):
+        r = bench_emerging(limit=limit, repeat=repeat)
+        table.append([f"{r['keywords']:,} x {r['periods']}", r["combinations"],
+                      limit or "all", f"{r['vectorized_s'] * 1000:.1f}",
+                      f"{r['legacy_s']:,.1f}", f"{r['speedup']:,.0f}x"])
+    return table, ["Keywords x periods", "Windows x thresholds", "Kept", "Vectorized ms",
+                   "Loop s (est.)", "Speedup"]
+
+
+def _bench_strip_html(rows, repeat, profiles):
+    """HTML stripping on the database's posts, or rows synthetic ones."""
+    import os
+
+    from hn_intel.bench import bench_strip_html
+
+    conn = _connect("readonly") if os.path.exists(DEFAULT_DB_PATH) else None
+    source = "database posts" if conn is not None else f"{rows} synthetic posts"
+    click.echo(f"Benchmarking HTML stripping on {source}...")
+    try:
+        results = bench_strip_html(conn, rows=rows, repeat=repeat)
+    finally:
+        if conn is not None:
+            _close(conn)
+    table = [
+        [r["method"], f"{r['posts']:,}", f"{r['mb']:.1f}", f"{r['mb_per_s']:,.1f}"]
+        for r in results
+    ]
+    return table, ["Method", "Posts", "MB", "MB/s"]
+
+
+# db bench --kind: each runner returns (table rows, headers).
+_BENCHMARKS = {
+    "profiles": _bench_profiles,
+    "compression": _bench_compression,
+    "in-memory": _bench_in_memory,
+    "trends": _bench_trends,
+    "emerging": _bench_emerging,
+    "strip-html": _bench_strip_html,
+}
+
+
+@db.command()
+@click.option("--kind", default="profiles", type=click.Choice(list(_BENCHMARKS)),
+              help="What to time: insert and scan throughput per connection profile; size and "
+                   "scans with and without compression; the report analysis on disk versus "
+                   "in memory; trend aggregation at 10k-1M synthetic posts; multi-window "
+                   "emerging-topic detection on 50k x 500 synthetic trends; or HTML stripping "
+                   "on the database's posts (or --rows synthetic ones).")
+@click.option("--rows", default=2000, type=int, help="Synthetic posts to insert per profile.")
+@click.option("--repeat", default=3, type=int, help="Scans per profile; the fastest is reported.")
+@click.option("--profile", "profiles", multiple=True, type=click.Choice(sorted(PROFILES)),
+              help="Profile to benchmark with --kind profiles (repeatable). Defaults to all "
+                   "profiles.")
+def bench(kind, rows, repeat, profiles):
+    """Measure database and analysis throughput (insert and scan rates by default)."""
+    from tabulate import tabulate
+
+    table, headers = _BENCHMARKS[kind](rows, repeat, profiles)
+    click.echo(tabulate(table, headers=headers, tablefmt="github"))
+
+
+@db.command()
+@click.option("--min-bytes", default=256, type=int, help="Leave shorter descriptions uncompressed.")
+@click.option("--decompress", is_flag=True, help="Turn compression off and restore plain text.")
+def compact(min_bytes, decompress):
+    """Compress post descriptions and vacuum the database."""
+    from hn_intel.db import compress_posts, database_size, decompress_posts
+
+    conn = _connect(writes=True)
+    before = database_size(conn)
+    if decompress:
+        count = decompress_posts(conn)
+        click.echo(f"Decompressed {count} posts.")
+    else:
+        count = compress_posts(conn, min_bytes=min_bytes)
+        click.echo(f"Compressed {count} posts.")
+    conn.execute("VACUUM")
+    after = database_size(conn)
+    conn.close()
+
+    click.echo(f"Size before: {before:,} bytes")
+    click.echo(f"Size after: {after:,} bytes")
+
+
+@db.command()
+@click.option("--horizon-days", default=730, type=int,
+              help="Archive posts published more than this many days ago.")
+@click.option("--archive-dir", default=None, type=str,
+              help="Directory for per-year archive files (default: data/archive).")
+def archive(horizon_days, archive_dir):
+    """Move old posts into per-year archive databases."""
+    from hn_intel.db import archive_posts
+
+    conn = _connect(writes=True)
+    moved = archive_posts(conn, horizon_days=horizon_days, archive_dir=archive_dir)
+    conn.close()
+
+    if not moved:
+        click.echo("No posts older than the horizon.")
+        return
+    for year, count in sorted(moved.items()):
+        click.echo(f"  {year}: {count} posts archived")
+    click.echo(f"Archived {sum(moved.values())} posts.")
+
+
+@db.command("clear-cache")
+def clear_cache():
+    """Delete all cached analysis artifacts."""
+    from hn_intel.cache import clear_artifacts
+
+    conn = _connect(writes=True)
+    removed = clear_artifacts(conn)
+    conn.close()
+    click.echo(f"Removed {removed} cached artifacts.")
+
+
 if __name__ == "__main__":
     main()
@@ -1,40 +1,29 @@
 """Blog clustering using TF-IDF vectors and K-means."""
 
-import html
-import re
 from collections import defaultdict
 
 import numpy as np
 from sklearn.cluster import KMeans
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
 from hn_intel.db import get_all_posts
+from hn_intel.text import strip_html  # noqa: F401
+from hn_intel.tokens import TokenAnalyzer, fit_vectorizer, get_post_tokens
 
 
-def strip_html(text):
-    """Remove HTML tags from text.
-
-    Args:
-        text: Raw HTML string, or None.
-
-    Returns:
-        Cleaned text with tags replaced by spaces.
-    """
-    text = re.sub(r"<[^>]+>", " ", text or "")
-    text = html.unescape(text)
-    return text.strip()
-
-
-def compute_blog_vectors(conn, max_features=500):
+def compute_blog_vectors(conn, max_features=500, jobs=1):
     """Concatenate all posts per blog into one document and TF-IDF vectorize.
 
     Each blog becomes a single document composed of its posts' titles and
-    stripped descriptions. The resulting TF-IDF matrix has one row per blog.
+    stripped descriptions, taken from the pre-tokenized store
+    (hn_intel.tokens). The resulting TF-IDF matrix has one row per blog.
 
     Args:
         conn: sqlite3.Connection instance.
         max_features: Maximum number of TF-IDF features.
+        jobs: Worker processes for term counting (see
+            tokens.fit_vectorizer()); the result does not depend on it.
 
     Returns:
         Tuple of (tfidf_matrix, blog_names, vectorizer) where tfidf_matrix
@@ -44,21 +33,17 @@ def compute_blog_vectors(conn, max_features=500):
     posts = get_all_posts(conn)
 
     blog_docs = defaultdict(list)
-    for post in posts:
-        blog_name = post["blog_name"]
-        title = post["title"] or ""
-        description = strip_html(post["description"])
-        blog_docs[blog_name].append(title + " " + description)
+    for post, tokens in zip(posts, get_post_tokens(conn, posts)):
+        blog_docs[post["blog_name"]].extend(tokens)
 
     blog_names = sorted(blog_docs.keys())
-    documents = [" ".join(blog_docs[name]) for name in blog_names]
+    documents = [blog_docs[name] for name in blog_names]
 
     vectorizer = TfidfVectorizer(
+        analyzer=TokenAnalyzer(ENGLISH_STOP_WORDS),
         max_features=max_features,
-        stop_words="english",
-        token_pattern=r"(?u)\b[a-zA-Z][a-zA-Z0-9]{2,}\b",
     )
-    tfidf_matrix = vectorizer.fit_transform(documents)
+    tfidf_matrix = fit_vectorizer(vectorizer, documents, jobs=jobs)
 
     return tfidf_matrix, blog_names, vectorizer
 
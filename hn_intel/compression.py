@@ -0,0 +1,94 @@
+"""Dictionary-based zlib compression for large text columns."""
+
+import zlib
+from collections import Counter
+
+# Prefix of a compressed value: magic, then the 4-byte big-endian ID of the
+# compression_dicts row used as preset dictionary (0 = none), then the
+# zlib stream.
+MAGIC = b"\x1bHZz"
+_HEADER_LEN = len(MAGIC) + 4
+
+# zlib only looks back 32 KiB, so a larger preset dictionary is wasted.
+MAX_DICT_BYTES = 32768
+
+
+def train_dictionary(samples, size=MAX_DICT_BYTES):
+    """Build a zlib preset dictionary from sample documents.
+
+    Keeps the whitespace-delimited chunks that would save the most bytes
+    (document frequency x length) and places the most valuable ones last,
+    where zlib can reach them with the shortest distances.
+
+    Args:
+        samples: Iterable of text strings drawn from the corpus.
+        size: Maximum dictionary size in bytes.
+
+    Returns:
+        Dictionary bytes (possibly empty).
+    """
+    counts = Counter()
+    for text in samples:
+        counts.update(set(text.split()))
+
+    ranked = sorted(
+        ((count * len(chunk), chunk) for chunk, count in counts.items() if count > 1),
+        reverse=True,
+    )
+    picked = []
+    total = 0
+    for _, chunk in ranked:
+        encoded = chunk.encode("utf-8") + b" "
+        if total + len(encoded) > size:
+            continue
+        picked.append(encoded)
+        total += len(encoded)
+    return b"".join(reversed(picked))
+
+
+def is_compressed(value):
+    """Return True if value is a blob produced by compress()."""
+    return isinstance(value, bytes) and value[:len(MAGIC)] == MAGIC
+
+
+def dictionary_id(value):
+    """Return the dictionary ID stored in a compressed value's header."""
+    return int.from_bytes(value[len(MAGIC):_HEADER_LEN], "big")
+
+
+def compress(text, zdict=b"", dict_id=0, level=9):
+    """Compress text into a self-describing blob.
+
+    Args:
+        text: String to compress.
+        zdict: Preset dictionary bytes, or b"" for none.
+        dict_id: ID under which zdict is stored (0 when zdict is empty).
+        level: zlib compression level.
+
+    Returns:
+        Bytes starting with MAGIC.
+    """
+    if zdict:
+        compressor = zlib.compressobj(level, zdict=zdict)
+    else:
+        compressor = zlib.compressobj(level)
+    payload = compressor.compress(text.encode("utf-8")) + compressor.flush()
+    return MAGIC + dict_id.to_bytes(4, "big") + payload
+
+
+def decompress(value, zdict=b""):
+    """Inverse of compress().
+
+    Args:
+        value: Blob produced by compress().
+        zdict: The dictionary whose ID is in the header, or b"".
+
+    Returns:
+        The original string.
+    """
+    if zdict:
+        decompressor = zlib.decompressobj(zdict=zdict)
+    else:
+        decompressor = zlib.decompressobj()
+    data = decompressor.decompress(value[_HEADER_LEN:]) + decompressor.flush()
+    return data.decode("utf-8")
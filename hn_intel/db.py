@@ -1,25 +1,304 @@
 """SQLite database layer for HN Blog Intelligence."""
 
 import os
+import queue
+import random
+import re
 import sqlite3
-from urllib.parse import urlparse
+from contextlib import contextmanager
+from datetime import date, timedelta
+from urllib.parse import parse_qsl, quote, urlencode, urlparse, urlsplit, urlunsplit
 
+from hn_intel import compression
 
-def get_connection(db_path="data/hn_intel.db"):
+DEFAULT_DB_PATH = "data/hn_intel.db"
+
+# Descriptions shorter than this stay plain text even when compression is on.
+COMPRESS_MIN_BYTES = 256
+
+# Query parameters that only track where a click came from.
+_TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid"}
+
+# Environment variable consulted when no profile is passed explicitly.
+PROFILE_ENV_VAR = "HN_INTEL_DB_PROFILE"
+
+# Named PRAGMA bundles applied by get_connection(). "default" keeps the
+# historical WAL-only behaviour; the others trade durability or memory for
+# throughput. cache_size is negative to mean KiB rather than pages.
+PROFILES = {
+    "default": {
+        "journal_mode": "WAL",
+    },
+    "ingest": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    "analyze": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -262144,
+        "mmap_size": 1 << 30,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    "readonly": {
+        "query_only": "ON",
+        "cache_size": -262144,
+        "mmap_size": 1 << 30,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+}
+
+# Profiles that open the file with a read-only URI instead of read-write.
+READONLY_PROFILES = {"readonly"}
+
+
+def _readonly_uri(db_path):
+    """Build a ``file:`` URI that opens db_path in read-only mode."""
+    return "file:" + quote(os.path.abspath(db_path)) + "?mode=ro"
+
+
+def resolve_profile(profile=None):
+    """Return the profile name to use, falling back to the environment.
+
+    Args:
+        profile: Explicit profile name, or None to consult
+            HN_INTEL_DB_PROFILE and then "default".
+
+    Returns:
+        A key of PROFILES.
+
+    Raises:
+        ValueError: If the profile name is unknown.
+    """
+    name = profile or os.environ.get(PROFILE_ENV_VAR) or "default"
+    if name not in PROFILES:
+        raise ValueError(
+            f"Unknown connection profile {name!r}; "
+            f"expected one of: {', '.join(sorted(PROFILES))}"
+        )
+    return name
+
+
+def get_connection(db_path=DEFAULT_DB_PATH, profile=None):
     """Open a SQLite connection, ensuring the parent directory exists.
 
     Args:
         db_path: Path to the SQLite database file.
+        profile: Name of a PROFILES entry controlling journal, sync, cache
+            and mmap settings. Defaults to $HN_INTEL_DB_PROFILE or "default".
+            The "readonly" profile requires the database to already exist.
 
     Returns:
         sqlite3.Connection with row_factory set to sqlite3.Row.
     """
-    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
-    conn = sqlite3.connect(db_path)
+    name = resolve_profile(profile)
+    if name in READONLY_PROFILES:
+        conn = sqlite3.connect(_readonly_uri(db_path), uri=True)
+    else:
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(db_path)
+    _apply_profile(conn, name)
+    return conn
+
+
+def _apply_profile(conn, name):
+    """Set the row factory, SQL functions and PRAGMAs of profile name on conn."""
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
+    register_functions(conn)
+    for pragma, value in PROFILES[name].items():
+        conn.execute(f"PRAGMA {pragma}={value}")
     conn.execute("PRAGMA foreign_keys=ON")
-    return conn
+
+
+def is_read_only(conn):
+    """Return True if conn cannot write, as under the "readonly" profile."""
+    return bool(conn.execute("PRAGMA query_only").fetchone()[0])
+
+
+def register_functions(conn):
+    """Register the SQL functions used by the schema and the read APIs.
+
+    hn_decompress(x) returns x unchanged unless it is a compressed blob
+    (see hn_intel.compression), in which case it returns the text.
+    Dictionaries are loaded from compression_dicts on first use and kept
+    for the lifetime of the connection. init_db() calls this, so any
+    connection that has been initialized can read compressed posts.
+
+    Args:
+        conn: sqlite3.Connection instance.
+    """
+    dictionaries = {0: b""}
+
+    def hn_decompress(value):
+        if not compression.is_compressed(value):
+            return value
+        dict_id = compression.dictionary_id(value)
+        if dict_id not in dictionaries:
+            row = conn.execute(
+                "SELECT data FROM compression_dicts WHERE id = ?", (dict_id,)
+            ).fetchone()
+            dictionaries[dict_id] = row[0] if row else b""
+        return compression.decompress(value, dictionaries[dict_id])
+
+    conn.create_function("hn_decompress", 1, hn_decompress, deterministic=True)
+
+
+class ReadPool:
+    """Fixed-size pool of read-only connections sharing one snapshot.
+
+    Every connection is opened with a ``mode=ro`` URI and the "readonly"
+    profile, then held inside a read transaction so that all of them see
+    the database exactly as it was when the pool was pinned. Under WAL the
+    readers never block the fetch writer; they simply don't see its commits
+    until refresh() is called.
+
+    Connections may be used from any thread, but only by one thread at a
+    time: check one out with connection() or run a callable with run().
+
+    Args:
+        db_path: Path to an existing SQLite database file.
+        size: Number of connections in the pool.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, size=4):
+        if db_path == ":memory:":
+            raise ValueError("ReadPool needs an on-disk database")
+        self.db_path = db_path
+        self._conns = []
+        self._idle = queue.Queue()
+        for _ in range(max(1, size)):
+            conn = sqlite3.connect(
+                _readonly_uri(db_path), uri=True,
+                check_same_thread=False, isolation_level=None,
+            )
+            _apply_profile(conn, "readonly")
+            self._conns.append(conn)
+            self._idle.put(conn)
+        self.refresh()
+
+    def refresh(self):
+        """Re-pin every connection to the latest committed snapshot.
+
+        Briefly takes the write lock on a separate connection so that no
+        commit can land between the BEGINs of the pooled readers. Call only
+        while no connection is checked out.
+        """
+        lock = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            lock.execute("PRAGMA busy_timeout=5000")
+            lock.execute("BEGIN IMMEDIATE")
+            for conn in self._conns:
+                if conn.in_transaction:
+                    conn.execute("COMMIT")
+                # Pick up archives written or rolled up since the last pin
+                attach_archives(conn)
+                conn.execute("BEGIN")
+                # A read transaction only starts on the first read
+                conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        finally:
+            if lock.in_transaction:
+                lock.execute("ROLLBACK")
+            lock.close()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Check out a pinned read-only connection for the with-block.
+
+        Args:
+            timeout: Seconds to wait for a free connection, or None to block.
+        """
+        conn = self._idle.get(timeout=timeout)
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def run(self, fn, *args, **kwargs):
+        """Call fn(conn, *args, **kwargs) with a checked-out connection."""
+        with self.connection() as conn:
+            return fn(conn, *args, **kwargs)
+
+    def close(self):
+        """End the read transactions and close every connection."""
+        for conn in self._conns:
+            if conn.in_transaction:
+                conn.execute("COMMIT")
+            conn.close()
+        self._conns = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class MemoryCopy:
+    """An in-memory copy of an on-disk database, made with the backup API.
+
+    ``conn`` is a ``:memory:`` connection holding every page of the main
+    database (archives are still attached from disk on demand). Queries on
+    it never touch the disk, which pays off when analysis stages rescan the
+    same tables repeatedly. save() copies it back, refusing if anything else
+    committed to the file since the copy was taken.
+
+    Args:
+        db_path: Path to an existing SQLite database file.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"No database at {db_path}")
+        self.db_path = db_path
+        self._source = sqlite3.connect(db_path, isolation_level=None)
+        self._source.execute("PRAGMA busy_timeout=5000")
+        self.conn = sqlite3.connect(":memory:")
+        # One read transaction for both, so that a commit landing during or
+        # after the backup is still seen as a change by save()
+        self._source.execute("BEGIN")
+        try:
+            self._data_version = self._source_version()
+            self._source.backup(self.conn)
+        finally:
+            self._source.execute("COMMIT")
+        self.conn.row_factory = sqlite3.Row
+        register_functions(self.conn)
+        self.conn.execute("PRAGMA foreign_keys=ON")
+
+    def _source_version(self):
+        # Changes whenever another connection commits to the file
+        return self._source.execute("PRAGMA data_version").fetchone()[0]
+
+    def save(self):
+        """Write the in-memory database back over the file.
+
+        Raises:
+            RuntimeError: If the file changed since it was copied; saving
+                would silently discard those commits.
+        """
+        if self._source_version() != self._data_version:
+            raise RuntimeError(
+                f"{self.db_path} changed on disk since it was loaded into memory"
+            )
+        self.conn.commit()
+        self.conn.backup(self._source)
+        self._data_version = self._source_version()
+
+    def close(self):
+        """Close the in-memory and the source connections without saving."""
+        self.conn.close()
+        self._source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
 
 def init_db(conn):
@@ -28,6 +307,7 @@ def init_db(conn):
     Args:
         conn: sqlite3.Connection instance.
     """
+    register_functions(conn)
     conn.executescript("""
         CREATE TABLE IF NOT EXISTS blogs (
             id INTEGER PRIMARY KEY,
@@ -60,9 +340,553 @@ def init_db(conn):
         CREATE INDEX IF NOT EXISTS idx_posts_published ON posts(published);
         CREATE INDEX IF NOT EXISTS idx_citations_source_blog_id ON citations(source_blog_id);
         CREATE INDEX IF NOT EXISTS idx_citations_target_blog_id ON citations(target_blog_id);
+
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """)
+    _migrate(conn)
+
+
+def _migrate_citations_unique(conn):
+    """Collapse duplicate citations and keep them idempotent from now on.
+
+    Also installs triggers that drop a post's citations when it is deleted
+    or its description changes; the latter rewinds the citation watermark
+    so the post is rescanned by the next extract_citations() call.
+    """
+    conn.executescript("""
+        DELETE FROM citations WHERE id NOT IN (
+            SELECT MIN(id) FROM citations GROUP BY source_post_id, target_url
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_citations_source_post_url
+            ON citations(source_post_id, target_url);
+
+        CREATE TRIGGER IF NOT EXISTS trg_posts_citations_update
+        AFTER UPDATE OF description ON posts
+        BEGIN
+            DELETE FROM citations WHERE source_post_id = OLD.id;
+            UPDATE meta SET value = MIN(CAST(value AS INTEGER), OLD.id - 1)
+            WHERE key = 'citations_watermark';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_posts_citations_delete
+        BEFORE DELETE ON posts
+        BEGIN
+            DELETE FROM citations WHERE source_post_id = OLD.id;
+        END;
+    """)
+
+
+def _migrate_artifacts(conn):
+    """Add the artifact cache table and the content_version triggers.
+
+    content_version is bumped whenever existing posts change or disappear,
+    or a blog's name or site changes; inserts are already visible through
+    MAX(id), so together they identify a corpus version for hn_intel.cache.
+    """
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS artifacts (
+            stage TEXT,
+            params TEXT,
+            corpus_version TEXT,
+            payload BLOB,
+            created TEXT,
+            PRIMARY KEY (stage, params)
+        );
+
+        INSERT OR IGNORE INTO meta (key, value) VALUES ('content_version', '0');
+
+        CREATE TRIGGER IF NOT EXISTS trg_posts_version_update
+        AFTER UPDATE ON posts
+        BEGIN
+            UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'content_version';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_posts_version_delete
+        AFTER DELETE ON posts
+        BEGIN
+            UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'content_version';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_blogs_version_update
+        AFTER UPDATE OF name, site_url ON blogs
+        BEGIN
+            UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'content_version';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_blogs_version_delete
+        AFTER DELETE ON blogs
+        BEGIN
+            UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'content_version';
+        END;
+    """)
+
+
+def _migrate_blog_stats(conn):
+    """Add the trigger-maintained per-blog statistics table and backfill it.
+
+    Empty published strings are treated as missing dates. Deleting a post
+    only rescans its blog when it held the first or last date; moving a
+    post between blogs or changing its date recomputes both blogs.
+    """
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS blog_stats (
+            blog_id INTEGER PRIMARY KEY REFERENCES blogs(id),
+            post_count INTEGER NOT NULL DEFAULT 0,
+            dated_count INTEGER NOT NULL DEFAULT 0,
+            first_published TEXT,
+            last_published TEXT
+        );
+
+        DELETE FROM blog_stats;
+        INSERT INTO blog_stats (blog_id, post_count, dated_count, first_published, last_published)
+        SELECT blog_id, COUNT(*), COUNT(NULLIF(published, '')),
+               MIN(NULLIF(published, '')), MAX(NULLIF(published, ''))
+        FROM posts WHERE blog_id IS NOT NULL GROUP BY blog_id;
+
+        CREATE TRIGGER IF NOT EXISTS trg_posts_stats_insert
+        AFTER INSERT ON posts WHEN NEW.blog_id IS NOT NULL
+        BEGIN
+            INSERT INTO blog_stats (blog_id, post_count, dated_count, first_published, last_published)
+            VALUES (
+                NEW.blog_id, 1, NULLIF(NEW.published, '') IS NOT NULL,
+                NULLIF(NEW.published, ''), NULLIF(NEW.published, '')
+            )
+            ON CONFLICT(blog_id) DO UPDATE SET
+                post_count = post_count + 1,
+                dated_count = dated_count + excluded.dated_count,
+                first_published = COALESCE(
+                    MIN(first_published, excluded.first_published),
+                    first_published, excluded.first_published),
+                last_published = COALESCE(
+                    MAX(last_published, excluded.last_published),
+                    last_published, excluded.last_published);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_posts_stats_delete
+        AFTER DELETE ON posts WHEN OLD.blog_id IS NOT NULL
+        BEGIN
+            UPDATE blog_stats SET
+                post_count = post_count - 1,
+                dated_count = dated_count - (NULLIF(OLD.published, '') IS NOT NULL),
+                first_published = CASE WHEN OLD.published = first_published THEN (
+                    SELECT MIN(NULLIF(published, '')) FROM posts WHERE blog_id = OLD.blog_id
+                ) ELSE first_published END,
+                last_published = CASE WHEN OLD.published = last_published THEN (
+                    SELECT MAX(NULLIF(published, '')) FROM posts WHERE blog_id = OLD.blog_id
+                ) ELSE last_published END
+            WHERE blog_id = OLD.blog_id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_posts_stats_update
+        AFTER UPDATE OF blog_id, published ON posts
+        BEGIN
+            DELETE FROM blog_stats WHERE blog_id IN (OLD.blog_id, NEW.blog_id);
+            INSERT INTO blog_stats (blog_id, post_count, dated_count, first_published, last_published)
+            SELECT blog_id, COUNT(*), COUNT(NULLIF(published, '')),
+                   MIN(NULLIF(published, '')), MAX(NULLIF(published, ''))
+            FROM posts WHERE blog_id IN (OLD.blog_id, NEW.blog_id) GROUP BY blog_id;
+        END;
+    """)
+
+
+def _migrate_canonical_url(conn):
+    """Add posts.canonical_url, backfill it, and drop syndicated duplicates.
+
+    For every canonical URL the lowest post ID is kept; the other copies are
+    deleted (their citations and blog_stats follow via triggers) before the
+    unique index is created.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(posts)")}
+    if "canonical_url" not in columns:
+        conn.execute("ALTER TABLE posts ADD COLUMN canonical_url TEXT")
+
+    rows = conn.execute("SELECT id, url FROM posts WHERE canonical_url IS NULL").fetchall()
+    conn.executemany(
+        "UPDATE posts SET canonical_url = ? WHERE id = ?",
+        [(canonicalize_url(row[1]), row[0]) for row in rows],
+    )
+    conn.execute(
+        "DELETE FROM posts WHERE id NOT IN "
+        "(SELECT MIN(id) FROM posts GROUP BY canonical_url)"
+    )
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_posts_canonical_url ON posts(canonical_url)"
+    )
+
+
+def _migrate_compression(conn):
+    """Add compression_dicts and make content triggers compression-blind.
+
+    Re-encoding a description (compressing or decompressing it) must not
+    look like an edit, so the citation and content_version triggers now
+    compare decoded text via hn_decompress().
+    """
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS compression_dicts (
+            id INTEGER PRIMARY KEY,
+            data BLOB,
+            created TEXT
+        );
+
+        DROP TRIGGER IF EXISTS trg_posts_citations_update;
+        CREATE TRIGGER trg_posts_citations_update
+        AFTER UPDATE OF description ON posts
+        WHEN hn_decompress(OLD.description) IS NOT hn_decompress(NEW.description)
+        BEGIN
+            DELETE FROM citations WHERE source_post_id = OLD.id;
+            UPDATE meta SET value = MIN(CAST(value AS INTEGER), OLD.id - 1)
+            WHERE key = 'citations_watermark';
+        END;
+
+        DROP TRIGGER IF EXISTS trg_posts_version_update;
+        CREATE TRIGGER trg_posts_version_update
+        AFTER UPDATE OF blog_id, title, url, published, author ON posts
+        BEGIN
+            UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'content_version';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_posts_version_description
+        AFTER UPDATE OF description ON posts
+        WHEN hn_decompress(OLD.description) IS NOT hn_decompress(NEW.description)
+        BEGIN
+            UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'content_version';
+        END;
+    """)
+
+
+def _migrate_archives(conn):
+    """Prepare for moving old posts into per-year archive databases.
+
+    Adds archived_urls so that re-fetched archived posts are still rejected,
+    and makes the blog_stats triggers incremental and archive-aware: while
+    the 'archiving' meta key is set, deletes leave blog_stats alone so it
+    keeps describing hot and archived posts together.
+    """
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS archived_urls (
+            canonical_url TEXT PRIMARY KEY
+        );
+
+        DROP TRIGGER IF EXISTS trg_posts_stats_delete;
+        CREATE TRIGGER trg_posts_stats_delete
+        AFTER DELETE ON posts
+        WHEN OLD.blog_id IS NOT NULL
+            AND NOT EXISTS (SELECT 1 FROM meta WHERE key = 'archiving')
+        BEGIN
+            UPDATE blog_stats SET
+                post_count = post_count - 1,
+                dated_count = dated_count - (NULLIF(OLD.published, '') IS NOT NULL),
+                first_published = CASE WHEN OLD.published = first_published THEN (
+                    SELECT MIN(NULLIF(published, '')) FROM posts WHERE blog_id = OLD.blog_id
+                ) ELSE first_published END,
+                last_published = CASE WHEN OLD.published = last_published THEN (
+                    SELECT MAX(NULLIF(published, '')) FROM posts WHERE blog_id = OLD.blog_id
+                ) ELSE last_published END
+            WHERE blog_id = OLD.blog_id;
+        END;
+
+        DROP TRIGGER IF EXISTS trg_posts_stats_update;
+        CREATE TRIGGER trg_posts_stats_update
+        AFTER UPDATE OF blog_id, published ON posts
+        BEGIN
+            UPDATE blog_stats SET
+                post_count = post_count - 1,
+                dated_count = dated_count - (NULLIF(OLD.published, '') IS NOT NULL),
+                first_published = CASE WHEN OLD.published = first_published THEN (
+                    SELECT MIN(NULLIF(published, '')) FROM posts
+                    WHERE blog_id = OLD.blog_id AND id != NEW.id
+                ) ELSE first_published END,
+                last_published = CASE WHEN OLD.published = last_published THEN (
+                    SELECT MAX(NULLIF(published, '')) FROM posts
+                    WHERE blog_id = OLD.blog_id AND id != NEW.id
+                ) ELSE last_published END
+            WHERE blog_id = OLD.blog_id;
+
+            INSERT INTO blog_stats (blog_id, post_count, dated_count, first_published, last_published)
+            SELECT NEW.blog_id, 1, NULLIF(NEW.published, '') IS NOT NULL,
+                   NULLIF(NEW.published, ''), NULLIF(NEW.published, '')
+            WHERE NEW.blog_id IS NOT NULL
+            ON CONFLICT(blog_id) DO UPDATE SET
+                post_count = post_count + 1,
+                dated_count = dated_count + excluded.dated_count,
+                first_published = COALESCE(
+                    MIN(first_published, excluded.first_published),
+                    first_published, excluded.first_published),
+                last_published = COALESCE(
+                    MAX(last_published, excluded.last_published),
+                    last_published, excluded.last_published);
+        END;
+    """)
+
+
+def _migrate_tokens(conn):
+    """Add the shared vocabulary and per-post token arrays (hn_intel.tokens).
+
+    A post's tokens are dropped when its title or text changes, when it is
+    deleted other than by archiving (archived posts keep theirs, as they no
+    longer change), and when a new post reuses its ID.
+    """
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS vocab (
+            id INTEGER PRIMARY KEY,
+            token TEXT NOT NULL UNIQUE
+        );
+
+        CREATE TABLE IF NOT EXISTS post_tokens (
+            post_id INTEGER PRIMARY KEY,
+            tokens BLOB NOT NULL
+        );
+
+        CREATE TRIGGER IF NOT EXISTS trg_posts_tokens_insert
+        AFTER INSERT ON posts
+        BEGIN
+            DELETE FROM post_tokens WHERE post_id = NEW.id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_posts_tokens_update
+        AFTER UPDATE OF title, description ON posts
+        WHEN OLD.title IS NOT NEW.title
+            OR hn_decompress(OLD.description) IS NOT hn_decompress(NEW.description)
+        BEGIN
+            DELETE FROM post_tokens WHERE post_id = OLD.id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_posts_tokens_delete
+        AFTER DELETE ON posts
+        WHEN NOT EXISTS (SELECT 1 FROM meta WHERE key = 'archiving')
+        BEGIN
+            DELETE FROM post_tokens WHERE post_id = OLD.id;
+        END;
+    """)
+
+
+def _migrate_term_counts(conn):
+    """Add persisted term counts for the incremental keyword model (hn_intel.tfidf).
+
+    terms holds each n-gram's document frequency and total count, and
+    post_terms each post's counted term IDs. SQL cannot decode the count
+    arrays, so triggers only queue changed posts in stale_post_terms and
+    update_term_counts() subtracts their old counts. Archived posts keep
+    their rows, as with post_tokens.
+    """
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS terms (
+            id INTEGER PRIMARY KEY,
+            term TEXT NOT NULL UNIQUE,
+            df INTEGER NOT NULL DEFAULT 0,
+            tf INTEGER NOT NULL DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS post_terms (
+            post_id INTEGER PRIMARY KEY,
+            published TEXT,
+            term_ids BLOB NOT NULL,
+            counts BLOB NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS stale_post_terms (
+            post_id INTEGER PRIMARY KEY
+        );
+
+        CREATE TRIGGER IF NOT EXISTS trg_posts_terms_insert
+        AFTER INSERT ON posts
+        WHEN EXISTS (SELECT 1 FROM post_terms WHERE post_id = NEW.id)
+        BEGIN
+            INSERT OR IGNORE INTO stale_post_terms (post_id) VALUES (NEW.id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_posts_terms_update
+        AFTER UPDATE OF title, description, published ON posts
+        WHEN OLD.title IS NOT NEW.title
+            OR OLD.published IS NOT NEW.published
+            OR hn_decompress(OLD.description) IS NOT hn_decompress(NEW.description)
+        BEGIN
+            INSERT OR IGNORE INTO stale_post_terms (post_id) VALUES (OLD.id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_posts_terms_delete
+        AFTER DELETE ON posts
+        WHEN NOT EXISTS (SELECT 1 FROM meta WHERE key = 'archiving')
+        BEGIN
+            INSERT OR IGNORE INTO stale_post_terms (post_id) VALUES (OLD.id);
+        END;
+    """)
+
+
+def _migrate_term_sketches(conn):
+    """Add per-period streaming term sketches (hn_intel.sketch).
+
+    One row per trend granularity and period holds the period's post
+    count, its Count-Min counters (zlib-compressed little-endian uint32,
+    depth x width) and its Space-Saving heavy hitters as JSON. Sketches
+    only grow; posts are counted once, by ID watermark.
+    """
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS term_sketches (
+            granularity TEXT NOT NULL,
+            period TEXT NOT NULL,
+            posts INTEGER NOT NULL,
+            counts BLOB NOT NULL,
+            heavy TEXT NOT NULL,
+            PRIMARY KEY (granularity, period)
+        );
+    """)
+
+
+def _migrate_plain_triggers(conn):
+    """Make the description triggers work without hn_decompress().
+
+    The triggers added by _migrate_compression, _migrate_tokens and
+    _migrate_term_counts decoded descriptions in SQL, so updating a post
+    from any connection without register_functions() failed. They now
+    compare stored values, and compress_posts()/decompress_posts() set the
+    'recoding' meta key while they re-encode, as archive_posts() sets
+    'archiving'.
+    """
+    unchanged = (
+        "OLD.description IS NOT NEW.description "
+        "AND NOT EXISTS (SELECT 1 FROM meta WHERE key = 'recoding')"
+    )
+    conn.executescript(f"""
+        DROP TRIGGER IF EXISTS trg_posts_citations_update;
+        CREATE TRIGGER trg_posts_citations_update
+        AFTER UPDATE OF description ON posts
+        WHEN {unchanged}
+        BEGIN
+            DELETE FROM citations WHERE source_post_id = OLD.id;
+            UPDATE meta SET value = MIN(CAST(value AS INTEGER), OLD.id - 1)
+            WHERE key = 'citations_watermark';
+        END;
+
+        DROP TRIGGER IF EXISTS trg_posts_version_description;
+        CREATE TRIGGER trg_posts_version_description
+        AFTER UPDATE OF description ON posts
+        WHEN {unchanged}
+        BEGIN
+            UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'content_version';
+        END;
+
+        DROP TRIGGER IF EXISTS trg_posts_tokens_update;
+        CREATE TRIGGER trg_posts_tokens_update
+        AFTER UPDATE OF title, description ON posts
+        WHEN OLD.title IS NOT NEW.title OR ({unchanged})
+        BEGIN
+            DELETE FROM post_tokens WHERE post_id = OLD.id;
+        END;
+
+        DROP TRIGGER IF EXISTS trg_posts_terms_update;
+        CREATE TRIGGER trg_posts_terms_update
+        AFTER UPDATE OF title, description, published ON posts
+        WHEN OLD.title IS NOT NEW.title
+            OR OLD.published IS NOT NEW.published
+            OR ({unchanged})
+        BEGIN
+            INSERT OR IGNORE INTO stale_post_terms (post_id) VALUES (OLD.id);
+        END;
+    """)
+
+
+def _migrate_citations_rowid_reuse(conn):
+    """Rescan posts that reuse the rowid of a deleted post.
+
+    posts.id is a plain INTEGER PRIMARY KEY, so deleting the newest post
+    frees its ID for the next insert. Such a post lands at or below the
+    citation watermark, so the trigger rewinds the watermark to just
+    below it.
+    """
+    conn.executescript("""
+        CREATE TRIGGER IF NOT EXISTS trg_posts_citations_insert
+        AFTER INSERT ON posts
+        BEGIN
+            UPDATE meta SET value = NEW.id - 1
+            WHERE key = 'citations_watermark' AND CAST(value AS INTEGER) >= NEW.id;
+        END;
     """)
 
 
+def _migrate_strip_html_tokens(conn):
+    """Re-tokenize posts after strip_html() began dropping script/style text.
+
+    Token arrays and term counts stored by the earlier strip_html() may
+    hold script and style contents, so they are cleared and rebuilt on
+    the next run. Term rows keep their IDs, so a frozen keyword vocabulary
+    still resolves; content_version is bumped to invalidate artifacts
+    derived from the old text.
+    """
+    conn.executescript("""
+        DELETE FROM post_tokens;
+        DELETE FROM post_terms;
+        DELETE FROM stale_post_terms;
+        UPDATE terms SET df = 0, tf = 0;
+        UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'content_version';
+    """)
+
+
+# Schema migrations applied in order by init_db(). PRAGMA user_version
+# records how many have run, so append new steps and never reorder.
+_MIGRATIONS = [
+    _migrate_citations_unique,
+    _migrate_artifacts,
+    _migrate_blog_stats,
+    _migrate_canonical_url,
+    _migrate_compression,
+    _migrate_archives,
+    _migrate_tokens,
+    _migrate_term_counts,
+    _migrate_term_sketches,
+    _migrate_plain_triggers,
+    _migrate_citations_rowid_reuse,
+    _migrate_strip_html_tokens,
+]
+
+
+def needs_migration(conn):
+    """Return True if init_db() still has schema changes to apply to conn."""
+    return conn.execute("PRAGMA user_version").fetchone()[0] < len(_MIGRATIONS)
+
+
+def _migrate(conn):
+    """Apply any migrations newer than the database's user_version."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target, migration in enumerate(_MIGRATIONS[version:], start=version + 1):
+        migration(conn)
+        conn.execute(f"PRAGMA user_version={target}")
+        conn.commit()
+
+
+def get_meta(conn, key, default=None):
+    """Read a value from the meta key/value table.
+
+    Args:
+        conn: sqlite3.Connection instance.
+        key: Meta key, e.g. 'citations_watermark'.
+        default: Returned when the key is absent.
+
+    Returns:
+        The stored string value, or default.
+    """
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return default if row is None else row[0]
+
+
+def set_meta(conn, key, value):
+    """Store a value in the meta key/value table (caller commits).
+
+    Args:
+        conn: sqlite3.Connection instance.
+        key: Meta key.
+        value: Value to store; converted to a string.
+    """
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES (?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, str(value)),
+    )
+
+
 def upsert_blogs(conn, blogs):
     """Insert blogs, ignoring duplicates by feed_url.
 
@@ -77,8 +901,54 @@ def upsert_blogs(conn, blogs):
     conn.commit()
 
 
+def canonicalize_url(url):
+    """Normalize a post URL so syndicated copies of one article compare equal.
+
+    Lower-cases the scheme and host, maps http to https, drops a leading
+    "www.", default ports, the fragment, utm_* and other click-tracking
+    query parameters, and any trailing slash on the path.
+
+    Args:
+        url: Post URL as found in the feed.
+
+    Returns:
+        Canonical URL string.
+    """
+    if not url:
+        return url
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme == "http":
+        scheme = "https"
+    host = (parts.hostname or "").rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+    path = parts.path.rstrip("/")
+    query = parts.query
+    if query:
+        query = urlencode([
+            (k, v) for k, v in parse_qsl(query, keep_blank_values=True)
+            if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS
+        ])
+    return urlunsplit((scheme, host, path, query, ""))
+
+
 def insert_post(conn, blog_id, entry):
-    """Insert a single post, returning False if URL already exists.
+    """Insert a single post, returning False if it is already stored.
+
+    When compression is enabled (see compress_posts) large descriptions
+    are stored compressed. A post is a duplicate when its URL, or its canonical form (see
+    canonicalize_url), matches an existing post; the unique indexes turn
+    that into a single lookup and the row is skipped.
 
     Args:
         conn: sqlite3.Connection instance.
@@ -88,39 +958,438 @@ def insert_post(conn, blog_id, entry):
     Returns:
         True if inserted, False if duplicate URL.
     """
-    try:
+    canonical = canonicalize_url(entry["url"])
+    cursor = conn.execute(
+        "INSERT OR IGNORE INTO posts "
+        "(blog_id, title, description, url, published, author, canonical_url) "
+        "SELECT ?, ?, ?, ?, ?, ?, ? "
+        "WHERE NOT EXISTS (SELECT 1 FROM archived_urls WHERE canonical_url = ?)",
+        (
+            blog_id,
+            entry.get("title", ""),
+            _encode_description(conn, entry.get("description", "")),
+            entry["url"],
+            entry.get("published", ""),
+            entry.get("author", ""),
+            canonical,
+            canonical,
+        ),
+    )
+    conn.commit()
+    return cursor.rowcount == 1
+
+
+def _encode_description(conn, description):
+    """Compress description if compression is enabled and it is large enough."""
+    if not description or len(description) < COMPRESS_MIN_BYTES:
+        return description
+    dict_id = get_meta(conn, "compression_dict")
+    if dict_id is None:
+        return description
+    row = conn.execute(
+        "SELECT data FROM compression_dicts WHERE id = ?", (int(dict_id),)
+    ).fetchone()
+    return compression.compress(description, row[0] if row else b"", int(dict_id))
+
+
+def compress_posts(conn, min_bytes=COMPRESS_MIN_BYTES, sample_size=2000):
+    """Enable description compression and compress existing posts.
+
+    Trains a preset dictionary on a random sample of plain-text
+    descriptions, stores it in compression_dicts and records it in the
+    'compression_dict' meta key so insert_post() compresses new posts too.
+    Already-compressed rows keep their original dictionary.
+
+    Args:
+        conn: sqlite3.Connection instance.
+        min_bytes: Leave descriptions shorter than this uncompressed.
+        sample_size: Number of descriptions used to train the dictionary.
+
+    Returns:
+        Number of posts compressed.
+    """
+    rows = conn.execute(
+        "SELECT id, description FROM posts "
+        "WHERE typeof(description) = 'text' AND length(description) >= ?",
+        (min_bytes,),
+    ).fetchall()
+    samples = random.Random(0).sample(
+        [row[1] for row in rows], min(sample_size, len(rows))
+    )
+    zdict = compression.train_dictionary(samples)
+    dict_id = conn.execute(
+        "INSERT INTO compression_dicts (data, created) VALUES (?, datetime('now'))",
+        (zdict,),
+    ).lastrowid
+
+    set_meta(conn, "recoding", 1)
+    conn.executemany(
+        "UPDATE posts SET description = ? WHERE id = ?",
+        [(compression.compress(row[1], zdict, dict_id), row[0]) for row in rows],
+    )
+    conn.execute("DELETE FROM meta WHERE key = 'recoding'")
+    set_meta(conn, "compression_dict", dict_id)
+    conn.commit()
+    return len(rows)
+
+
+def decompress_posts(conn):
+    """Disable description compression and restore every post to plain text.
+
+    Args:
+        conn: sqlite3.Connection instance.
+
+    Returns:
+        Number of posts decompressed.
+    """
+    set_meta(conn, "recoding", 1)
+    count = conn.execute(
+        "UPDATE posts SET description = hn_decompress(description) "
+        "WHERE typeof(description) = 'blob'"
+    ).rowcount
+    conn.execute("DELETE FROM meta WHERE key IN ('recoding', 'compression_dict')")
+    conn.commit()
+    return count
+
+
+def database_size(conn):
+    """Return the number of bytes used by the database's live pages."""
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return (page_count - free_pages) * page_size
+
+
+# Post columns as returned by the read APIs, with descriptions decoded.
+_POST_COLUMNS = (
+    "p.id, p.blog_id, p.title, hn_decompress(p.description) AS description, "
+    "p.url, p.published, p.author, p.canonical_url"
+)
+
+
+# Post columns stored in archive databases, in order.
+_ARCHIVE_POST_COLUMNS = "id, blog_id, title, description, url, published, author, canonical_url"
+_ARCHIVE_CITATION_COLUMNS = "id, source_post_id, source_blog_id, target_blog_id, target_url"
+_ARCHIVE_FILE_RE = re.compile(r"posts_(\d{4})(?:-(\d{4}))?\.db")
+_ARCHIVE_SCHEMA_RE = re.compile(r"archive_(\d{4})(?:_(\d{4}))?")
+
+# SQLite attaches at most 10 databases to a connection, so archive_posts()
+# rolls the oldest years into one posts_<first>-<last>.db file beyond this.
+MAX_ARCHIVE_FILES = 8
+
+
+def archive_posts(conn, horizon_days=730, archive_dir=None):
+    """Move dated posts older than the horizon into per-year archive files.
+
+    Each year goes to ``<archive_dir>/posts_<year>.db`` together with the
+    citations made by its posts. Once there are more than
+    MAX_ARCHIVE_FILES files, the oldest years are rolled into a single
+    ``posts_<first>-<last>.db``, so every archive can stay attached. The
+    hot database keeps the blogs, the blog_stats totals (which still count
+    archived posts) and each archived canonical URL, so re-fetched posts
+    stay rejected. Posts without a date stay hot.
+
+    Args:
+        conn: sqlite3.Connection instance with no open transaction.
+        horizon_days: Posts published more than this many days ago move.
+        archive_dir: Directory for archive files. Defaults to the value
+            used last time, else an ``archive`` directory next to the
+            database file.
+
+    Returns:
+        Dict mapping year string to number of posts archived.
+    """
+    archive_dir = archive_dir or get_meta(conn, "archive_dir")
+    if archive_dir is None:
+        main_file = conn.execute("PRAGMA database_list").fetchone()[2]
+        if not main_file:
+            raise ValueError("archive_dir is required for an in-memory database")
+        archive_dir = os.path.join(os.path.dirname(main_file), "archive")
+    archive_dir = os.path.abspath(archive_dir)
+    os.makedirs(archive_dir, exist_ok=True)
+
+    cutoff = (date.today() - timedelta(days=horizon_days)).isoformat()
+    conn.commit()
+    years = [row[0] for row in conn.execute(
+        "SELECT DISTINCT substr(published, 1, 4) FROM posts "
+        "WHERE published != '' AND published < ? ORDER BY 1",
+        (cutoff,),
+    )]
+
+    moved = {}
+    old = "published != '' AND published < ? AND substr(published, 1, 4) = ?"
+    for year in years:
+        # A year already rolled into a range file keeps going there
+        name = next((name for first, last, name in _archive_files(archive_dir)
+                     if first <= year <= last), f"posts_{year}.db")
+        schema = _attach_archive(conn, os.path.join(archive_dir, name))
+        _create_archive_tables(conn, schema)
+        args = (cutoff, year)
+        conn.execute(
+            f"INSERT OR IGNORE INTO {schema}.posts ({_ARCHIVE_POST_COLUMNS}) "
+            f"SELECT {_ARCHIVE_POST_COLUMNS} FROM main.posts WHERE {old}", args,
+        )
         conn.execute(
-            "INSERT INTO posts (blog_id, title, description, url, published, author) "
-            "VALUES (?, ?, ?, ?, ?, ?)",
-            (
-                blog_id,
-                entry.get("title", ""),
-                entry.get("description", ""),
-                entry["url"],
-                entry.get("published", ""),
-                entry.get("author", ""),
-            ),
+            f"INSERT OR IGNORE INTO {schema}.citations ({_ARCHIVE_CITATION_COLUMNS}) "
+            f"SELECT {_ARCHIVE_CITATION_COLUMNS} FROM main.citations WHERE source_post_id IN "
+            f"(SELECT id FROM main.posts WHERE {old})", args,
         )
+        conn.execute(
+            "INSERT OR IGNORE INTO archived_urls (canonical_url) "
+            f"SELECT canonical_url FROM main.posts WHERE {old}", args,
+        )
+        set_meta(conn, "archiving", 1)
+        moved[year] = conn.execute(f"DELETE FROM main.posts WHERE {old}", args).rowcount
+        conn.execute("DELETE FROM meta WHERE key = 'archiving'")
         conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        return False
+        conn.execute(f"DETACH DATABASE {schema}")
+
+    _roll_up_archives(conn, archive_dir)
+    horizon = get_meta(conn, "archive_horizon")
+    set_meta(conn, "archive_dir", archive_dir)
+    set_meta(conn, "archive_horizon", max(cutoff, horizon or ""))
+    conn.commit()
+    return moved
+
+
+def _create_archive_tables(conn, schema):
+    conn.executescript(f"""
+        CREATE TABLE IF NOT EXISTS {schema}.posts (
+            id INTEGER PRIMARY KEY, blog_id INTEGER, title TEXT, description TEXT,
+            url TEXT, published TEXT, author TEXT, canonical_url TEXT
+        );
+        CREATE INDEX IF NOT EXISTS {schema}.idx_posts_published ON posts(published);
+        CREATE TABLE IF NOT EXISTS {schema}.citations (
+            id INTEGER PRIMARY KEY, source_post_id INTEGER, source_blog_id INTEGER,
+            target_blog_id INTEGER, target_url TEXT
+        );
+    """)
+
+
+def _archive_files(archive_dir, covered=False):
+    """List the archive files in archive_dir, oldest years first.
+
+    Args:
+        archive_dir: Archive directory.
+        covered: Also list files whose years a wider file already holds
+            (left behind when a roll-up was interrupted); readers skip them.
+
+    Returns:
+        List of (first_year, last_year, file_name) tuples.
+    """
+    files = []
+    for name in os.listdir(archive_dir):
+        match = _ARCHIVE_FILE_RE.fullmatch(name)
+        if match is not None:
+            files.append((match.group(1), match.group(2) or match.group(1), name))
+    # Widest file first among those starting the same year
+    files.sort(key=lambda f: (f[0], -int(f[1])))
+    if covered:
+        return files
+    kept = []
+    for first, last, name in files:
+        if not kept or first > kept[-1][1]:
+            kept.append((first, last, name))
+    return kept
+
+
+def _roll_up_archives(conn, archive_dir):
+    """Merge the oldest archive files until at most MAX_ARCHIVE_FILES remain.
+
+    The merged file is written under a temporary name and moved into place
+    before its sources are removed, so an interrupted roll-up leaves
+    either the old files or a range file that covers them.
+    """
+    _detach_archives(conn)
+    files = _archive_files(archive_dir)
+    covered = [name for _, _, name in _archive_files(archive_dir, covered=True)
+               if name not in {f[2] for f in files}]
+    if len(files) > MAX_ARCHIVE_FILES:
+        merge = files[:len(files) - MAX_ARCHIVE_FILES + 1]
+        target = os.path.join(archive_dir, f"posts_{merge[0][0]}-{merge[-1][1]}.db")
+        tmp = target + ".tmp"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        conn.execute("ATTACH DATABASE ? AS archive_rollup", (tmp,))
+        try:
+            _create_archive_tables(conn, "archive_rollup")
+            for _, _, name in merge:
+                conn.execute("ATTACH DATABASE ? AS archive_source",
+                             (os.path.join(archive_dir, name),))
+                try:
+                    for table, columns in (("posts", _ARCHIVE_POST_COLUMNS),
+                                           ("citations", _ARCHIVE_CITATION_COLUMNS)):
+                        conn.execute(
+                            f"INSERT OR IGNORE INTO archive_rollup.{table} ({columns}) "
+                            f"SELECT {columns} FROM archive_source.{table}"
+                        )
+                    conn.commit()
+                finally:
+                    conn.execute("DETACH DATABASE archive_source")
+        finally:
+            conn.execute("DETACH DATABASE archive_rollup")
+        os.replace(tmp, target)
+        covered.extend(name for _, _, name in merge)
+    for name in covered:
+        os.remove(os.path.join(archive_dir, name))
+
+
+def _archive_schema(name):
+    """Schema name for an archive file: archive_<year> or archive_<first>_<last>."""
+    match = _ARCHIVE_FILE_RE.fullmatch(name)
+    first, last = match.group(1), match.group(2)
+    return f"archive_{first}_{last}" if last else f"archive_{first}"
 
 
-def get_all_posts(conn):
+def _attached_archives(conn):
+    """Return the archive schemas attached to conn, oldest year first."""
+    return sorted(row[1] for row in conn.execute("PRAGMA database_list")
+                  if _ARCHIVE_SCHEMA_RE.fullmatch(row[1]))
+
+
+def _detach_archives(conn, keep=()):
+    for schema in _attached_archives(conn):
+        if schema not in keep:
+            conn.execute(f"DETACH DATABASE {schema}")
+
+
+def _attach_archive(conn, path):
+    """ATTACH an archive file under its schema name unless already attached."""
+    schema = _archive_schema(os.path.basename(path))
+    attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+    if schema not in attached:
+        conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+    return schema
+
+
+def attach_archives(conn, since=None):
+    """ATTACH the archive databases a date window needs.
+
+    Archives stay attached for the connection's lifetime. Nothing is
+    attached when no archive exists or since is at or after the archive
+    horizon, so recent-window queries only ever touch the hot database.
+    archive_posts() keeps at most MAX_ARCHIVE_FILES files, within SQLite's
+    limit of 10 attached databases; archives rolled up since they were
+    attached are detached again.
+
+    Args:
+        conn: sqlite3.Connection instance (outside a transaction, unless
+            the archives are already attached).
+        since: ISO date; archives holding only older years are skipped.
+            None needs every archive.
+
+    Returns:
+        List of attached schema names, oldest year first.
+    """
+    archive_dir = get_meta(conn, "archive_dir")
+    horizon = get_meta(conn, "archive_horizon")
+    if archive_dir is None or not os.path.isdir(archive_dir):
+        return []
+    if since is not None and horizon is not None and since >= horizon:
+        return []
+
+    files = _archive_files(archive_dir)
+    if not conn.in_transaction:
+        _detach_archives(conn, keep={_archive_schema(name) for _, _, name in files})
+
+    schemas = []
+    for _, last, name in files:
+        if since is not None and last < since[:4]:
+            continue
+        schemas.append(_attach_archive(conn, os.path.join(archive_dir, name)))
+    return schemas
+
+
+def get_all_posts(conn, since=None):
     """Return all posts with the blog name joined.
 
+    Compressed descriptions are decoded transparently, and posts moved to
+    archive databases by archive_posts() are included (ordered by post ID,
+    as before archiving) when the date window reaches them.
+
     Args:
         conn: sqlite3.Connection instance.
+        since: Optional ISO date. Archived posts published before it are
+            skipped and their archives never attached. Hot posts are always
+            returned, whatever their date.
 
     Returns:
         List of sqlite3.Row objects.
     """
-    return conn.execute(
-        "SELECT p.*, b.name AS blog_name "
+    rows = conn.execute(
+        f"SELECT {_POST_COLUMNS}, b.name AS blog_name "
         "FROM posts p JOIN blogs b ON p.blog_id = b.id"
     ).fetchall()
 
+    schemas = attach_archives(conn, since)
+    for schema in schemas:
+        rows.extend(conn.execute(
+            f"SELECT {_POST_COLUMNS}, b.name AS blog_name "
+            f"FROM {schema}.posts p JOIN main.blogs b ON p.blog_id = b.id "
+            "WHERE p.published >= ?",
+            (since or "",),
+        ).fetchall())
+    if schemas:
+        rows.sort(key=lambda row: row["id"])
+    return rows
+
+
+def get_post_blogs(conn):
+    """Return the blog name of every post, archived ones included.
+
+    Args:
+        conn: sqlite3.Connection instance.
+
+    Returns:
+        Dict mapping post ID to blog name.
+    """
+    query = "SELECT p.id, b.name FROM {}posts p JOIN main.blogs b ON p.blog_id = b.id"
+    blogs = dict(conn.execute(query.format("main.")))
+    for schema in attach_archives(conn):
+        blogs.update(conn.execute(query.format(f"{schema}.")))
+    return blogs
+
+
+def get_citation_edges(conn):
+    """Return citation counts per (source blog, target blog) pair.
+
+    Includes citations moved to archive databases with their posts.
+
+    Args:
+        conn: sqlite3.Connection instance.
+
+    Returns:
+        List of (source_blog_id, target_blog_id, weight) tuples.
+    """
+    sources = ["SELECT source_blog_id, target_blog_id FROM main.citations"]
+    for schema in attach_archives(conn):
+        sources.append(f"SELECT source_blog_id, target_blog_id FROM {schema}.citations")
+    return [tuple(row) for row in conn.execute(
+        "SELECT source_blog_id, target_blog_id, COUNT(*) AS weight FROM ("
+        + " UNION ALL ".join(sources)
+        + ") GROUP BY source_blog_id, target_blog_id"
+    )]
+
+
+def get_posts_since(conn, post_id):
+    """Return posts with an ID greater than post_id, with blog name joined.
+
+    Reads the hot database only; archived posts are never new.
+
+    Args:
+        conn: sqlite3.Connection instance.
+        post_id: Exclusive lower bound on posts.id (0 for all posts).
+
+    Returns:
+        List of sqlite3.Row objects ordered by post ID.
+    """
+    return conn.execute(
+        f"SELECT {_POST_COLUMNS}, b.name AS blog_name "
+        "FROM posts p JOIN blogs b ON p.blog_id = b.id "
+        "WHERE p.id > ? ORDER BY p.id",
+        (post_id,),
+    ).fetchall()
+
 
 def get_blog_domains(conn):
     """Build a mapping of domain -> blog_id from site_url.
@@ -144,6 +1413,54 @@ def get_blog_domains(conn):
     return domains
 
 
+def get_blog_stats(conn):
+    """Return trigger-maintained per-blog statistics.
+
+    Reads the blog_stats table, so the cost is O(blogs) regardless of how
+    many posts are stored. avg_cadence_days is the mean gap in days between
+    a blog's first and last dated posts (None with fewer than two).
+
+    Args:
+        conn: sqlite3.Connection instance.
+
+    Returns:
+        List of sqlite3.Row objects with keys: blog_id, blog_name,
+        post_count, first_published, last_published, avg_cadence_days.
+    """
+    return conn.execute(
+        "SELECT s.blog_id, b.name AS blog_name, s.post_count, "
+        "s.first_published, s.last_published, "
+        "CASE WHEN s.dated_count > 1 THEN "
+        "(julianday(s.last_published) - julianday(s.first_published)) / (s.dated_count - 1) "
+        "END AS avg_cadence_days "
+        "FROM blog_stats s JOIN blogs b ON s.blog_id = b.id "
+        "WHERE s.post_count > 0 ORDER BY s.blog_id"
+    ).fetchall()
+
+
+def get_corpus_summary(conn):
+    """Return corpus-wide counts and date range from the blog_stats table.
+
+    Args:
+        conn: sqlite3.Connection instance.
+
+    Returns:
+        Dict with keys: blogs, posts, first_published, last_published.
+        Dates are None when no post has one.
+    """
+    blogs = conn.execute("SELECT COUNT(*) FROM blogs").fetchone()[0]
+    row = conn.execute(
+        "SELECT COALESCE(SUM(post_count), 0), MIN(first_published), MAX(last_published) "
+        "FROM blog_stats"
+    ).fetchone()
+    return {
+        "blogs": blogs,
+        "posts": row[0],
+        "first_published": row[1],
+        "last_published": row[2],
+    }
+
+
 def get_blogs(conn):
     """Return all blogs.
 
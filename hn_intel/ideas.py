@@ -1,6 +1,5 @@
 """Surface high-impact project ideas from HN blog pain signals."""
 
-import html
 import math
 import re
 from collections import defaultdict
@@ -10,7 +9,9 @@ from sklearn.cluster import AgglomerativeClustering
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
-from hn_intel.db import get_all_posts
+from hn_intel.db import get_all_posts, is_read_only
+from hn_intel.text import strip_html
+from hn_intel.tokens import TokenAnalyzer, tokenize
 
 # ── Pain-trigger stop words (excluded from TF-IDF to keep labels meaningful) ─
 
@@ -104,13 +105,6 @@ _PAIN_PATTERNS = {
 _SENTENCE_RE = re.compile(r"[^.!?\n]+[.!?\n]?")
 
 
-def _strip_html(text):
-    """Remove HTML tags and decode entities."""
-    text = re.sub(r"<[^>]+>", " ", text or "")
-    text = html.unescape(text)
-    return text.strip()
-
-
 def _extract_sentence(text, match_start, match_end):
     """Extract the sentence surrounding a regex match.
 
@@ -178,14 +172,15 @@ def extract_pain_signals(conn, max_age_days=365):
         post_title, post_url, published, signal_text, signal_type,
         signal_context, signal_location.
     """
-    posts = get_all_posts(conn)
+    today = date.today()
+    cutoff = today - timedelta(days=max_age_days)
+
+    # Archives older than the cutoff are never attached
+    posts = get_all_posts(conn, since=cutoff.isoformat())
     signals = []
     # Track (post_url, signal_type) → longest signal_text to deduplicate
     seen = {}
 
-    today = date.today()
-    cutoff = today - timedelta(days=max_age_days)
-
     for post in posts:
         # Skip posts older than cutoff
         pub = post["published"] or ""
@@ -197,7 +192,7 @@ def extract_pain_signals(conn, max_age_days=365):
             except (ValueError, IndexError):
                 pass  # keep posts with unparseable dates
         title = post["title"] or ""
-        description = _strip_html(post["description"])
+        description = strip_html(post["description"])
         full_text = title + ". " + description
         title_len = len(title) + 2  # account for ". " separator
 
@@ -259,7 +254,7 @@ def extract_signal_keywords(signals, max_features=200):
     # Combine post title (weighted 2x) with signal text so clustering
     # groups by topic rather than just pain expression similarity
     documents = [
-        "{t} {t} {s}".format(t=s.get("post_title", ""), s=s["signal_text"])
+        tokenize(s.get("post_title", "")) * 2 + tokenize(s["signal_text"])
         for s in signals
     ]
     min_df = min(2, len(documents))
@@ -269,12 +264,10 @@ def extract_signal_keywords(signals, max_features=200):
     combined_stop_words = list(ENGLISH_STOP_WORDS) + _PAIN_STOP_WORDS
 
     vectorizer = TfidfVectorizer(
+        analyzer=TokenAnalyzer(combined_stop_words, ngram_range=(1, 2)),
         max_features=max_features,
-        stop_words=combined_stop_words,
         min_df=min_df,
         max_df=0.8,
-        ngram_range=(1, 2),
-        token_pattern=r"(?u)\b[a-zA-Z][a-zA-Z0-9]{2,}\b",
     )
     matrix = vectorizer.fit_transform(documents)
     return vectorizer, matrix
@@ -652,7 +645,9 @@ def _make_idea(idea_id, members, feature_names, indices, matrix=None):
     }
 
 
-def generate_ideas(conn, max_features=500, period="month", top_n=20, max_age_days=365):
+def generate_ideas(conn, max_features=500, period="month", top_n=20, max_age_days=365,
+                   use_cache=False, model=None, centrality=None,
+                   centrality_backend="networkx"):
     """Orchestrate the full ideas pipeline.
 
     1. Extract pain signals from posts
@@ -660,30 +655,53 @@ def generate_ideas(conn, max_features=500, period="month", top_n=20, max_age_day
     3. Score, cluster, and rank signals into project ideas
 
     Args:
-        conn: sqlite3.Connection instance.
+        conn: sqlite3.Connection instance. New citations are extracted
+            first unless it is read-only.
         max_features: Max TF-IDF features for trend analysis.
         period: 'month' or 'week' for trend bucketing.
         top_n: Maximum number of ideas to return.
         max_age_days: Skip posts older than this many days.
+        use_cache: Reuse trend and centrality artifacts cached for the
+            current corpus version (see hn_intel.cache).
+        model: analyzer.KeywordModel to compute trends from; fitted here
+            with max_features when None and the trends are not cached.
+        centrality: Blog centrality dict already computed by the caller;
+            when None it is computed (or loaded from the cache) with
+            network.compute_network(conn, centrality_backend).
+        centrality_backend: One of network.CENTRALITY_BACKENDS.
 
     Returns:
         List of idea dicts sorted by impact_score descending.
     """
     from hn_intel.analyzer import compute_trends, detect_emerging_topics
-    from hn_intel.network import extract_citations, build_citation_graph, compute_centrality
+    from hn_intel.cache import cached
+    from hn_intel.network import compute_network, extract_citations, network_params
 
     # Step 1: extract pain signals
     signals = extract_pain_signals(conn, max_age_days=max_age_days)
     if not signals:
         return []
 
-    # Step 2: get trend and authority data
-    trends = compute_trends(conn, period=period)
-    emerging = detect_emerging_topics(trends)
-
-    extract_citations(conn)
-    graph = build_citation_graph(conn)
-    centrality = compute_centrality(graph)
+    # Step 2: get trend and authority data (same artifacts as the CLI stages)
+    trends_params = {"period": period, "max_features": max_features}
+    if model is not None:
+        trends_params["max_features"] = max_features = model.max_features
+        if model.mode == "sharded":
+            trends_params["sharded"] = True
+        elif model.mode:
+            trends_params["incremental"] = model.mode
+
+    def trends_stage():
+        trends = compute_trends(conn, period=period, model=model, max_features=max_features)
+        return trends, detect_emerging_topics(trends)
+
+    trends, emerging = cached(conn, "trends", trends_params, trends_stage, use_cache)
+
+    if centrality is None:
+        if not is_read_only(conn):
+            extract_citations(conn)
+        _, centrality = cached(conn, "network", network_params(centrality_backend),
+                               lambda: compute_network(conn, centrality_backend), use_cache)
 
     # Step 3: vectorize signals
     vectorizer, matrix = extract_signal_keywords(signals, max_features=min(200, max_features))
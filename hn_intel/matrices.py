@@ -0,0 +1,190 @@
+"""TF-IDF matrices persisted as memory-mapped CSR arrays.
+
+save_matrix() writes a CSR matrix as three .npy files (data, indices,
+indptr), plus one .npy file per row-label array, and a vocabulary file
+(<name>.vocab.json) holding the shape, column names, corpus version and
+parameters. open_matrix() maps the arrays read-only with np.load(...,
+mmap_mode="r"), so opening costs milliseconds whatever the matrix size,
+and processes that open the same files share their pages through the OS
+page cache instead of each holding a copy.
+
+Files are replaced through os.replace(), never rewritten in place, so
+processes that still map an older matrix keep reading it safely. The
+vocabulary file is written last: a matrix without one is not readable.
+
+The post x term keyword model and the blog x term vectors are stored as
+"posts" and "blogs"; load_or_fit_keyword_model() and
+load_or_compute_blog_vectors() reuse them while the corpus is unchanged.
+"""
+
+import json
+import os
+
+import numpy as np
+import scipy.sparse as sp
+
+from hn_intel.analyzer import KeywordModel
+from hn_intel.cache import corpus_version
+from hn_intel.clusters import compute_blog_vectors
+
+_ARRAYS = ("data", "indices", "indptr")
+
+
+def _path(directory, name, part):
+    return os.path.join(directory, f"{name}.{part}")
+
+
+def _save_array(path, array):
+    """Write an .npy file next to path and move it into place."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, array, allow_pickle=False)
+    os.replace(tmp, path)
+
+
+class StoredMatrix:
+    """A matrix opened by open_matrix().
+
+    Attributes:
+        matrix: Read-only CSR matrix backed by the memory-mapped arrays.
+        vocabulary: Object array with the name of each column.
+        rows: Dict mapping each row-label name to a list.
+        version: Corpus version the matrix was saved for, or None.
+        params: Dict of parameters it was computed with.
+    """
+
+    def __init__(self, matrix, vocabulary, rows, version, params):
+        self.matrix = matrix
+        self.vocabulary = vocabulary
+        self.rows = rows
+        self.version = version
+        self.params = params
+
+    def get_feature_names_out(self):
+        """Column names, so a StoredMatrix can stand in for a fitted vectorizer."""
+        return self.vocabulary
+
+
+def save_matrix(directory, name, matrix, vocabulary, rows=None, version=None, params=None):
+    """Save a sparse matrix as memory-mappable CSR arrays and a vocabulary file.
+
+    Args:
+        directory: Output directory, created if missing.
+        name: Base name of the files.
+        matrix: Sparse matrix; converted to CSR with sorted indices.
+        vocabulary: Name of each column.
+        rows: Optional dict mapping a label name to one value per row
+            (numbers or strings).
+        version: Corpus version to record, checked by open_matrix().
+        params: JSON-serializable dict of parameters to record.
+    """
+    os.makedirs(directory, exist_ok=True)
+    vocab_path = _path(directory, name, "vocab.json")
+    if os.path.exists(vocab_path):
+        os.remove(vocab_path)
+
+    matrix = sp.csr_matrix(matrix)
+    matrix.sort_indices()
+    for part in _ARRAYS:
+        _save_array(_path(directory, name, f"{part}.npy"), getattr(matrix, part))
+    rows = rows or {}
+    for label, values in rows.items():
+        values = np.asarray(values)
+        if values.dtype == object:
+            values = values.astype(str)
+        _save_array(_path(directory, name, f"{label}.npy"), values)
+
+    tmp = vocab_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({
+            "shape": list(matrix.shape),
+            "vocabulary": [str(term) for term in vocabulary],
+            "rows": sorted(rows),
+            "version": version,
+            "params": params or {},
+        }, f)
+    os.replace(tmp, vocab_path)
+
+
+def open_matrix(directory, name, version=None, params=None):
+    """Open a matrix saved by save_matrix() without reading its arrays.
+
+    Args:
+        directory: Directory the matrix was saved in.
+        name: Base name of the files.
+        version: When given, the stored corpus version must match.
+        params: When given, the stored parameters must match.
+
+    Returns:
+        StoredMatrix, or None if there is no such matrix or it is stale.
+    """
+    vocab_path = _path(directory, name, "vocab.json")
+    if not os.path.exists(vocab_path):
+        return None
+    with open(vocab_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    if version is not None and meta["version"] != version:
+        return None
+    if params is not None and meta["params"] != params:
+        return None
+
+    arrays = [np.load(_path(directory, name, f"{part}.npy"), mmap_mode="r") for part in _ARRAYS]
+    matrix = sp.csr_matrix(tuple(arrays), shape=tuple(meta["shape"]), copy=False)
+    rows = {
+        label: np.load(_path(directory, name, f"{label}.npy"), mmap_mode="r").tolist()
+        for label in meta["rows"]
+    }
+    return StoredMatrix(matrix, np.array(meta["vocabulary"], dtype=object), rows,
+                        meta["version"], meta["params"])
+
+
+def load_or_fit_keyword_model(conn, directory, max_features=500, jobs=1):
+    """Open the stored post x term keyword model, fitting and saving it if stale.
+
+    Args:
+        conn: sqlite3.Connection instance.
+        directory: Matrix directory.
+        max_features: Vocabulary cap, as for KeywordModel.fit().
+        jobs: Worker processes for fitting (see tokens.fit_vectorizer()).
+
+    Returns:
+        analyzer.KeywordModel. An opened model has vectorizer None and a
+        memory-mapped matrix; an empty corpus is fitted but not saved.
+    """
+    version = corpus_version(conn)
+    params = {"max_features": max_features}
+    stored = open_matrix(directory, "posts", version, params)
+    if stored is not None:
+        return KeywordModel(
+            None, stored.matrix, stored.rows["post_ids"], stored.rows["published"],
+            max_features, feature_names=stored.vocabulary,
+        )
+
+    model = KeywordModel.fit(conn, max_features=max_features, jobs=jobs)
+    if model.matrix is not None:
+        save_matrix(directory, "posts", model.matrix, model.feature_names,
+                    rows={"post_ids": np.array(model.post_ids, dtype=np.int64),
+                          "published": [p or "" for p in model.published]},
+                    version=version, params=params)
+    return model
+
+
+def load_or_compute_blog_vectors(conn, directory, max_features=500, jobs=1):
+    """Open the stored blog x term vectors, computing and saving them if stale.
+
+    Returns:
+        Tuple of (tfidf_matrix, blog_names, vectorizer) as
+        clusters.compute_blog_vectors() returns; when opened, vectorizer
+        is the StoredMatrix, which provides get_feature_names_out().
+    """
+    version = corpus_version(conn)
+    params = {"max_features": max_features}
+    stored = open_matrix(directory, "blogs", version, params)
+    if stored is not None:
+        return stored.matrix, stored.rows["blog_names"], stored
+
+    matrix, blog_names, vectorizer = compute_blog_vectors(conn, max_features=max_features,
+                                                          jobs=jobs)
+    save_matrix(directory, "blogs", matrix, vectorizer.get_feature_names_out(),
+                rows={"blog_names": blog_names}, version=version, params=params)
+    return matrix, blog_names, vectorizer
@@ -1,17 +1,31 @@
 """Network analysis for cross-blog citations."""
 
+import hashlib
 import re
 from urllib.parse import urlparse
 
 import networkx as nx
-
-from hn_intel.db import get_all_posts, get_blog_domains, get_blogs
+import numpy as np
+import scipy.sparse as sp
+
+from hn_intel.db import (
+    get_blog_domains,
+    get_blogs,
+    get_citation_edges,
+    get_meta,
+    get_posts_since,
+    set_meta,
+)
 
 # Shared hosting platforms where subdomain identifies the blog
 _SHARED_PLATFORMS = {"blogspot.com", "substack.com", "github.io", "dreamwidth.org"}
 
 _HREF_RE = re.compile(r'href=["\']([^"\']+)["\']', re.IGNORECASE)
 
+# Centrality backends of compute_network(): exact networkx metrics, or
+# sparse-matrix PageRank with sampled betweenness on large graphs.
+CENTRALITY_BACKENDS = ("networkx", "sparse")
+
 
 def _normalize_domain(domain):
     """Normalize a domain for matching.
@@ -87,23 +101,43 @@ def _match_domain(url_domain, domain_map):
     return None
 
 
-def extract_citations(conn):
+def _domain_fingerprint(domain_map):
+    """Return a stable digest of the domain map, to detect blog changes."""
+    items = "\n".join(f"{d}\t{b}" for d, b in sorted(domain_map.items()))
+    return hashlib.sha1(items.encode("utf-8")).hexdigest()
+
+
+def extract_citations(conn, full=False):
     """Extract cross-blog citations from post descriptions.
 
-    Scans all post descriptions for href URLs, matches them against
-    known blog domains, and inserts citation records into the database.
+    Scans post descriptions for href URLs, matches them against known
+    blog domains, and inserts citation records into the database.
     Self-citations (source blog == target blog) are skipped.
 
+    Extraction is incremental and idempotent: only posts above the
+    'citations_watermark' meta value are scanned, and each
+    (source_post_id, target_url) pair is stored once. When the set of
+    blog domains changes, citations are rebuilt from scratch.
+
     Args:
         conn: sqlite3.Connection instance.
+        full: Rebuild all citations instead of scanning only new posts.
 
     Returns:
         Number of citations inserted.
     """
-    posts = get_all_posts(conn)
     domain_map = _build_domain_map(conn)
+    fingerprint = _domain_fingerprint(domain_map)
+
+    if full or get_meta(conn, "citations_domains") != fingerprint:
+        conn.execute("DELETE FROM citations")
+        watermark = 0
+    else:
+        watermark = int(get_meta(conn, "citations_watermark", 0))
 
-    count = 0
+    posts = get_posts_since(conn, watermark)
+
+    rows = []
     for post in posts:
         description = post["description"] or ""
         source_blog_id = post["blog_id"]
@@ -118,17 +152,40 @@ def extract_citations(conn):
             if target_blog_id == source_blog_id:
                 continue
 
-            conn.execute(
-                "INSERT INTO citations (source_post_id, source_blog_id, target_blog_id, target_url) "
-                "VALUES (?, ?, ?, ?)",
-                (post["id"], source_blog_id, target_blog_id, url),
-            )
-            count += 1
-
+            rows.append((post["id"], source_blog_id, target_blog_id, url))
+
+    before = conn.total_changes
+    conn.executemany(
+        "INSERT OR IGNORE INTO citations "
+        "(source_post_id, source_blog_id, target_blog_id, target_url) "
+        "VALUES (?, ?, ?, ?)",
+        rows,
+    )
+    count = conn.total_changes - before
+
+    if posts:
+        watermark = posts[-1]["id"]
+    set_meta(conn, "citations_watermark", watermark)
+    set_meta(conn, "citations_domains", fingerprint)
     conn.commit()
     return count
 
 
+def mark_citations_scanned(conn):
+    """Record every stored post as already scanned for citations.
+
+    Used after loading citations from elsewhere (see hn_intel.snapshot), so
+    the next extract_citations() call keeps them instead of rebuilding.
+    The caller commits.
+
+    Args:
+        conn: sqlite3.Connection instance.
+    """
+    max_post = conn.execute("SELECT COALESCE(MAX(id), 0) FROM posts").fetchone()[0]
+    set_meta(conn, "citations_watermark", max_post)
+    set_meta(conn, "citations_domains", _domain_fingerprint(_build_domain_map(conn)))
+
+
 def build_citation_graph(conn):
     """Build a directed citation graph from the citations table.
 
@@ -147,13 +204,8 @@ def build_citation_graph(conn):
     for blog in blogs:
         graph.add_node(blog["id"], name=blog["name"])
 
-    rows = conn.execute(
-        "SELECT source_blog_id, target_blog_id, COUNT(*) as weight "
-        "FROM citations GROUP BY source_blog_id, target_blog_id"
-    ).fetchall()
-
-    for row in rows:
-        graph.add_edge(row["source_blog_id"], row["target_blog_id"], weight=row["weight"])
+    for source, target, weight in get_citation_edges(conn):
+        graph.add_edge(source, target, weight=weight)
 
     return graph
 
@@ -188,3 +240,185 @@ def compute_centrality(graph):
         }
 
     return result
+
+
+class CitationMatrix:
+    """Weighted citation graph as a sparse adjacency matrix.
+
+    Built straight from the citations table, without a networkx graph.
+    Provides the few DiGraph methods the reports use (number_of_nodes,
+    number_of_edges, is_directed), so it can stand in for
+    build_citation_graph()'s result there.
+
+    Attributes:
+        adjacency: CSR (blogs x blogs) matrix; entry (i, j) is the number
+            of citations from blog i to blog j.
+        node_ids: Blog ID of each row and column.
+        names: Blog name of each row and column.
+    """
+
+    def __init__(self, adjacency, node_ids, names):
+        self.adjacency = adjacency
+        self.node_ids = node_ids
+        self.names = names
+
+    def number_of_nodes(self):
+        return len(self.node_ids)
+
+    def number_of_edges(self):
+        return int(self.adjacency.nnz)
+
+    def is_directed(self):
+        return True
+
+
+def build_citation_matrix(conn):
+    """Build the citation graph as a CitationMatrix from the citations table.
+
+    Args:
+        conn: sqlite3.Connection instance.
+
+    Returns:
+        CitationMatrix with one node per blog, ordered by blog ID.
+    """
+    blogs = sorted((blog["id"], blog["name"]) for blog in get_blogs(conn))
+    node_ids = [blog_id for blog_id, _ in blogs]
+    index = {blog_id: i for i, blog_id in enumerate(node_ids)}
+    edges = [(index[s], index[t], w) for s, t, w in get_citation_edges(conn)
+             if s in index and t in index]
+    rows, cols, weights = zip(*edges) if edges else ((), (), ())
+    adjacency = sp.csr_matrix(
+        (np.array(weights, dtype=np.float64), (np.array(rows, dtype=np.int64),
+                                               np.array(cols, dtype=np.int64))),
+        shape=(len(node_ids), len(node_ids)),
+    )
+    return CitationMatrix(adjacency, node_ids, [name for _, name in blogs])
+
+
+def pagerank(adjacency, alpha=0.85, start=None, tol=1.0e-6, max_iter=100):
+    """Weighted PageRank by power iteration on a sparse adjacency matrix.
+
+    Follows nx.pagerank(): out-weights are normalized per row, dangling
+    nodes spread their rank uniformly, and iteration stops once the L1
+    change is below n * tol. Starting from a previous run's vector (warm
+    start) usually converges in a few iterations when the graph has
+    changed little.
+
+    Args:
+        adjacency: Sparse (n x n) matrix of edge weights.
+        alpha: Damping factor.
+        start: Optional initial vector (any non-negative scale); defaults
+            to uniform.
+        tol: Convergence tolerance per node.
+        max_iter: Maximum number of iterations; the last vector is
+            returned if it has not converged by then.
+
+    Returns:
+        Tuple of (rank array summing to 1, iterations run).
+    """
+    n = adjacency.shape[0]
+    if n == 0:
+        return np.zeros(0), 0
+    out_weight = np.asarray(adjacency.sum(axis=1)).ravel()
+    inverse = np.divide(1.0, out_weight, out=np.zeros(n), where=out_weight != 0)
+    transition = sp.csr_matrix(sp.diags(inverse) @ adjacency).T.tocsr()
+    dangling = out_weight == 0
+
+    if start is None or not np.sum(start):
+        x = np.full(n, 1.0 / n)
+    else:
+        x = np.asarray(start, dtype=np.float64) / np.sum(start)
+    for iteration in range(1, max_iter + 1):
+        last = x
+        x = alpha * (transition @ x + x[dangling].sum() / n) + (1 - alpha) / n
+        if np.abs(x - last).sum() < n * tol:
+            break
+    return x, iteration
+
+
+def compute_centrality_sparse(matrix, previous=None, betweenness_samples=128):
+    """Compute the same metrics as compute_centrality() on a CitationMatrix.
+
+    PageRank runs on the sparse adjacency (see pagerank()), warm-started
+    from previous when given. Exact betweenness costs O(V * E), so it is
+    computed exactly only up to betweenness_samples blogs and estimated
+    from that many sampled source blogs (fixed seed) beyond; 0 skips it.
+
+    Args:
+        matrix: CitationMatrix from build_citation_matrix().
+        previous: Optional earlier result of this function or
+            compute_centrality(); its PageRank values seed the iteration.
+            Blogs missing from it start at the mean.
+        betweenness_samples: Largest graph with exact betweenness, and the
+            number of sampled sources for larger ones; 0 reports every
+            betweenness as 0.0.
+
+    Returns:
+        Dict mapping blog name to dict of centrality metrics:
+        {blog_name: {pagerank, betweenness, in_degree, out_degree}}.
+    """
+    n = matrix.number_of_nodes()
+    if n == 0:
+        return {}
+    adjacency = matrix.adjacency
+
+    start = None
+    if previous:
+        known = [previous[name]["pagerank"] for name in matrix.names if name in previous]
+        if known:
+            fill = float(np.mean(known))
+            start = [previous[name]["pagerank"] if name in previous else fill
+                     for name in matrix.names]
+    ranks, _ = pagerank(adjacency, start=start)
+
+    betweenness = {}
+    if betweenness_samples:
+        graph = nx.from_scipy_sparse_array(adjacency, create_using=nx.DiGraph)
+        k = None if n <= betweenness_samples else betweenness_samples
+        betweenness = nx.betweenness_centrality(graph, k=k, weight="weight", seed=0)
+
+    in_degree = np.diff(adjacency.tocsc().indptr)
+    out_degree = np.diff(adjacency.indptr)
+    return {
+        name: {
+            "pagerank": float(ranks[i]),
+            "betweenness": betweenness.get(i, 0.0),
+            "in_degree": int(in_degree[i]),
+            "out_degree": int(out_degree[i]),
+        }
+        for i, name in enumerate(matrix.names)
+    }
+
+
+def network_params(backend="networkx"):
+    """Return the artifact cache params of compute_network() for backend."""
+    if backend not in CENTRALITY_BACKENDS:
+        raise ValueError(f"backend must be one of {', '.join(CENTRALITY_BACKENDS)}")
+    return {"backend": "sparse"} if backend == "sparse" else {}
+
+
+def compute_network(conn, backend="networkx"):
+    """Build the citation network and its centrality with one backend.
+
+    "networkx" builds a networkx.DiGraph and runs compute_centrality().
+    "sparse" builds a CitationMatrix and runs compute_centrality_sparse(),
+    warm-started from the last cached sparse result (the "network"
+    artifact with network_params("sparse")), whatever corpus it was
+    computed for.
+
+    Args:
+        conn: sqlite3.Connection instance.
+        backend: One of CENTRALITY_BACKENDS.
+
+    Returns:
+        Tuple of (graph or CitationMatrix, centrality dict).
+    """
+    params = network_params(backend)
+    if backend == "sparse":
+        from hn_intel.cache import load_artifact
+
+        previous = load_artifact(conn, "network", params, allow_stale=True)
+        matrix = build_citation_matrix(conn)
+        return matrix, compute_centrality_sparse(matrix, previous[1] if previous else None)
+    graph = build_citation_graph(conn)
+    return graph, compute_centrality(graph)
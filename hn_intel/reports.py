@@ -6,6 +6,12 @@ import os
 import networkx as nx
 from tabulate import tabulate
 
+from hn_intel.analyzer import TrendCube
+from hn_intel.db import get_corpus_summary
+
+# Layouts of the trend scores in trends.json; the first is the default.
+TRENDS_FORMATS = ("nested", "csr")
+
 
 def generate_summary_report(trends, emerging, centrality, cluster_results, conn, output_dir,
                              ideas=None):
@@ -25,10 +31,11 @@ def generate_summary_report(trends, emerging, centrality, cluster_results, conn,
     """
     os.makedirs(output_dir, exist_ok=True)
 
-    blog_count = conn.execute("SELECT COUNT(*) FROM blogs").fetchone()[0]
-    post_count = conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
-    min_date = conn.execute("SELECT MIN(published) FROM posts WHERE published != ''").fetchone()[0]
-    max_date = conn.execute("SELECT MAX(published) FROM posts WHERE published != ''").fetchone()[0]
+    corpus = get_corpus_summary(conn)
+    blog_count = corpus["blogs"]
+    post_count = corpus["posts"]
+    min_date = corpus["first_published"]
+    max_date = corpus["last_published"]
 
     lines = []
     lines.append("# HN Blog Intelligence Summary Report\n")
@@ -123,17 +130,30 @@ def generate_summary_report(trends, emerging, centrality, cluster_results, conn,
     return path
 
 
-def generate_trend_report(trends, emerging, output_dir):
+def generate_trend_report(trends, emerging, output_dir, leading_blogs=None,
+                          sketch_emerging=None, segment_emerging=None, trends_format="nested"):
     """Generate trend analysis report in Markdown and JSON.
 
     Args:
-        trends: Dict from compute_trends: {period_key: {keyword: score}}.
+        trends: TrendCube (or dict) from compute_trends.
         emerging: List of emerging topic dicts from detect_emerging_topics.
         output_dir: Directory to write report files.
+        leading_blogs: Optional dict from find_leading_blogs_batch,
+            keyed by emerging keyword.
+        sketch_emerging: Optional list from sketch.sketch_emerging_topics
+            of accelerating terms outside the keyword vocabulary.
+        segment_emerging: Optional list of {segment, type, blogs,
+            emerging_topics} dicts, one per blog cluster or blog.
+        trends_format: Layout of "periods" in trends.json: "nested"
+            ({period: {keyword: score}}) or "csr" (compact sparse arrays,
+            see analyzer.TrendCube.to_json).
 
     Returns:
         Tuple of (md_path, json_path) for the generated files.
     """
+    if trends_format not in TRENDS_FORMATS:
+        raise ValueError(f"Unknown trends format {trends_format!r}; "
+                         f"expected one of: {', '.join(TRENDS_FORMATS)}")
     os.makedirs(output_dir, exist_ok=True)
 
     lines = []
@@ -154,6 +174,65 @@ def generate_trend_report(trends, emerging, output_dir):
         lines.append("No emerging topics detected.")
     lines.append("")
 
+    if leading_blogs:
+        lines.append("## Leading Blogs\n")
+        table_data = []
+        for e in emerging:
+            leaders = leading_blogs.get(e["keyword"])
+            if leaders:
+                table_data.append([
+                    e["keyword"],
+                    ", ".join(
+                        f"{b['blog_name']} ({b['first_mention'][:10] or 'undated'}, "
+                        f"{b['mention_count']})"
+                        for b in leaders[:3]
+                    ),
+                ])
+        if table_data:
+            lines.append(tabulate(
+                table_data,
+                headers=["Keyword", "First blogs (first mention, posts)"],
+                tablefmt="github",
+            ))
+        else:
+            lines.append("No blog mentions found for emerging topics.")
+        lines.append("")
+
+    if sketch_emerging is not None:
+        lines.append("## Emerging Terms Beyond the Vocabulary\n")
+        if sketch_emerging:
+            table_data = [
+                [e["keyword"], f"{e['acceleration']:.2f}x", e["recent_mentions"],
+                 f"{e['recent_rate']:.6f}", f"{e['historical_rate']:.6f}"]
+                for e in sketch_emerging
+            ]
+            lines.append(tabulate(
+                table_data,
+                headers=["Term", "Acceleration", "Recent Posts", "Recent Rate", "Historical Rate"],
+                tablefmt="github",
+            ))
+        else:
+            lines.append("No accelerating terms outside the vocabulary.")
+        lines.append("")
+
+    if segment_emerging is not None:
+        lines.append("## Emerging Topics by Segment\n")
+        table_data = [
+            [s["segment"], s["type"], s["blogs"], ", ".join(
+                f"{e['keyword']} ({e['acceleration']:.2f}x)" for e in s["emerging_topics"][:3]
+            )]
+            for s in segment_emerging if s["emerging_topics"]
+        ]
+        if table_data:
+            lines.append(tabulate(
+                table_data,
+                headers=["Segment", "Type", "Blogs", "Top emerging topics"],
+                tablefmt="github",
+            ))
+        else:
+            lines.append("No emerging topics in any segment.")
+        lines.append("")
+
     lines.append("## Period Summary\n")
     lines.append(f"Total periods: {len(trends)}\n")
     if trends:
@@ -166,13 +245,24 @@ def generate_trend_report(trends, emerging, output_dir):
     with open(md_path, "w", encoding="utf-8") as f:
         f.write("\n".join(lines))
 
-    json_data = {
-        "periods": {k: v for k, v in sorted(trends.items())},
-        "emerging_topics": emerging,
-    }
+    # TrendCube.from_json() reads either layout back. The CSR one is
+    # written without indentation, as it exists to keep large files small.
+    if trends_format == "csr":
+        json_data = TrendCube.from_trends(trends).to_json()
+        indent, separators = None, (",", ":")
+    else:
+        json_data = {"periods": {k: v for k, v in sorted(trends.items())}}
+        indent, separators = 2, None
+    json_data["emerging_topics"] = emerging
+    if leading_blogs is not None:
+        json_data["leading_blogs"] = leading_blogs
+    if sketch_emerging is not None:
+        json_data["sketch_emerging"] = sketch_emerging
+    if segment_emerging is not None:
+        json_data["segment_emerging"] = segment_emerging
     json_path = os.path.join(output_dir, "trends.json")
     with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(json_data, f, indent=2)
+        json.dump(json_data, f, indent=indent, separators=separators)
 
     return md_path, json_path
 
@@ -438,11 +528,12 @@ def generate_ideas_report(ideas, output_dir):
 
 def generate_all_reports(trends, emerging, centrality, graph, cluster_results,
                          similarity_matrix, blog_names, conn, output_dir,
-                         ideas=None):
+                         ideas=None, leading_blogs=None, sketch_emerging=None,
+                         segment_emerging=None, trends_format="nested"):
     """Generate all reports at once.
 
     Args:
-        trends: Dict from compute_trends.
+        trends: TrendCube (or dict) from compute_trends.
         emerging: List from detect_emerging_topics.
         centrality: Dict from compute_centrality.
         graph: networkx.DiGraph from build_citation_graph.
@@ -452,6 +543,11 @@ def generate_all_reports(trends, emerging, centrality, graph, cluster_results,
         conn: sqlite3.Connection instance.
         output_dir: Directory to write report files.
         ideas: Optional list of idea dicts from generate_ideas.
+        leading_blogs: Optional dict from find_leading_blogs_batch for the
+            emerging topics.
+        sketch_emerging: Optional list from sketch.sketch_emerging_topics.
+        segment_emerging: Optional list of per-segment emerging topics.
+        trends_format: Layout of the scores in trends.json ("nested" or "csr").
 
     Returns:
         List of file paths created.
@@ -464,7 +560,11 @@ def generate_all_reports(trends, emerging, centrality, graph, cluster_results,
     )
     paths.append(summary_path)
 
-    trend_md, trend_json = generate_trend_report(trends, emerging, output_dir)
+    trend_md, trend_json = generate_trend_report(trends, emerging, output_dir,
+                                                 leading_blogs=leading_blogs,
+                                                 sketch_emerging=sketch_emerging,
+                                                 segment_emerging=segment_emerging,
+                                                 trends_format=trends_format)
     paths.extend([trend_md, trend_json])
 
     network_md, network_json = generate_network_report(centrality, graph, output_dir)
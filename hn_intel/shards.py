@@ -0,0 +1,202 @@
+"""Out-of-core keyword extraction into on-disk CSR shards.
+
+KeywordModel.fit() holds every post's tokens and the whole TF-IDF matrix in
+memory. extract_keyword_shards() instead makes two passes over posts
+streamed from SQLite in chunks (tokens.iter_post_tokens()): the first
+counts the document and total frequency of every term, the second weights
+each chunk with the selected vocabulary and writes it to disk as one CSR
+shard. KeywordShards reads the shards back one at a time and
+analyzer.compute_trends() sums trends shard by shard, so memory is bounded
+by the chunk size plus the first pass's term counts.
+
+Vocabulary, IDF weights and rows are the same as KeywordModel.fit()
+produces; trend scores agree up to floating-point summation order.
+"""
+
+import json
+import os
+from collections import Counter
+from glob import glob
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+from sklearn.preprocessing import normalize
+
+from hn_intel.analyzer import KeywordModel
+from hn_intel.tokens import TokenAnalyzer, iter_post_tokens, select_features
+
+MANIFEST = "manifest.json"
+
+# Same analyzer as KeywordModel.fit().
+_ANALYZER = TokenAnalyzer(ENGLISH_STOP_WORDS, ngram_range=(1, 2))
+
+
+def _count_pass(conn, chunk_size):
+    """First pass: per-term document and total frequencies.
+
+    Returns:
+        Tuple of (df Counter, tf Counter, number of posts). The df Counter
+        lists terms in the order they first appear, as sklearn numbers them
+        while counting.
+    """
+    df = Counter()
+    tf = Counter()
+    n_docs = 0
+    for _, documents in iter_post_tokens(conn, chunk_size):
+        for doc in documents:
+            counts = Counter(_ANALYZER(doc))
+            df.update(counts.keys())
+            tf.update(counts)
+        n_docs += len(documents)
+    return df, tf, n_docs
+
+
+def _shard_matrix(documents, columns, n_features, idf):
+    """Second pass for one chunk: its L2-normalized TF-IDF rows.
+
+    Args:
+        documents: Token lists of the chunk.
+        columns: Dict mapping each kept term to (first-seen rank, column).
+        n_features: Number of kept terms.
+        idf: IDF weight of each column.
+
+    Returns:
+        CSR (documents x features) matrix. Within each row, entries are
+        ordered as sklearn's serial counting leaves them (by first-seen
+        rank), so normalization sums in the same order.
+    """
+    indptr = [0]
+    ranks = []
+    values = []
+    for doc in documents:
+        for term, count in Counter(_ANALYZER(doc)).items():
+            if term in columns:
+                ranks.append(columns[term][0])
+                values.append(count)
+        indptr.append(len(ranks))
+    matrix = sp.csr_matrix(
+        (np.array(values, dtype=np.float64), np.array(ranks, dtype=np.int32),
+         np.array(indptr, dtype=np.int64)),
+        shape=(len(documents), n_features),
+    )
+    matrix.sort_indices()
+    column_of_rank = np.empty(n_features, dtype=np.int32)
+    for rank, column in columns.values():
+        column_of_rank[rank] = column
+    matrix.indices = column_of_rank.take(matrix.indices)
+    matrix.data *= idf[matrix.indices]
+    return normalize(matrix, copy=False)
+
+
+def extract_keyword_shards(conn, directory, max_features=500, chunk_size=5000):
+    """Stream TF-IDF keyword extraction into CSR shards under directory.
+
+    Existing shards in directory are replaced. The manifest is written
+    last, so an interrupted run leaves no readable result behind.
+
+    Args:
+        conn: sqlite3.Connection instance.
+        directory: Output directory, created if missing.
+        max_features: Maximum number of features, as for KeywordModel.fit().
+        chunk_size: Posts per chunk and rows per shard.
+
+    Returns:
+        KeywordShards over the written shards.
+
+    Raises:
+        ValueError: If pruning leaves no terms, as TfidfVectorizer does.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for path in glob(os.path.join(directory, "shard-*.npz")) + [os.path.join(directory, MANIFEST)]:
+        if os.path.exists(path):
+            os.remove(path)
+
+    df, tf, n_docs = _count_pass(conn, chunk_size)
+    features, shards = [], []
+    if n_docs:
+        terms = sorted(df)
+        dfs = np.array([df[term] for term in terms], dtype=np.int64)
+        tfs = np.array([tf[term] for term in terms], dtype=np.int64)
+        kept = select_features(dfs, tfs, n_docs, min(3, n_docs), 0.7, max_features)
+        features = [terms[i] for i in kept]
+        kept_terms = set(features)
+        first_seen = [term for term in df if term in kept_terms]
+        rank = {term: i for i, term in enumerate(first_seen)}
+        columns = {term: (rank[term], column) for column, term in enumerate(features)}
+        idf = np.log((1 + n_docs) / (1 + dfs[kept].astype(np.float64))) + 1
+
+        for posts, documents in iter_post_tokens(conn, chunk_size):
+            matrix = _shard_matrix(documents, columns, len(features), idf)
+            name = f"shard-{len(shards):05d}.npz"
+            np.savez(
+                os.path.join(directory, name),
+                data=matrix.data, indices=matrix.indices, indptr=matrix.indptr,
+                shape=np.array(matrix.shape),
+                post_ids=np.array([post["id"] for post in posts], dtype=np.int64),
+                published=np.array([post["published"] or "" for post in posts], dtype=str),
+            )
+            shards.append({"file": name, "rows": len(posts)})
+
+    with open(os.path.join(directory, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump({"max_features": max_features, "n_docs": n_docs,
+                   "features": features, "shards": shards}, f)
+    return KeywordShards(directory)
+
+
+class KeywordShards:
+    """Read-only view of the shards written by extract_keyword_shards().
+
+    Iterating loads one shard at a time.
+
+    Attributes:
+        directory: Shard directory.
+        feature_names: Object array with the keyword of each column.
+        max_features: Vocabulary cap the shards were extracted with.
+        n_docs: Total number of rows.
+    """
+
+    def __init__(self, directory):
+        path = os.path.join(directory, MANIFEST)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No keyword shards in {directory}")
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.directory = directory
+        self.feature_names = np.array(manifest["features"], dtype=object)
+        self.max_features = manifest["max_features"]
+        self.n_docs = manifest["n_docs"]
+        self._files = [shard["file"] for shard in manifest["shards"]]
+
+    def __len__(self):
+        return len(self._files)
+
+    def __iter__(self):
+        """Yield (CSR matrix, post ID list, published list) per shard."""
+        for name in self._files:
+            with np.load(os.path.join(self.directory, name)) as shard:
+                matrix = sp.csr_matrix(
+                    (shard["data"], shard["indices"], shard["indptr"]),
+                    shape=tuple(shard["shape"]),
+                )
+                yield matrix, shard["post_ids"].tolist(), shard["published"].tolist()
+
+    def to_csr(self):
+        """Concatenate every shard into one in-memory CSR matrix."""
+        matrices = [matrix for matrix, _, _ in self]
+        if not matrices:
+            return sp.csr_matrix((0, len(self.feature_names)))
+        return sp.vstack(matrices, format="csr")
+
+
+def load_sharded_model(directory):
+    """Return a KeywordModel whose rows live in the shards under directory.
+
+    The model has no in-memory matrix; compute_trends() and
+    compute_trend_series() stream its shards instead.
+    """
+    shards = KeywordShards(directory)
+    return KeywordModel(
+        None, None, [], [], shards.max_features,
+        feature_names=shards.feature_names, mode="sharded", shards=shards,
+    )
@@ -0,0 +1,321 @@
+"""Fixed-memory streaming term sketches for trends over the full vocabulary.
+
+The keyword model keeps only max_features terms, so a new term cannot
+emerge until it out-ranks established vocabulary over the whole history.
+update_term_sketches() instead counts every n-gram of every post (once per
+post) into one sketch per period:
+
+* a Count-Min sketch of depth x width counters, which estimates how many
+  posts of the period mention any term and never underestimates;
+* a Space-Saving summary of the period's `capacity` most mentioned terms,
+  the candidates sketch_emerging_topics() considers.
+
+Memory per period is fixed, whatever the vocabulary size. Sketches are
+stored in the term_sketches table and updated incrementally: each call
+counts only posts with an ID above the last one counted. Edits and
+deletions are not subtracted; rebuild=True recounts from scratch.
+"""
+
+import hashlib
+import heapq
+import json
+import zlib
+from collections import Counter, defaultdict
+
+import numpy as np
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+from hn_intel.analyzer import PERIODS, parse_dates, period_keys
+from hn_intel.db import get_meta, set_meta
+from hn_intel.tokens import TokenAnalyzer, iter_post_tokens
+
+DEFAULT_WIDTH = 2 ** 14
+DEFAULT_DEPTH = 4
+DEFAULT_CAPACITY = 200
+
+# Same terms as KeywordModel.fit(), but without a vocabulary cap.
+_ANALYZER = TokenAnalyzer(ENGLISH_STOP_WORDS, ngram_range=(1, 2))
+
+# Stored Count-Min counters are little-endian uint32.
+_COUNT_DTYPE = "<u4"
+
+
+def _term_hashes(terms):
+    """Return two independent 32-bit hashes per term, stable across runs."""
+    digests = b"".join(hashlib.blake2b(t.encode("utf-8"), digest_size=8).digest() for t in terms)
+    halves = np.frombuffer(digests, dtype="<u4").reshape(-1, 2).astype(np.uint64)
+    return halves[:, 0], halves[:, 1] | 1
+
+
+class CountMinSketch:
+    """Count-Min sketch with conservative update.
+
+    Row i maps a term to column (h1 + i * h2) % width, from two hashes of
+    the term. A term's estimate is the minimum of its counters; adding
+    only raises counters to (estimate + count), which keeps estimates
+    upper bounds while collisions inflate them far less.
+
+    Args:
+        width: Counters per row.
+        depth: Number of rows.
+        counts: Optional (depth x width) array to resume from.
+    """
+
+    def __init__(self, width=DEFAULT_WIDTH, depth=DEFAULT_DEPTH, counts=None):
+        self.width = width
+        self.depth = depth
+        self.counts = np.zeros((depth, width), dtype=np.uint32) if counts is None else counts
+
+    def _columns(self, terms):
+        h1, h2 = _term_hashes(terms)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((h1 + rows * h2) % np.uint64(self.width)).astype(np.int64)
+
+    def estimate(self, terms):
+        """Return the estimated count of each term (never below the true count)."""
+        if not terms:
+            return np.zeros(0, dtype=np.int64)
+        columns = self._columns(terms)
+        return self.counts[np.arange(self.depth)[:, None], columns].min(axis=0).astype(np.int64)
+
+    def add(self, terms, counts):
+        """Add counts (an array aligned with terms, all distinct)."""
+        if not terms:
+            return
+        columns = self._columns(terms)
+        rows = np.broadcast_to(np.arange(self.depth)[:, None], columns.shape)
+        target = self.counts[rows, columns].min(axis=0) + np.asarray(counts, dtype=np.uint32)
+        np.maximum.at(self.counts, (rows, columns), np.broadcast_to(target, columns.shape))
+
+    def to_bytes(self):
+        return zlib.compress(self.counts.astype(_COUNT_DTYPE).tobytes())
+
+    @classmethod
+    def from_bytes(cls, data, width, depth):
+        counts = np.frombuffer(zlib.decompress(data), dtype=_COUNT_DTYPE).reshape(depth, width)
+        return cls(width, depth, counts.astype(np.uint32))
+
+
+class SpaceSaving:
+    """Space-Saving summary of the most frequent terms, in mergeable form.
+
+    Holds at most capacity terms with an overestimated count and the
+    maximum overestimate (error). update() merges a batch of exact counts:
+    a term not yet tracked may have been dropped earlier, so it starts
+    from the smallest tracked count (the floor), which also becomes its
+    error; then only the capacity largest counts are kept. Any term
+    mentioned more than total / capacity times is guaranteed to be kept.
+
+    Args:
+        capacity: Maximum number of tracked terms.
+        items: Optional iterable of (term, count, error) to resume from.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, items=()):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        for term, count, error in items:
+            self.counts[term] = count
+            self.errors[term] = error
+
+    @property
+    def floor(self):
+        """Smallest tracked count once full, else 0."""
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def update(self, batch):
+        """Merge a Counter (or dict) of exact term counts."""
+        floor = self.floor
+        counts = dict(self.counts)
+        errors = dict(self.errors)
+        for term, count in batch.items():
+            if term in counts:
+                counts[term] += count
+            else:
+                counts[term] = floor + count
+                errors[term] = floor
+        if len(counts) > self.capacity:
+            kept = heapq.nlargest(self.capacity, counts, key=lambda t: (counts[t], t))
+            counts = {term: counts[term] for term in kept}
+        self.counts = counts
+        self.errors = {term: errors[term] for term in counts}
+
+    def top(self):
+        """Return [(term, count, error)] by count descending, then term."""
+        return sorted(
+            ((term, count, self.errors[term]) for term, count in self.counts.items()),
+            key=lambda item: (-item[1], item[0]),
+        )
+
+
+class TermSketch:
+    """The sketches of one period.
+
+    Attributes:
+        period: Period key.
+        posts: Number of posts counted.
+        cms: CountMinSketch of per-post term mentions.
+        heavy: SpaceSaving summary of the most mentioned terms.
+    """
+
+    def __init__(self, period, posts, cms, heavy):
+        self.period = period
+        self.posts = posts
+        self.cms = cms
+        self.heavy = heavy
+
+
+def _settings_key(period):
+    return f"term_sketch:{period}"
+
+
+def _load(conn, period, settings, periods=None):
+    """Load stored sketches of a granularity, optionally only some periods."""
+    query = "SELECT period, posts, counts, heavy FROM term_sketches WHERE granularity = ?"
+    params = [period]
+    if periods is not None:
+        query += " AND period IN (SELECT value FROM json_each(?))"
+        params.append(json.dumps(sorted(periods)))
+    return {
+        row[0]: TermSketch(
+            row[0], row[1],
+            CountMinSketch.from_bytes(row[2], settings["width"], settings["depth"]),
+            SpaceSaving(settings["capacity"], json.loads(row[3])),
+        )
+        for row in conn.execute(query + " ORDER BY period", params)
+    }
+
+
+def update_term_sketches(conn, period="month", width=DEFAULT_WIDTH, depth=DEFAULT_DEPTH,
+                         capacity=DEFAULT_CAPACITY, rebuild=False, chunk_size=5000):
+    """Count posts added since the last update into the per-period sketches.
+
+    Sketches of a granularity are rebuilt from scratch when rebuild is set
+    or when width, depth or capacity differ from the stored ones.
+
+    Args:
+        conn: Writable sqlite3.Connection instance.
+        period: One of analyzer.PERIODS.
+        width, depth: Count-Min sketch shape.
+        capacity: Heavy hitters kept per period.
+        rebuild: Recount every post.
+        chunk_size: Posts read per chunk.
+
+    Returns:
+        Number of posts counted (posts without a valid date are skipped).
+    """
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+    settings = {"width": width, "depth": depth, "capacity": capacity}
+    state = json.loads(get_meta(conn, _settings_key(period), "null"))
+    if rebuild or state is None or state["settings"] != settings:
+        conn.execute("DELETE FROM term_sketches WHERE granularity = ?", (period,))
+        state = {"settings": settings, "last_post_id": 0}
+
+    sketches = {}
+    counted = 0
+    for posts, documents in iter_post_tokens(conn, chunk_size, after_id=state["last_post_id"]):
+        state["last_post_id"] = posts[-1]["id"]
+        batches = defaultdict(Counter)
+        totals = Counter()
+        keys = period_keys(parse_dates([post["published"] for post in posts]), period)
+        for key, doc in zip(keys, documents):
+            if key is not None:
+                batches[key].update(set(_ANALYZER(doc)))
+                totals[key] += 1
+        missing = set(batches) - set(sketches)
+        if missing:
+            sketches.update(_load(conn, period, settings, missing))
+        for key, batch in batches.items():
+            if key not in sketches:
+                sketches[key] = TermSketch(key, 0, CountMinSketch(width, depth),
+                                           SpaceSaving(capacity))
+            sketch = sketches[key]
+            terms = list(batch)
+            sketch.cms.add(terms, np.fromiter(batch.values(), dtype=np.uint32, count=len(terms)))
+            sketch.heavy.update(batch)
+            sketch.posts += totals[key]
+            counted += totals[key]
+
+    conn.executemany(
+        "INSERT OR REPLACE INTO term_sketches (granularity, period, posts, counts, heavy) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [(period, key, s.posts, s.cms.to_bytes(), json.dumps(s.heavy.top()))
+         for key, s in sketches.items()],
+    )
+    set_meta(conn, _settings_key(period), json.dumps(state))
+    conn.commit()
+    return counted
+
+
+def load_term_sketches(conn, period="month"):
+    """Return the stored TermSketch of every period of a granularity, in period order."""
+    state = get_meta(conn, _settings_key(period))
+    if state is None:
+        return []
+    return list(_load(conn, period, json.loads(state)["settings"]).values())
+
+
+def sketch_emerging_topics(sketches, window=3, threshold=2.0, min_mentions=3, exclude=(),
+                           limit=None):
+    """Find accelerating terms among the recent periods' heavy hitters.
+
+    A term's rate in a period is its estimated mentions per post. As in
+    analyzer.detect_emerging_topics(), the mean rate over the last window
+    periods is compared with the mean over all earlier ones; the
+    historical rate is floored at one mention over the whole history, so
+    brand-new terms are flagged instead of skipped. Count-Min estimates
+    only overcount, which can understate a term's acceleration but never
+    invent it.
+
+    Args:
+        sketches: TermSketch list in period order (load_term_sketches()).
+        window: Number of recent periods.
+        threshold: Minimum acceleration (exclusive) to report.
+        min_mentions: Minimum estimated mentions in the recent periods.
+        exclude: Terms to leave out, e.g. the capped keyword vocabulary.
+        limit: Maximum number of results; None keeps all.
+
+    Returns:
+        List of dicts {keyword, recent_mentions, recent_rate,
+        historical_rate, acceleration}, sorted by acceleration descending,
+        then keyword. Empty if there is no history.
+    """
+    if window < 1 or len(sketches) <= window:
+        return []
+    recent, history = sketches[-window:], sketches[:-window]
+    history_posts = sum(s.posts for s in history)
+    if not history_posts:
+        return []
+    excluded = set(exclude)
+    candidates = sorted({t for s in recent for t in s.heavy.counts} - excluded)
+    if not candidates:
+        return []
+
+    def rates(periods):
+        counts = np.array([s.cms.estimate(candidates) for s in periods], dtype=np.float64)
+        posts = np.array([max(s.posts, 1) for s in periods], dtype=np.float64)
+        return counts, (counts / posts[:, None]).mean(axis=0)
+
+    recent_counts, recent_rate = rates(recent)
+    _, historical_rate = rates(history)
+    historical_rate = np.maximum(historical_rate, 1.0 / history_posts)
+    acceleration = recent_rate / historical_rate
+    mentions = recent_counts.sum(axis=0)
+
+    hits = np.flatnonzero((mentions >= min_mentions) & (acceleration > threshold))
+    rounded = np.round(acceleration[hits], 2)
+    order = sorted(range(len(hits)), key=lambda i: (-rounded[i], candidates[hits[i]]))
+    return [
+        {
+            "keyword": candidates[hits[i]],
+            "recent_mentions": int(mentions[hits[i]]),
+            "recent_rate": round(float(recent_rate[hits[i]]), 6),
+            "historical_rate": round(float(historical_rate[hits[i]]), 6),
+            "acceleration": float(rounded[i]),
+        }
+        for i in order[:limit]
+    ]
@@ -0,0 +1,297 @@
+"""Columnar (Parquet / Arrow IPC) snapshots of the corpus.
+
+A snapshot is a directory holding one file per table (``blogs``, ``posts``,
+``citations``), all in the same format. Post descriptions are written
+decoded and archived posts and citations are included, so a snapshot is
+self-contained. Posts are sorted by published date, which keeps the
+per-row-group min/max statistics tight enough for date filters to skip
+most of a large file without decoding it.
+
+pyarrow is an optional dependency (``pip install -e ".[snapshot]"``).
+"""
+
+import os
+import sqlite3
+
+from hn_intel.db import attach_archives, canonicalize_url, init_db
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+TABLES = ("blogs", "posts", "citations")
+
+# Column names and SQLite/Arrow types of each exported table, in order.
+COLUMNS = {
+    "blogs": [
+        ("id", "int64"), ("name", "string"), ("feed_url", "string"),
+        ("site_url", "string"), ("last_fetched", "string"), ("fetch_status", "string"),
+    ],
+    "posts": [
+        ("id", "int64"), ("blog_id", "int64"), ("title", "string"),
+        ("description", "string"), ("url", "string"), ("published", "string"),
+        ("author", "string"), ("canonical_url", "string"),
+    ],
+    "citations": [
+        ("id", "int64"), ("source_post_id", "int64"), ("source_blog_id", "int64"),
+        ("target_blog_id", "int64"), ("target_url", "string"),
+    ],
+}
+
+# Rows per record batch (and Parquet row group) when exporting.
+BATCH_ROWS = 65536
+
+
+def _pyarrow():
+    """Import pyarrow, raising a helpful error when it is not installed."""
+    try:
+        import pyarrow
+        import pyarrow.dataset  # noqa: F401
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as exc:
+        raise ImportError(
+            "Snapshots need pyarrow; install it with: pip install -e \".[snapshot]\""
+        ) from exc
+    return pyarrow
+
+
+def _check_format(fmt):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown snapshot format {fmt!r}; expected one of: "
+                         f"{', '.join(sorted(FORMATS))}")
+
+
+def _check_columns(table, columns):
+    """Return the requested columns of table in schema order ('id' always kept)."""
+    known = [name for name, _ in COLUMNS[table]]
+    if not columns:
+        return known
+    unknown = set(columns) - set(known)
+    if unknown:
+        raise ValueError(f"Unknown {table} columns: {', '.join(sorted(unknown))}")
+    return [name for name in known if name == "id" or name in columns]
+
+
+def _date_filter(column, since, until):
+    """Build a SQL WHERE fragment and parameters for a half-open date window."""
+    clauses, params = [], []
+    if since is not None:
+        clauses.append(f"{column} >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append(f"{column} < ?")
+        params.append(until)
+    return " AND ".join(clauses) or "1", params
+
+
+def _export_queries(conn, since, until):
+    """Return {table: (sql, params)} reading hot and archived rows."""
+    schemas = ["main"] + attach_archives(conn, since)
+    where, params = _date_filter("p.published", since, until)
+
+    posts = " UNION ALL ".join(
+        "SELECT p.id, p.blog_id, p.title, hn_decompress(p.description) AS description, "
+        f"p.url, p.published, p.author, p.canonical_url FROM {schema}.posts p WHERE {where}"
+        for schema in schemas
+    )
+    citations = " UNION ALL ".join(
+        f"SELECT c.id, c.source_post_id, c.source_blog_id, c.target_blog_id, c.target_url "
+        f"FROM {schema}.citations c JOIN {schema}.posts p ON p.id = c.source_post_id "
+        f"WHERE {where}"
+        for schema in schemas
+    )
+    return {
+        "blogs": ("SELECT id, name, feed_url, site_url, last_fetched, fetch_status "
+                  "FROM blogs ORDER BY id", []),
+        "posts": (f"SELECT * FROM ({posts}) ORDER BY published, id",
+                  params * len(schemas)),
+        "citations": (f"SELECT * FROM ({citations}) ORDER BY id", params * len(schemas)),
+    }
+
+
+def export_snapshot(conn, output_dir, fmt="parquet", columns=None, since=None, until=None):
+    """Write blogs, posts and citations to columnar files.
+
+    Rows are streamed from SQLite in batches of BATCH_ROWS, so memory use
+    does not grow with the corpus.
+
+    Args:
+        conn: sqlite3.Connection instance.
+        output_dir: Directory to write ``<table>.parquet`` or ``<table>.arrow``.
+        fmt: 'parquet' or 'arrow' (Arrow IPC / Feather v2).
+        columns: Optional dict mapping table name to the columns to keep;
+            'id' is always kept. Tables not listed keep every column.
+        since: Optional ISO date; posts published before it, and their
+            citations, are skipped.
+        until: Optional ISO date; posts published on or after it, and
+            their citations, are skipped.
+
+    Returns:
+        Dict mapping table name to the number of rows written.
+    """
+    pa = _pyarrow()
+    _check_format(fmt)
+    columns = columns or {}
+    os.makedirs(output_dir, exist_ok=True)
+
+    counts = {}
+    for table, (sql, params) in _export_queries(conn, since, until).items():
+        keep = _check_columns(table, columns.get(table))
+        indexes = [i for i, (name, _) in enumerate(COLUMNS[table]) if name in keep]
+        schema = pa.schema([
+            (name, getattr(pa, kind)()) for name, kind in COLUMNS[table] if name in keep
+        ])
+        path = os.path.join(output_dir, table + FORMATS[fmt])
+        if fmt == "parquet":
+            writer = pa.parquet.ParquetWriter(path, schema, compression="zstd")
+        else:
+            writer = pa.ipc.new_file(path, schema)
+
+        counts[table] = 0
+        cursor = conn.execute(sql, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(BATCH_ROWS)
+                if not rows:
+                    break
+                arrays = [pa.array([row[i] for row in rows], type=schema.field(j).type)
+                          for j, i in enumerate(indexes)]
+                writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                counts[table] += len(rows)
+        finally:
+            writer.close()
+    return counts
+
+
+def _snapshot_path(snapshot_dir, table):
+    """Return (path, format) of table in snapshot_dir, or (None, None)."""
+    for fmt, suffix in FORMATS.items():
+        path = os.path.join(snapshot_dir, table + suffix)
+        if os.path.exists(path):
+            return path, fmt
+    return None, None
+
+
+def read_table(snapshot_dir, table, columns=None, since=None, until=None):
+    """Read one snapshot table as a pyarrow.Table.
+
+    Column projection and the date window are pushed down to the file
+    reader: only the requested columns are decoded, and for posts, Parquet
+    row groups whose published range lies outside the window are skipped
+    (Arrow files are memory-mapped and filtered while reading). Undated
+    posts never match a window.
+
+    Args:
+        snapshot_dir: Directory written by export_snapshot().
+        table: One of TABLES.
+        columns: Optional list of columns; None reads every stored column.
+        since: Optional ISO date lower bound on posts.published (inclusive).
+        until: Optional ISO date upper bound on posts.published (exclusive).
+
+    Returns:
+        pyarrow.Table, or None if the snapshot has no file for table.
+    """
+    pa = _pyarrow()
+    path, fmt = _snapshot_path(snapshot_dir, table)
+    if path is None:
+        return None
+    dataset = pa.dataset.dataset(path, format="parquet" if fmt == "parquet" else "ipc")
+    if columns:
+        columns = [name for name in columns if name in dataset.schema.names]
+
+    condition = None
+    if table == "posts":
+        published = pa.dataset.field("published")
+        if since is not None:
+            condition = published >= since
+        if until is not None:
+            upper = published < until
+            condition = upper if condition is None else condition & upper
+    return dataset.to_table(columns=columns or None, filter=condition)
+
+
+def import_snapshot(conn, snapshot_dir, since=None, until=None):
+    """Load a snapshot into a database, keeping row IDs.
+
+    Meant for an empty database or one that the snapshot was exported
+    from: rows whose ID or unique URL already exists are skipped.
+    Descriptions are stored as plain text (run ``db compact`` afterwards to
+    compress them), and citations whose source post was not imported are
+    dropped. When the
+    snapshot carries citations, every imported post is marked as already
+    scanned so extract_citations() keeps them.
+
+    Args:
+        conn: Initialized sqlite3.Connection.
+        snapshot_dir: Directory written by export_snapshot().
+        since: Optional ISO date; only import posts published on or after it.
+        until: Optional ISO date; only import posts published before it.
+
+    Returns:
+        Dict mapping table name to the number of rows inserted.
+    """
+    from hn_intel.network import mark_citations_scanned
+
+    counts = {}
+    for table in TABLES:
+        data = read_table(snapshot_dir, table, since=since, until=until)
+        if data is None:
+            counts[table] = 0
+            continue
+        names = data.column_names
+        rows = zip(*(data.column(name).to_pylist() for name in names))
+
+        if table == "posts":
+            names, rows = _prepare_posts(names, rows)
+        sql = (f"INSERT OR IGNORE INTO {table} ({', '.join(names)}) "
+               f"VALUES ({', '.join('?' * len(names))})")
+        if table == "citations" and "source_post_id" in names:
+            sql = (f"INSERT OR IGNORE INTO citations ({', '.join(names)}) "
+                   f"SELECT {', '.join('?' * len(names))} WHERE EXISTS "
+                   f"(SELECT 1 FROM posts WHERE id = ?)")
+            source = names.index("source_post_id")
+            rows = (row + (row[source],) for row in rows)
+
+        # total_changes would also count trigger writes to blog_stats
+        before = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        conn.executemany(sql, rows)
+        counts[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] - before
+
+    if counts["citations"]:
+        mark_citations_scanned(conn)
+    conn.commit()
+    return counts
+
+
+def _prepare_posts(names, rows):
+    """Fill canonical_url for imported post rows exported without it."""
+    names = list(names)
+    if "canonical_url" not in names and "url" in names:
+        url = names.index("url")
+        rows = (row + (canonicalize_url(row[url]),) for row in rows)
+        names.append("canonical_url")
+    return names, rows
+
+
+def open_snapshot(snapshot_dir, since=None, until=None):
+    """Open a snapshot as an in-memory SQLite database.
+
+    The result has the full schema (init_db) and is populated with
+    import_snapshot(), so every analysis stage runs on it unchanged,
+    without reading the original database file.
+
+    Args:
+        snapshot_dir: Directory written by export_snapshot().
+        since: Optional ISO date lower bound on posts.published.
+        until: Optional ISO date upper bound on posts.published.
+
+    Returns:
+        sqlite3.Connection with row_factory set to sqlite3.Row.
+    """
+    if _snapshot_path(snapshot_dir, "posts")[0] is None:
+        raise FileNotFoundError(f"No snapshot found in {snapshot_dir}")
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys=ON")
+    init_db(conn)
+    import_snapshot(conn, snapshot_dir, since=since, until=until)
+    return conn
@@ -0,0 +1,274 @@
+"""Incremental TF-IDF keyword model built from persisted term counts.
+
+update_term_counts() counts the n-grams of each new post once, storing the
+post's term IDs and counts in post_terms and keeping per-term document
+frequencies (df) and total counts (tf) in terms. load_keyword_model() then
+builds the TF-IDF matrix from those rows without refitting: IDF weights are
+recomputed from the stored df on demand.
+
+Three vocabulary modes decide the matrix columns:
+
+* "dynamic" selects terms like KeywordModel.fit() (same min_df, max_df and
+  max_features rules, columns in alphabetical order), giving the same matrix.
+* "fixed" reuses the terms and IDF weights saved by freeze_vocabulary(), so
+  columns and weights stay stable across runs and analyzer.update_trends()
+  can recompute only the periods new posts fall into.
+* "hashing" maps each term to column crc32(term) % n_features, which is
+  stable without any saved vocabulary.
+"""
+
+import json
+import zlib
+from collections import Counter
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+from sklearn.preprocessing import normalize
+
+from hn_intel.analyzer import KeywordModel
+from hn_intel.db import attach_archives, get_meta, set_meta
+from hn_intel.tokens import TokenAnalyzer, get_post_tokens, select_features
+
+MODES = ("dynamic", "fixed", "hashing")
+
+# Stored term ID and count arrays are little-endian uint32.
+_ID_DTYPE = "<u4"
+_COUNT_DTYPE = "<u4"
+
+# Same analyzer as KeywordModel.fit().
+_ANALYZER = TokenAnalyzer(ENGLISH_STOP_WORDS, ngram_range=(1, 2))
+
+
+def _count_terms(tokens):
+    """Return a Counter of the keyword n-grams in a token list."""
+    return Counter(_ANALYZER(tokens))
+
+
+def _new_posts(conn):
+    """Return hot and archived posts that have no post_terms row yet."""
+    posts = conn.execute(
+        "SELECT p.id, p.title, hn_decompress(p.description) AS description, p.published "
+        "FROM posts p JOIN blogs b ON p.blog_id = b.id "
+        "WHERE NOT EXISTS (SELECT 1 FROM post_terms t WHERE t.post_id = p.id)"
+    ).fetchall()
+    for schema in attach_archives(conn):
+        posts.extend(conn.execute(
+            "SELECT p.id, p.title, hn_decompress(p.description) AS description, p.published "
+            f"FROM {schema}.posts p JOIN main.blogs b ON p.blog_id = b.id "
+            "WHERE NOT EXISTS (SELECT 1 FROM main.post_terms t WHERE t.post_id = p.id)"
+        ).fetchall())
+    return posts
+
+
+def update_term_counts(conn):
+    """Bring post_terms and the terms df/tf counts up to date with the posts.
+
+    Posts queued in stale_post_terms (changed, deleted, or whose ID was
+    reused) have their old counts subtracted first; posts without a
+    post_terms row are then counted and added.
+
+    Args:
+        conn: Writable sqlite3.Connection instance, outside a transaction.
+
+    Returns:
+        Dict with 'added' and 'removed' post counts and 'dates', the sorted
+        published dates of every post added or removed (for
+        analyzer.update_trends()).
+    """
+    attach_archives(conn)
+    df = Counter()
+    tf = Counter()
+    dates = set()
+
+    stale = conn.execute(
+        "SELECT s.post_id, t.published, t.term_ids, t.counts FROM stale_post_terms s "
+        "JOIN post_terms t ON t.post_id = s.post_id"
+    ).fetchall()
+    for _, published, term_ids, counts in stale:
+        ids = np.frombuffer(term_ids, dtype=_ID_DTYPE).tolist()
+        for term_id, count in zip(ids, np.frombuffer(counts, dtype=_COUNT_DTYPE).tolist()):
+            df[term_id] -= 1
+            tf[term_id] -= count
+        dates.add(published)
+    conn.execute(
+        "DELETE FROM post_terms WHERE post_id IN (SELECT post_id FROM stale_post_terms)"
+    )
+    conn.execute("DELETE FROM stale_post_terms")
+
+    posts = _new_posts(conn)
+    counted = [_count_terms(tokens) for tokens in get_post_tokens(conn, posts)]
+
+    ids = {}
+    new = sorted({term for counts in counted for term in counts})
+    for start in range(0, len(new), 500):
+        chunk = new[start:start + 500]
+        conn.executemany("INSERT OR IGNORE INTO terms (term) VALUES (?)", ((t,) for t in chunk))
+        ids.update(conn.execute(
+            f"SELECT term, id FROM terms WHERE term IN ({','.join('?' * len(chunk))})", chunk
+        ))
+
+    rows = []
+    for post, counts in zip(posts, counted):
+        term_ids = np.array([ids[term] for term in counts], dtype=_ID_DTYPE)
+        values = np.array(list(counts.values()), dtype=_COUNT_DTYPE)
+        for term_id, count in zip(term_ids.tolist(), values.tolist()):
+            df[term_id] += 1
+            tf[term_id] += count
+        rows.append((post["id"], post["published"], term_ids.tobytes(), values.tobytes()))
+        dates.add(post["published"])
+    conn.executemany(
+        "INSERT INTO post_terms (post_id, published, term_ids, counts) VALUES (?, ?, ?, ?)", rows
+    )
+    conn.executemany(
+        "UPDATE terms SET df = df + ?, tf = tf + ? WHERE id = ?",
+        [(df[term_id], tf[term_id], term_id) for term_id in df if df[term_id] or tf[term_id]],
+    )
+    conn.commit()
+    return {"added": len(rows), "removed": len(stale), "dates": sorted(d for d in dates if d)}
+
+
+def _select_terms(conn, n_docs, max_features):
+    """Pick columns the way TfidfVectorizer prunes its vocabulary.
+
+    Returns:
+        Tuple of (term ID array, df array) in alphabetical term order.
+    """
+    rows = conn.execute("SELECT id, df, tf FROM terms WHERE df > 0 ORDER BY term").fetchall()
+    stats = np.array(rows, dtype=np.int64).reshape(-1, 3)
+    term_ids, dfs, tfs = stats[:, 0], stats[:, 1], stats[:, 2]
+
+    kept = select_features(dfs, tfs, n_docs, min(3, n_docs), 0.7, max_features)
+    return term_ids[kept], dfs[kept]
+
+
+def _idf(dfs, n_docs):
+    """Smoothed IDF weights, as TfidfTransformer computes them."""
+    return np.log((1 + n_docs) / (1 + np.asarray(dfs, dtype=np.float64))) + 1
+
+
+def _term_names(conn, term_ids):
+    """Return the term string of each ID, in order."""
+    names = dict(conn.execute(
+        "SELECT id, term FROM terms WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps([int(i) for i in term_ids]),),
+    ))
+    return np.array([names[int(i)] for i in term_ids], dtype=object)
+
+
+def freeze_vocabulary(conn, max_features=500, refresh=False):
+    """Save the current term selection and IDF weights for "fixed" mode.
+
+    An existing frozen vocabulary for the same max_features is kept unless
+    refresh is set.
+
+    Args:
+        conn: Writable sqlite3.Connection instance with up-to-date counts.
+        max_features: Number of terms to keep.
+        refresh: Re-select terms and weights from the current counts.
+
+    Returns:
+        Number of frozen terms (0 if there are no counted posts).
+    """
+    frozen = get_meta(conn, "keyword_vocabulary")
+    if frozen is not None and not refresh:
+        frozen = json.loads(frozen)
+        if frozen["max_features"] == max_features:
+            return len(frozen["term_ids"])
+
+    n_docs = conn.execute("SELECT COUNT(*) FROM post_terms").fetchone()[0]
+    if not n_docs:
+        return 0
+    term_ids, dfs = _select_terms(conn, n_docs, max_features)
+    set_meta(conn, "keyword_vocabulary", json.dumps({
+        "max_features": max_features,
+        "term_ids": term_ids.tolist(),
+        "idf": _idf(dfs, n_docs).tolist(),
+    }))
+    conn.commit()
+    return len(term_ids)
+
+
+def _hash_columns(conn, n_features):
+    """Map every term ID to its hashed column and label each column.
+
+    Returns:
+        Tuple of (column array indexed by term ID, feature name array). A
+        column is named after its most frequent term.
+    """
+    rows = conn.execute("SELECT id, term, tf FROM terms ORDER BY tf DESC, term").fetchall()
+    columns = np.full(max((row[0] for row in rows), default=0) + 1, -1, dtype=np.int64)
+    names = np.full(n_features, "", dtype=object)
+    for term_id, term, _ in rows:
+        column = zlib.crc32(term.encode("utf-8")) % n_features
+        columns[term_id] = column
+        if not names[column]:
+            names[column] = term
+    return columns, names
+
+
+def load_keyword_model(conn, max_features=500, mode="dynamic", n_features=2 ** 16):
+    """Build a KeywordModel from persisted term counts, without refitting.
+
+    Run update_term_counts() first; this only reads, so it also works on
+    read-only connections.
+
+    Args:
+        conn: sqlite3.Connection instance.
+        max_features: Vocabulary cap for "dynamic" and "fixed" modes.
+        mode: One of MODES.
+        n_features: Number of hashed columns in "hashing" mode.
+
+    Returns:
+        analyzer.KeywordModel with vectorizer None; its matrix is None if
+        no posts have been counted. In "fixed" mode without a frozen
+        vocabulary for max_features, terms are selected as in "dynamic".
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}")
+    rows = conn.execute(
+        "SELECT post_id, published, term_ids, counts FROM post_terms ORDER BY post_id"
+    ).fetchall()
+    if not rows:
+        return KeywordModel(None, None, [], [], max_features, mode=mode)
+    n_docs = len(rows)
+
+    lengths = np.array([len(row[2]) // 4 for row in rows], dtype=np.int64)
+    term_ids = np.frombuffer(b"".join(row[2] for row in rows), dtype=_ID_DTYPE).astype(np.int64)
+    counts = np.frombuffer(b"".join(row[3] for row in rows), dtype=_COUNT_DTYPE).astype(np.float64)
+    row_ids = np.repeat(np.arange(n_docs), lengths)
+
+    if mode == "hashing":
+        columns, names = _hash_columns(conn, n_features)
+        counts_matrix = sp.csr_matrix(
+            (counts, (row_ids, columns[term_ids])), shape=(n_docs, n_features)
+        )
+        dfs = np.bincount(counts_matrix.indices, minlength=n_features)
+        idf = _idf(dfs, n_docs)
+    else:
+        frozen = get_meta(conn, "keyword_vocabulary") if mode == "fixed" else None
+        frozen = json.loads(frozen) if frozen is not None else None
+        if frozen is not None and frozen["max_features"] == max_features:
+            selected = np.array(frozen["term_ids"], dtype=np.int64)
+            idf = np.array(frozen["idf"])
+        else:
+            selected, dfs = _select_terms(conn, n_docs, max_features)
+            idf = _idf(dfs, n_docs)
+        names = _term_names(conn, selected)
+        columns = np.full(max(term_ids.max(), selected.max()) + 1, -1, dtype=np.int64)
+        columns[selected] = np.arange(len(selected))
+        mapped = columns[term_ids]
+        keep = mapped >= 0
+        counts_matrix = sp.csr_matrix(
+            (counts[keep], (row_ids[keep], mapped[keep])), shape=(n_docs, len(selected))
+        )
+
+    matrix = normalize(counts_matrix.multiply(idf).tocsr(), copy=False)
+    return KeywordModel(
+        None, matrix,
+        [row[0] for row in rows],
+        [row[1] for row in rows],
+        max_features,
+        feature_names=names,
+        mode=mode,
+    )
@@ -0,0 +1,352 @@
+"""Pre-tokenized document store shared by the TF-IDF vectorizers.
+
+Each post's title + stripped description is tokenized once with the same
+pattern the vectorizers used to apply, and stored in post_tokens as an
+array of vocab IDs. Vectorizers are then fitted on the token lists through
+TokenAnalyzer, which only applies stop words and n-grams.
+fit_vectorizer() can shard that fitting over a process pool.
+"""
+
+import re
+import sqlite3
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from numbers import Integral
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfTransformer
+
+from hn_intel.db import attach_archives, is_read_only
+from hn_intel.text import strip_html
+
+# Same token pattern as the original TfidfVectorizer configurations.
+TOKEN_PATTERN = r"(?u)\b[a-zA-Z][a-zA-Z0-9]{2,}\b"
+_TOKEN_RE = re.compile(TOKEN_PATTERN)
+
+# Stored token arrays are little-endian uint32 vocab IDs.
+_TOKEN_DTYPE = "<u4"
+
+
+def tokenize(text):
+    """Lower-case text and split it into tokens like TfidfVectorizer does.
+
+    Args:
+        text: Plain text string (or None).
+
+    Returns:
+        List of token strings.
+    """
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def post_text(post):
+    """Return the text a post contributes to TF-IDF: title + stripped description."""
+    return (post["title"] or "") + " " + strip_html(post["description"])
+
+
+class TokenAnalyzer:
+    """TfidfVectorizer analyzer for documents that are already token lists.
+
+    Removes stop words and adds word n-grams exactly as sklearn's word
+    analyzer does after tokenizing. A class rather than a closure so fitted
+    vectorizers stay picklable for the artifact cache.
+
+    Args:
+        stop_words: Iterable of words to drop, or None.
+        ngram_range: (min_n, max_n) tuple of n-gram sizes.
+    """
+
+    def __init__(self, stop_words=None, ngram_range=(1, 1)):
+        self.stop_words = frozenset(stop_words or ())
+        self.ngram_range = tuple(ngram_range)
+
+    def __call__(self, tokens):
+        if self.stop_words:
+            tokens = [t for t in tokens if t not in self.stop_words]
+        min_n, max_n = self.ngram_range
+        if max_n == 1:
+            return list(tokens)
+        terms = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+            terms.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return terms
+
+
+def _count_shard(analyzer, documents):
+    """Count the terms of a shard of documents (runs in a worker process).
+
+    Returns:
+        Tuple of (term list in first-seen order, CSR indptr, column indices,
+        counts), with columns indexing the shard's own term list.
+    """
+    local = defaultdict()
+    local.default_factory = local.__len__
+    indptr = [0]
+    indices = []
+    values = []
+    for doc in documents:
+        counts = defaultdict(int)
+        for term in analyzer(doc):
+            counts[local[term]] += 1
+        indices.extend(counts.keys())
+        values.extend(counts.values())
+        indptr.append(len(indices))
+    return (list(local), np.array(indptr, dtype=np.int64),
+            np.array(indices, dtype=np.int64), np.array(values, dtype=np.float64))
+
+
+def _sharded_counts(analyzer, documents, jobs):
+    """Count terms over a process pool and merge the shards.
+
+    Columns are laid out as sklearn's serial counting leaves them: indices
+    sorted by first-seen term ID within each row, then renumbered into
+    alphabetical order. Keeping that order keeps the floating-point sums
+    of the later normalization identical.
+
+    Returns:
+        Tuple of (sorted global term list, CSR count matrix with one row per
+        document and columns in term order).
+    """
+    size = -(-len(documents) // jobs)
+    shards = [documents[i:i + size] for i in range(0, len(documents), size)]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        counted = list(pool.map(_count_shard, repeat(analyzer), shards))
+
+    seen = {}
+    indptr = [np.zeros(1, dtype=np.int64)]
+    indices = []
+    values = []
+    for shard_terms, shard_indptr, shard_indices, shard_values in counted:
+        remap = np.array([seen.setdefault(term, len(seen)) for term in shard_terms],
+                         dtype=np.int64)
+        indptr.append(shard_indptr[1:] + indptr[-1][-1])
+        indices.append(remap[shard_indices])
+        values.append(shard_values)
+    counts = sp.csr_matrix(
+        (np.concatenate(values), np.concatenate(indices), np.concatenate(indptr)),
+        shape=(len(documents), len(seen)),
+    )
+    counts.sort_indices()
+
+    terms = sorted(seen)
+    alphabetical = np.empty(len(terms), dtype=counts.indices.dtype)
+    alphabetical[[seen[term] for term in terms]] = np.arange(len(terms))
+    counts.indices = alphabetical.take(counts.indices)
+    return terms, counts
+
+
+def select_features(dfs, tfs, n_docs, min_df=1, max_df=1.0, max_features=None):
+    """Pick the columns TfidfVectorizer keeps after counting.
+
+    Applies the min_df/max_df document-frequency bounds (ints are document
+    counts, floats fractions of n_docs) and then keeps the max_features
+    terms with the highest total counts, breaking ties as sklearn does.
+
+    Args:
+        dfs: Document frequency of each term, terms in alphabetical order.
+        tfs: Total count of each term, same order.
+        n_docs: Number of documents counted.
+        min_df, max_df, max_features: As for TfidfVectorizer.
+
+    Returns:
+        Sorted array of kept term positions.
+
+    Raises:
+        ValueError: If the bounds contradict each other or remove every term.
+    """
+    high = max_df if isinstance(max_df, Integral) else max_df * n_docs
+    low = min_df if isinstance(min_df, Integral) else min_df * n_docs
+    if high < low:
+        raise ValueError("max_df corresponds to < documents than min_df")
+    mask = (dfs <= high) & (dfs >= low)
+    if max_features is not None and mask.sum() > max_features:
+        keep = (-tfs[mask]).argsort()[:max_features]
+        limited = np.zeros(len(dfs), dtype=bool)
+        limited[np.where(mask)[0][keep]] = True
+        mask = limited
+    kept = np.where(mask)[0]
+    if not len(kept):
+        raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+    return kept
+
+
+def fit_vectorizer(vectorizer, documents, jobs=1):
+    """Fit a TfidfVectorizer and return its TF-IDF matrix, optionally in parallel.
+
+    With jobs > 1 the documents are split into contiguous shards whose terms
+    are counted in a process pool. The shard vocabularies and counts are
+    merged, pruned with the vectorizer's min_df, max_df and max_features
+    rules, and weighted exactly as vectorizer.fit_transform() would. The
+    vectorizer ends up fitted with the same vocabulary and IDF weights
+    either way.
+
+    Args:
+        vectorizer: Unfitted TfidfVectorizer with a picklable callable
+            analyzer (e.g. TokenAnalyzer) and default TF-IDF weighting.
+        documents: List of documents for the analyzer.
+        jobs: Number of worker processes; 1 fits serially.
+
+    Returns:
+        Sparse (documents x features) TF-IDF matrix.
+    """
+    jobs = min(jobs, len(documents))
+    if jobs <= 1:
+        return vectorizer.fit_transform(documents)
+
+    terms, counts = _sharded_counts(vectorizer.analyzer, documents, jobs)
+
+    dfs = np.bincount(counts.indices, minlength=len(terms))
+    tfs = np.asarray(counts.sum(axis=0)).ravel()
+    kept = select_features(dfs, tfs, len(documents), vectorizer.min_df, vectorizer.max_df,
+                           vectorizer.max_features)
+
+    counts = counts[:, kept]
+    vectorizer.vocabulary_ = {terms[i]: column for column, i in enumerate(kept)}
+    transformer = TfidfTransformer(
+        norm=vectorizer.norm, use_idf=vectorizer.use_idf,
+        smooth_idf=vectorizer.smooth_idf, sublinear_tf=vectorizer.sublinear_tf,
+    ).fit(counts)
+    vectorizer.idf_ = transformer.idf_
+    return transformer.transform(counts, copy=False)
+
+
+def _load_vocab(conn):
+    """Return the vocabulary as an object array indexed by vocab ID."""
+    rows = conn.execute("SELECT id, token FROM vocab").fetchall()
+    vocab = np.empty(max((row[0] for row in rows), default=0) + 1, dtype=object)
+    for token_id, token in rows:
+        vocab[token_id] = token
+    return vocab
+
+
+def _store_tokens(conn, fresh, vocab):
+    """Persist token lists for posts, extending the vocabulary as needed.
+
+    Args:
+        conn: sqlite3.Connection instance.
+        fresh: Dict mapping post ID to its token list.
+        vocab: Array from _load_vocab().
+    """
+    ids = {token: i for i, token in enumerate(vocab) if token is not None}
+    new = sorted({t for tokens in fresh.values() for t in tokens} - ids.keys())
+    conn.executemany("INSERT OR IGNORE INTO vocab (token) VALUES (?)", ((t,) for t in new))
+    if new:
+        for token_id, token in conn.execute(
+            "SELECT id, token FROM vocab WHERE id >= ?", (len(vocab),)
+        ):
+            ids[token] = token_id
+    conn.executemany(
+        "INSERT OR REPLACE INTO post_tokens (post_id, tokens) VALUES (?, ?)",
+        [
+            (post_id, np.array([ids[t] for t in tokens], dtype=_TOKEN_DTYPE).tobytes())
+            for post_id, tokens in fresh.items()
+        ],
+    )
+    conn.commit()
+
+
+def get_post_tokens(conn, posts):
+    """Return the token list of each post, tokenizing only unseen posts.
+
+    Posts without stored tokens are tokenized and, unless the connection is
+    read-only, stored for next time.
+
+    Args:
+        conn: sqlite3.Connection instance.
+        posts: Rows with id, title and (decoded) description, e.g. from
+            get_all_posts().
+
+    Returns:
+        List of token lists, aligned with posts.
+    """
+    vocab = _load_vocab(conn)
+    stored = {
+        row[0]: row[1]
+        for row in conn.execute(
+            "SELECT post_id, tokens FROM post_tokens "
+            "WHERE post_id IN (SELECT value FROM json_each(?))",
+            ("[" + ",".join(str(post["id"]) for post in posts) + "]",),
+        )
+    }
+    fresh = {
+        post["id"]: tokenize(post_text(post)) for post in posts if post["id"] not in stored
+    }
+    if fresh and not is_read_only(conn):
+        try:
+            _store_tokens(conn, fresh, vocab)
+        except sqlite3.OperationalError:
+            pass  # read-only database
+
+    return [
+        fresh[post["id"]] if post["id"] in fresh
+        else vocab[np.frombuffer(stored[post["id"]], dtype=_TOKEN_DTYPE)].tolist()
+        for post in posts
+    ]
+
+
+def iter_post_tokens(conn, chunk_size=5000, after_id=0):
+    """Stream the token list of every post in chunks, in post ID order.
+
+    Covers the same hot and archived posts as get_all_posts(), through a
+    single cursor. Stored tokens are used where present; other posts are
+    tokenized without being stored. Only one chunk of posts is held at a
+    time.
+
+    Args:
+        conn: sqlite3.Connection instance.
+        chunk_size: Posts per chunk.
+        after_id: Only stream posts with a higher ID.
+
+    Yields:
+        Tuple of (list of rows with id and published, list of token lists).
+    """
+    vocab = _load_vocab(conn)
+    columns = (
+        "SELECT p.id, p.published, p.title, t.tokens, "
+        "CASE WHEN t.tokens IS NULL THEN hn_decompress(p.description) END AS description "
+    )
+    selects = [
+        columns + "FROM posts p JOIN blogs b ON p.blog_id = b.id "
+        "LEFT JOIN post_tokens t ON t.post_id = p.id WHERE p.id > :after"
+    ]
+    for schema in attach_archives(conn):
+        selects.append(
+            columns + f"FROM {schema}.posts p JOIN main.blogs b ON p.blog_id = b.id "
+            "LEFT JOIN main.post_tokens t ON t.post_id = p.id "
+            "WHERE p.published >= '' AND p.id > :after"
+        )
+    cursor = conn.execute(" UNION ALL ".join(selects) + " ORDER BY 1", {"after": after_id})
+    while True:
+        posts = cursor.fetchmany(chunk_size)
+        if not posts:
+            return
+        yield posts, [
+            tokenize(post_text(post)) if post["tokens"] is None
+            else vocab[np.frombuffer(post["tokens"], dtype=_TOKEN_DTYPE)].tolist()
+            for post in posts
+        ]
+
+
+def tokenize_new_posts(conn):
+    """Tokenize and store every hot post that has no stored tokens yet.
+
+    Run before handing the database to read-only connections (which cannot
+    store tokens themselves), e.g. before parallel analysis stages.
+
+    Args:
+        conn: Writable sqlite3.Connection instance.
+
+    Returns:
+        Number of posts tokenized.
+    """
+    posts = conn.execute(
+        "SELECT p.id, p.title, hn_decompress(p.description) AS description FROM posts p "
+        "WHERE NOT EXISTS (SELECT 1 FROM post_tokens t WHERE t.post_id = p.id)"
+    ).fetchall()
+    if posts:
+        _store_tokens(conn, {
+            post["id"]: tokenize(post_text(post)) for post in posts
+        }, _load_vocab(conn))
+    return len(posts)
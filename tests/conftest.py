@@ -0,0 +1,42 @@
+"""Shared test fixtures."""
+
+import pytest
+
+from hn_intel.db import insert_post, upsert_blogs
+
+TOPICS = [
+    ("machine learning", "training machine learning models in production"),
+    ("rust compiler", "the rust compiler and the borrow checker"),
+    ("kubernetes operators", "running kubernetes operators for production workloads"),
+    ("webassembly runtimes", "webassembly runtimes at the edge for serverless functions"),
+]
+
+
+@pytest.fixture
+def seed_posts():
+    """Return a function seeding a database with posts cycling through TOPICS."""
+
+    def seed(conn, count=12, blogs=("Alpha", "Beta"), undated=()):
+        """Insert count posts over five months, by topic into the blogs.
+
+        Posts whose index is in undated get no published date. Returns
+        blog IDs by name ("Alpha Blog", ...).
+        """
+        upsert_blogs(conn, [
+            {"name": f"{name} Blog", "feed_url": f"https://{name.lower()}.com/feed",
+             "site_url": f"https://{name.lower()}.com"}
+            for name in blogs
+        ])
+        ids = {r["name"]: r["id"] for r in conn.execute("SELECT id, name FROM blogs")}
+        for i in range(count):
+            title, text = TOPICS[i % len(TOPICS)]
+            blog = f"{blogs[i % len(TOPICS) % len(blogs)]} Blog"
+            insert_post(conn, ids[blog], {
+                "title": f"{title} notes {i}",
+                "description": f"<p>{text} part {i}</p>",
+                "url": f"https://{blog.split()[0].lower()}.com/{i}",
+                "published": None if i in undated else f"2024-{i % 5 + 1:02d}-{i + 10}",
+            })
+        return ids
+
+    return seed
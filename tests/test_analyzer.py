@@ -2,13 +2,26 @@
 
 import sqlite3
 
-from hn_intel.db import init_db, upsert_blogs, insert_post
+import numpy as np
+import pytest
+
+from hn_intel.db import get_post_blogs, init_db, upsert_blogs, insert_post
 from hn_intel.analyzer import (
+    KeywordModel,
+    TrendCube,
+    compute_segment_trends,
+    compute_trend_series,
+    parse_dates,
+    period_keys,
     strip_html,
     extract_keywords,
     compute_trends,
     detect_emerging_topics,
+    emerging_topics_from_matrix,
     find_leading_blogs,
+    find_leading_blogs_batch,
+    segment_emerging_topics,
+    trend_matrix,
 )
 
 
@@ -197,6 +210,30 @@ def test_compute_trends_week_period():
     conn.close()
 
 
+def test_keyword_model_honours_max_features_and_is_reusable():
+    conn = _mem_db()
+    _seed_posts(conn)
+    model = KeywordModel.fit(conn, max_features=5)
+    assert len(model.feature_names) == 5
+    assert model.matrix.shape[0] == len(model.post_ids) == len(model.published)
+    assert model.period_keys("month")[0] == model.published[0][:7]
+
+    monthly = compute_trends(period="month", model=model)
+    assert monthly == compute_trends(conn, period="month", max_features=5)
+    assert all(len(scores) <= 5 for scores in monthly.values())
+    assert compute_trends(period="week", model=model) == compute_trends(conn, period="week",
+                                                                      max_features=5)
+    conn.close()
+
+
+def test_keyword_model_empty_db():
+    conn = _mem_db()
+    model = KeywordModel.fit(conn)
+    assert model.vectorizer is None
+    assert compute_trends(model=model) == {}
+    conn.close()
+
+
 # ── detect_emerging_topics tests ──
 
 
@@ -262,6 +299,202 @@ def test_detect_emerging_topics_sorted_by_acceleration():
 # ── find_leading_blogs tests ──
 
 
+def test_emerging_topics_from_matrix_multiple_windows_and_thresholds():
+    trends = {
+        "2024-01": {"rust": 0.1, "python": 0.4},
+        "2024-02": {"rust": 0.1, "python": 0.4},
+        "2024-03": {"rust": 0.1, "python": 0.4},
+        "2024-04": {"rust": 0.3, "python": 0.4},
+        "2024-05": {"rust": 0.9, "python": 0.4, "zig": 0.5},
+    }
+    matrix, periods, keywords = trend_matrix(trends)
+    assert periods == sorted(trends)
+    assert matrix.shape == (5, 3)
+
+    results = emerging_topics_from_matrix(
+        matrix.toarray(), keywords, windows=(1, 2, 5), thresholds=(2.0, 5.0)
+    )
+    assert set(results) == {(w, t) for w in (1, 2, 5) for t in (2.0, 5.0)}
+    assert [e["keyword"] for e in results[(1, 2.0)]] == ["rust"]
+    assert results[(1, 2.0)][0]["acceleration"] == 6.0
+    assert results[(1, 5.0)] == results[(1, 2.0)]
+    assert results[(2, 2.0)][0]["recent_score"] == 0.6
+    assert results[(2, 5.0)] == results[(2, 2.0)]
+    assert results[(5, 2.0)] == []  # no history left
+    assert results[(1, 2.0)] == detect_emerging_topics(trends, window=1)
+
+
+def test_trend_cube_behaves_like_trends_dict(tmp_path):
+    trends = {
+        "2024-02": {"rust": 0.5, "python": 0.25},
+        "2024-01": {"python": 0.125},
+    }
+    cube = TrendCube.from_trends(trends)
+    assert list(cube) == ["2024-01", "2024-02"]
+    assert cube == trends
+    assert cube["2024-02"] == {"rust": 0.5, "python": 0.25}
+    assert "2024-03" not in cube and cube.get("2024-03") is None
+    assert cube.keyword_series("python") == {"2024-01": 0.125, "2024-02": 0.25}
+    assert cube.keyword_series("zig") == {}
+
+    cube.save(tmp_path / "trends.npz")
+    loaded = TrendCube.load(tmp_path / "trends.npz")
+    assert loaded == cube
+    assert list(loaded.keywords) == list(cube.keywords)
+    assert TrendCube.from_json(cube.to_json()) == cube
+
+
+def test_trend_cube_drops_empty_periods_and_replaces_periods():
+    matrix = np.array([[0.0, 0.2], [0.0, 0.0], [0.1, 0.0]])
+    cube = TrendCube(matrix, ["2024-03", "2024-02", "2024-01"], ["rust", "zig"])
+    assert cube.to_dict() == {"2024-01": {"rust": 0.1}, "2024-03": {"zig": 0.2}}
+
+    fresh = TrendCube(np.array([[0.4]]), ["2024-02"], ["python"])
+    merged = cube.replace_periods(fresh, ["2024-02", "2024-03"])
+    assert merged.to_dict() == {"2024-01": {"rust": 0.1}, "2024-02": {"python": 0.4}}
+
+
+def test_compute_trends_returns_trend_cube():
+    conn = _mem_db()
+    _seed_posts(conn)
+    trends = compute_trends(conn)
+    assert isinstance(trends, TrendCube)
+    assert trends.matrix.shape == (len(trends), len(trends.keywords))
+    series = trends.keyword_series("webassembly")
+    assert series == {p: s["webassembly"] for p, s in trends.items() if "webassembly" in s}
+
+
+def test_period_keys_for_every_granularity():
+    dates = parse_dates(["2024-12-30", "2021-01-03T08:00:00", "2024-2-5", "", None, "junk"])
+    assert period_keys(dates, "day") == ["2024-12-30", "2021-01-03", "2024-02-05",
+                                         None, None, None]
+    assert period_keys(dates, "week")[:3] == ["2025-W01", "2020-W53", "2024-W06"]
+    assert period_keys(dates, "month")[:3] == ["2024-12", "2021-01", "2024-02"]
+    assert period_keys(dates, "quarter")[:3] == ["2024-Q4", "2021-Q1", "2024-Q1"]
+    with pytest.raises(ValueError):
+        period_keys(dates, "year")
+
+
+@pytest.mark.parametrize("bad", [
+    "2024", "2024-03", "20240305", "2024-13-01", "2024-02-30", "2024-03-5T",
+])
+def test_parse_dates_rejects_partial_and_impossible_dates(bad):
+    dates = parse_dates(["2024-06-01", bad])
+    for period in ("day", "week", "month", "quarter"):
+        assert period_keys(dates, period)[0] is not None
+        assert period_keys(dates, period)[1] is None
+    assert np.isnat(parse_dates(["2024-6-1", bad])[1])
+
+
+def test_compute_trend_series_matches_compute_trends():
+    conn = _mem_db()
+    _seed_posts(conn)
+    model = KeywordModel.fit(conn)
+    series = compute_trend_series(model, periods=("week", "month", "quarter"))
+    for period in ("week", "month", "quarter"):
+        expected = compute_trends(period=period, model=model)
+        actual = series[(period, None)]
+        assert list(actual) == list(expected)
+        for key, scores in expected.items():
+            assert actual[key] == pytest.approx(scores)
+    assert list(series[("quarter", None)]) == ["2024-Q1", "2024-Q2"]
+
+
+def test_compute_trend_series_rolling_and_ewma():
+    conn = _mem_db()
+    _seed_posts(conn)
+    model = KeywordModel.fit(conn)
+    series = compute_trend_series(model, periods=("month",),
+                                  smoothings=(None, "rolling:2", "ewma:0.5"))
+    raw = series[("month", None)]
+    rolling = series[("month", "rolling:2")]
+    ewma = series[("month", "ewma:0.5")]
+
+    keyword = "kubernetes"
+    raw_series = [raw[p].get(keyword, 0.0) for p in raw]
+    assert [rolling[p].get(keyword, 0.0) for p in raw] == pytest.approx(
+        [(a + b) / 2 for a, b in zip([0.0] + raw_series, raw_series)]
+    )
+    expected, level = [], 0.0
+    for value in raw_series:
+        level = 0.5 * value + 0.5 * level
+        expected.append(level)
+    assert [ewma[p].get(keyword, 0.0) for p in raw] == pytest.approx(expected, abs=1e-6)
+
+    assert compute_trends(period="month", model=model, smoothing="rolling:2") == rolling
+    # Days without posts are part of the smoothed series
+    daily = compute_trend_series(model, ("day",), ("rolling:7",))[("day", "rolling:7")]
+    assert "2024-01-16" in daily and "2024-01-16" not in series[("month", None)]
+    with pytest.raises(ValueError):
+        compute_trend_series(model, smoothings=("median:3",))
+
+
+def test_compute_segment_trends_matches_per_segment_trends():
+    conn = _mem_db()
+    _seed_posts(conn)
+    model = KeywordModel.fit(conn)
+    post_blogs = get_post_blogs(conn)
+    segments = {
+        "everyone": ["Alpha Blog", "Beta Blog"],
+        "alpha": ["Alpha Blog"],
+        "beta": ["Beta Blog"],
+        "nobody": ["Missing Blog"],
+    }
+
+    cubes = compute_segment_trends(model, "month", post_blogs, segments)
+    assert cubes["everyone"] == compute_trends(model=model)
+    assert cubes["nobody"] == {}
+    for name in ("alpha", "beta"):
+        rows = [i for i, pid in enumerate(model.post_ids) if post_blogs[pid] in segments[name]]
+        subset = KeywordModel(None, model.matrix[rows], [model.post_ids[i] for i in rows],
+                              [model.published[i] for i in rows],
+                              feature_names=model.feature_names)
+        expected = compute_trends(model=subset)
+        assert cubes[name] == expected
+        assert segment_emerging_topics(cubes)[name] == detect_emerging_topics(expected)
+
+
+def test_find_leading_blogs_matches_whole_terms():
+    conn = _mem_db()
+    ids = _seed_blogs(conn)
+    for i, text in enumerate(["Trusty rustc internals", "Rust in the kernel",
+                              "State of the art parsing"]):
+        insert_post(conn, ids["Alpha Blog"], {
+            "title": text, "description": "", "url": f"https://alpha.com/t{i}",
+            "published": f"2024-01-0{i + 1}",
+        })
+    result = find_leading_blogs_batch(conn, ["rust", "state art", "the art"])
+    # Substrings of other words don't count; stop words are dropped like
+    # the keyword model does, so "state art" is the bigram of the third post
+    assert [r["mention_count"] for r in result["rust"]] == [1]
+    assert result["rust"][0]["first_mention"] == "2024-01-02"
+    assert result["state art"][0]["first_mention"] == "2024-01-03"
+    assert result["the art"] == find_leading_blogs(conn, "art")
+    conn.close()
+
+
+def test_find_leading_blogs_falls_back_to_substrings_for_dropped_keywords():
+    conn = _mem_db()
+    ids = _seed_blogs(conn)
+    for i, (blog, text) in enumerate([("Alpha Blog", "AI agents in practice"),
+                                      ("Beta Blog", "Rust and AI"),
+                                      ("Beta Blog", "Other things")]):
+        insert_post(conn, ids[blog], {
+            "title": text, "description": "<p>Notes</p>", "url": f"https://x.com/ai{i}",
+            "published": f"2024-02-0{i + 1}",
+        })
+    result = find_leading_blogs_batch(conn, ["AI", "rust", "the"])
+    assert [(r["blog_name"], r["mention_count"]) for r in result["AI"]] == [
+        ("Alpha Blog", 1), ("Beta Blog", 1),
+    ]
+    assert result["AI"][0]["first_mention"] == "2024-02-01"
+    assert [r["mention_count"] for r in result["rust"]] == [1]
+    # "the" is a stop word, matched as a substring ("Other" contains it)
+    assert [r["blog_name"] for r in result["the"]] == ["Beta Blog"]
+    assert find_leading_blogs(conn, "ai") == result["AI"]
+    conn.close()
+
+
 def test_find_leading_blogs_empty_db():
     conn = _mem_db()
     result = find_leading_blogs(conn, "python")
@@ -338,3 +571,15 @@ def test_find_leading_blogs_sorted_by_first_mention():
         for i in range(len(result) - 1):
             assert result[i]["first_mention"] <= result[i + 1]["first_mention"]
     conn.close()
+
+
+def test_find_leading_blogs_batch_matches_single_keyword_calls():
+    conn = _mem_db()
+    _seed_posts(conn)
+    keywords = ["machine learning", "Kubernetes", "rust", "webassembly", "nonexistent_xyz", "s"]
+    batch = find_leading_blogs_batch(conn, keywords)
+    assert list(batch) == keywords
+    for keyword in keywords:
+        assert batch[keyword] == find_leading_blogs(conn, keyword)
+    assert batch["nonexistent_xyz"] == []
+    assert find_leading_blogs_batch(conn, []) == {}
@@ -0,0 +1,116 @@
+"""Tests for the benchmark helpers."""
+
+import pytest
+from click.testing import CliRunner
+
+from hn_intel.bench import (
+    _legacy_aggregate_trends,
+    _legacy_detect_emerging,
+    _synthetic_tfidf,
+    _synthetic_trends,
+    bench_compression,
+    bench_emerging,
+    bench_in_memory,
+    bench_profiles,
+    bench_strip_html,
+    bench_trends,
+)
+from hn_intel.cli import main
+
+
+def test_bench_profiles_reports_every_profile(tmp_path):
+    results = bench_profiles(profiles=["default", "readonly"], rows=20, repeat=1,
+                             workdir=str(tmp_path))
+    assert [r["profile"] for r in results] == ["default", "readonly"]
+    assert results[0]["insert_rows_per_s"] > 0
+    assert results[1]["insert_rows_per_s"] is None
+    assert all(r["scan_rows_per_s"] > 0 for r in results)
+
+
+def test_cli_db_bench():
+    runner = CliRunner()
+    result = runner.invoke(main, ["db", "bench", "--rows", "10", "--repeat", "1",
+                                  "--profile", "ingest"])
+    assert result.exit_code == 0, result.output
+    assert "ingest" in result.output
+    assert "Scan rows/s" in result.output
+
+
+def test_bench_compression_shrinks_database(tmp_path):
+    plain, compressed = bench_compression(rows=50, repeat=1, workdir=str(tmp_path))
+    assert plain["mode"] == "plain"
+    assert compressed["mode"] == "compressed"
+    assert compressed["bytes"] < plain["bytes"]
+    assert compressed["scan_rows_per_s"] > 0
+
+
+def test_bench_in_memory_times_both_modes(tmp_path):
+    disk, memory = bench_in_memory(rows=40, blogs=3, repeat=1, workdir=str(tmp_path))
+    assert (disk["mode"], memory["mode"]) == ("disk", "memory")
+    assert disk["run_s"] > 0 and memory["run_s"] > 0
+    assert memory["load_s"] >= 0
+
+
+def test_bench_trends_reports_speedup():
+    results = bench_trends(sizes=(300,), features=20, periods=4, terms_per_post=3,
+                           sample_posts=100, sample_features=20)
+    assert [r["posts"] for r in results] == [300]
+    assert results[0]["vectorized_s"] > 0 and results[0]["legacy_s"] > 0
+
+
+def test_aggregate_trends_matches_original_loop():
+    from hn_intel.analyzer import aggregate_trends
+
+    matrix, feature_names, keys = _synthetic_tfidf(200, 30, 5, 4)
+    keys[0] = None
+    expected = _legacy_aggregate_trends(matrix, feature_names, keys)
+    actual = aggregate_trends(matrix, feature_names, keys)
+    assert list(actual) == list(expected)
+    for period, scores in expected.items():
+        assert list(actual[period]) == list(scores)
+        assert actual[period] == pytest.approx(scores, rel=1e-12)
+
+
+def test_bench_emerging_reports_speedup():
+    result = bench_emerging(keywords=200, periods=20, windows=(3,), thresholds=(2.0,),
+                            sample_keywords=50, repeat=1)
+    assert result["combinations"] == 1
+    assert result["vectorized_s"] > 0 and result["legacy_s"] > 0
+
+
+def test_emerging_engine_matches_original_loop():
+    from hn_intel.analyzer import emerging_topics_from_matrix, trend_matrix
+
+    matrix, names = _synthetic_trends(300, 24, 0.2)
+    trends = {}
+    coo = matrix.tocoo()
+    for row, col, value in zip(coo.row, coo.col, coo.data):
+        trends.setdefault(f"p{row:02d}", {})[names[col]] = float(value)
+    dense, _, keywords = trend_matrix(trends)
+
+    results = emerging_topics_from_matrix(dense, keywords, windows=(1, 3, 6), thresholds=(2.0,))
+    for window in (1, 3, 6):
+        expected = _legacy_detect_emerging(trends, window)
+        actual = results[(window, 2.0)]
+        assert expected
+        assert sorted(e["keyword"] for e in actual) == sorted(e["keyword"] for e in expected)
+        assert [e["acceleration"] for e in actual] == [e["acceleration"] for e in expected]
+        by_keyword = {e["keyword"]: e for e in expected}
+        for e in actual:
+            assert e["recent_score"] == pytest.approx(by_keyword[e["keyword"]]["recent_score"])
+
+
+def test_bench_strip_html_reports_all_methods():
+    results = bench_strip_html(rows=30, repeat=1)
+    assert [r["method"] for r in results] == ["regex", "tokenizer", "memoized"]
+    assert all(r["posts"] == 30 and r["mb_per_s"] > 0 for r in results)
+
+
+def test_cli_db_bench_strip_html(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    runner = CliRunner()
+    result = runner.invoke(main, ["db", "bench", "--kind", "strip-html", "--rows", "10",
+                                  "--repeat", "1"])
+    assert result.exit_code == 0, result.output
+    assert "10 synthetic posts" in result.output
+    assert "memoized" in result.output
@@ -0,0 +1,92 @@
+"""Tests for the analysis artifact cache."""
+
+import sqlite3
+
+from hn_intel.cache import cached, clear_artifacts, corpus_version, load_artifact, store_artifact
+from hn_intel.db import init_db, insert_post, upsert_blogs
+
+
+def _mem_db():
+    """Create an in-memory SQLite database with schema initialized."""
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys=ON")
+    init_db(conn)
+    return conn
+
+
+def _seed(conn):
+    upsert_blogs(conn, [
+        {"name": "Alpha Blog", "feed_url": "https://alpha.com/feed", "site_url": "https://alpha.com"},
+    ])
+    blog_id = conn.execute("SELECT id FROM blogs").fetchone()["id"]
+    insert_post(conn, blog_id, {"title": "First", "url": "https://alpha.com/1"})
+    return blog_id
+
+
+def test_corpus_version_tracks_changes():
+    conn = _mem_db()
+    blog_id = _seed(conn)
+    versions = [corpus_version(conn)]
+
+    insert_post(conn, blog_id, {"title": "Second", "url": "https://alpha.com/2"})
+    versions.append(corpus_version(conn))
+
+    conn.execute("UPDATE posts SET title = 'Edited' WHERE url = 'https://alpha.com/1'")
+    versions.append(corpus_version(conn))
+
+    conn.execute("DELETE FROM posts WHERE url = 'https://alpha.com/2'")
+    versions.append(corpus_version(conn))
+
+    conn.execute("UPDATE blogs SET name = 'Renamed'")
+    versions.append(corpus_version(conn))
+
+    assert len(set(versions)) == len(versions)
+
+
+def test_corpus_version_ignores_fetch_bookkeeping():
+    conn = _mem_db()
+    _seed(conn)
+    before = corpus_version(conn)
+    conn.execute("UPDATE blogs SET last_fetched = '2024-01-01', fetch_status = 'ok'")
+    assert corpus_version(conn) == before
+
+
+def test_cached_reuses_until_corpus_changes():
+    conn = _mem_db()
+    blog_id = _seed(conn)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"value": len(calls)}
+
+    assert cached(conn, "stage", {"k": 1}, compute) == {"value": 1}
+    assert cached(conn, "stage", {"k": 1}, compute) == {"value": 1}
+    assert len(calls) == 1
+
+    # Different params are cached separately
+    assert cached(conn, "stage", {"k": 2}, compute) == {"value": 2}
+
+    insert_post(conn, blog_id, {"title": "New", "url": "https://alpha.com/new"})
+    assert cached(conn, "stage", {"k": 1}, compute) == {"value": 3}
+
+
+def test_cached_disabled_always_computes():
+    conn = _mem_db()
+    _seed(conn)
+    calls = []
+    for _ in range(2):
+        cached(conn, "stage", {}, lambda: calls.append(1) or "x", enabled=False)
+    assert len(calls) == 2
+    assert load_artifact(conn, "stage", {}) is None
+
+
+def test_clear_artifacts():
+    conn = _mem_db()
+    _seed(conn)
+    store_artifact(conn, "a", {}, [1, 2])
+    store_artifact(conn, "b", {}, [3])
+    assert load_artifact(conn, "a", {}) == [1, 2]
+    assert clear_artifacts(conn) == 2
+    assert load_artifact(conn, "a", {}) is None
@@ -4,6 +4,8 @@ import sqlite3
 import os
 import tempfile
 
+import numpy as np
+
 from hn_intel.db import init_db, upsert_blogs, insert_post
 from hn_intel.clusters import (
     strip_html,
@@ -115,6 +117,28 @@ def test_compute_blog_vectors():
         os.unlink(path)
 
 
+def test_compute_blog_vectors_parallel_matches_serial():
+    conn, path = _temp_db()
+    try:
+        init_db(conn)
+        _seed_blogs(conn)
+
+        serial, names, vectorizer = compute_blog_vectors(conn, max_features=20)
+        parallel, parallel_names, parallel_vectorizer = compute_blog_vectors(
+            conn, max_features=20, jobs=3
+        )
+
+        assert parallel_names == names
+        assert list(parallel_vectorizer.get_feature_names_out()) == list(
+            vectorizer.get_feature_names_out()
+        )
+        assert np.array_equal(parallel.indices, serial.indices)
+        assert np.array_equal(parallel.data, serial.data)
+    finally:
+        conn.close()
+        os.unlink(path)
+
+
 def test_compute_similarity_matrix():
     conn, path = _temp_db()
     try:
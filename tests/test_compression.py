@@ -0,0 +1,42 @@
+"""Tests for description compression."""
+
+from hn_intel.compression import (
+    MAX_DICT_BYTES,
+    compress,
+    decompress,
+    dictionary_id,
+    is_compressed,
+    train_dictionary,
+)
+
+_DOCS = [
+    f"<p>Kubernetes operators reconcile state for service {i}. "
+    f"Kubernetes operators reconcile deployments and rollouts.</p>"
+    for i in range(50)
+]
+
+
+def test_roundtrip_without_dictionary():
+    blob = compress("héllo <b>world</b>")
+    assert is_compressed(blob)
+    assert dictionary_id(blob) == 0
+    assert decompress(blob) == "héllo <b>world</b>"
+
+
+def test_roundtrip_with_dictionary():
+    zdict = train_dictionary(_DOCS)
+    blob = compress(_DOCS[7], zdict, dict_id=3)
+    assert dictionary_id(blob) == 3
+    assert decompress(blob, zdict) == _DOCS[7]
+
+
+def test_dictionary_improves_small_documents():
+    zdict = train_dictionary(_DOCS)
+    assert 0 < len(zdict) <= MAX_DICT_BYTES
+    assert len(compress(_DOCS[0], zdict, 1)) < len(compress(_DOCS[0]))
+
+
+def test_is_compressed_rejects_plain_values():
+    assert not is_compressed("plain text")
+    assert not is_compressed(None)
+    assert not is_compressed(b"other blob")
@@ -3,8 +3,20 @@
 import sqlite3
 import tempfile
 import os
+from datetime import date, timedelta
+
+import pytest
 
 from hn_intel.db import (
+    MAX_ARCHIVE_FILES,
+    PROFILE_ENV_VAR,
+    MemoryCopy,
+    ReadPool,
+    archive_posts,
+    attach_archives,
+    canonicalize_url,
+    compress_posts,
+    decompress_posts,
     get_connection,
     init_db,
     upsert_blogs,
@@ -12,6 +24,12 @@ from hn_intel.db import (
     get_all_posts,
     get_blog_domains,
     get_blogs,
+    get_blog_stats,
+    get_citation_edges,
+    get_corpus_summary,
+    get_meta,
+    get_posts_since,
+    set_meta,
 )
 
 
@@ -141,3 +159,610 @@ def test_get_connection():
             assert row["name"] == "X"
         finally:
             conn.close()
+
+
+def test_get_connection_default_profile_is_wal_only():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = get_connection(os.path.join(tmpdir, "test.db"), profile="default")
+        try:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 2  # FULL
+        finally:
+            conn.close()
+
+
+def test_get_connection_ingest_profile_pragmas():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = get_connection(os.path.join(tmpdir, "test.db"), profile="ingest")
+        try:
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+            assert conn.execute("PRAGMA cache_size").fetchone()[0] == -65536
+            assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+            assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+        finally:
+            conn.close()
+
+
+def test_get_connection_profile_from_env(monkeypatch):
+    monkeypatch.setenv(PROFILE_ENV_VAR, "ingest")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = get_connection(os.path.join(tmpdir, "test.db"))
+        try:
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+        finally:
+            conn.close()
+
+
+def test_get_connection_unknown_profile():
+    with pytest.raises(ValueError, match="Unknown connection profile"):
+        get_connection(":memory:", profile="turbo")
+
+
+def test_get_connection_readonly_profile_rejects_writes():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "test.db")
+        conn = get_connection(db_path)
+        init_db(conn)
+        conn.close()
+
+        ro = get_connection(db_path, profile="readonly")
+        try:
+            assert ro.execute("SELECT COUNT(*) FROM blogs").fetchone()[0] == 0
+            with pytest.raises(sqlite3.OperationalError):
+                ro.execute("INSERT INTO blogs (name) VALUES ('x')")
+        finally:
+            ro.close()
+
+
+def _seed_pool_db(db_path):
+    conn = get_connection(db_path)
+    init_db(conn)
+    upsert_blogs(conn, [
+        {"name": "Blog A", "feed_url": "https://a.com/feed", "site_url": "https://a.com"},
+    ])
+    return conn
+
+
+def test_read_pool_is_pinned_to_snapshot():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "test.db")
+        writer = _seed_pool_db(db_path)
+        pool = ReadPool(db_path, size=2)
+        try:
+            upsert_blogs(writer, [
+                {"name": "Blog B", "feed_url": "https://b.com/feed", "site_url": "https://b.com"},
+            ])
+            with pool.connection() as c1, pool.connection() as c2:
+                assert c1.execute("SELECT COUNT(*) FROM blogs").fetchone()[0] == 1
+                assert c2.execute("SELECT COUNT(*) FROM blogs").fetchone()[0] == 1
+
+            pool.refresh()
+            assert pool.run(lambda c: c.execute("SELECT COUNT(*) FROM blogs").fetchone()[0]) == 2
+        finally:
+            pool.close()
+            writer.close()
+
+
+def test_read_pool_connections_are_read_only():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "test.db")
+        writer = _seed_pool_db(db_path)
+        try:
+            with ReadPool(db_path, size=1) as pool, pool.connection() as conn:
+                with pytest.raises(sqlite3.OperationalError):
+                    conn.execute("DELETE FROM blogs")
+        finally:
+            writer.close()
+
+
+def test_read_pool_rejects_memory_db():
+    with pytest.raises(ValueError):
+        ReadPool(":memory:")
+
+
+def test_memory_copy_saves_back_to_disk():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "test.db")
+        _seed_pool_db(db_path).close()
+
+        with MemoryCopy(db_path) as copy:
+            assert copy.conn.execute("PRAGMA database_list").fetchone()[2] == ""
+            upsert_blogs(copy.conn, [
+                {"name": "Blog B", "feed_url": "https://b.com/feed", "site_url": "https://b.com"},
+            ])
+            check = get_connection(db_path)
+            assert check.execute("SELECT COUNT(*) FROM blogs").fetchone()[0] == 1
+            copy.save()
+            assert check.execute("SELECT COUNT(*) FROM blogs").fetchone()[0] == 2
+            check.close()
+
+
+def test_memory_copy_refuses_to_overwrite_newer_file():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "test.db")
+        writer = _seed_pool_db(db_path)
+        try:
+            with MemoryCopy(db_path) as copy:
+                upsert_blogs(writer, [
+                    {"name": "Blog B", "feed_url": "https://b.com/feed", "site_url": "https://b.com"},
+                ])
+                with pytest.raises(RuntimeError):
+                    copy.save()
+        finally:
+            writer.close()
+        with pytest.raises(FileNotFoundError):
+            MemoryCopy(os.path.join(tmpdir, "missing.db"))
+
+
+def test_memory_copy_sees_commits_racing_the_backup(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "test.db")
+        _seed_pool_db(db_path).close()
+        connect = sqlite3.connect
+
+        class RacingConnection(sqlite3.Connection):
+            """Source connection whose backup is followed by another commit."""
+
+            def backup(self, target, *args, **kwargs):
+                super().backup(target, *args, **kwargs)
+                writer = connect(db_path)
+                writer.execute("INSERT INTO blogs (name) VALUES ('Blog B')")
+                writer.commit()
+                writer.close()
+
+        def racing_connect(path, *args, **kwargs):
+            if path == db_path:
+                kwargs["factory"] = RacingConnection
+            return connect(path, *args, **kwargs)
+
+        monkeypatch.setattr(sqlite3, "connect", racing_connect)
+        with MemoryCopy(db_path) as copy:
+            with pytest.raises(RuntimeError):
+                copy.save()
+
+
+def test_init_db_migration_dedupes_citations():
+    conn, path = _temp_db()
+    try:
+        # Simulate a pre-migration database holding duplicate citations
+        conn.executescript("""
+            CREATE TABLE citations (id INTEGER PRIMARY KEY, source_post_id INTEGER,
+                source_blog_id INTEGER, target_blog_id INTEGER, target_url TEXT);
+            INSERT INTO citations (source_post_id, source_blog_id, target_blog_id, target_url)
+            VALUES (1, 1, 2, 'https://b.com/x'), (1, 1, 2, 'https://b.com/x'),
+                   (1, 1, 2, 'https://b.com/y');
+        """)
+        init_db(conn)
+        assert conn.execute("SELECT COUNT(*) FROM citations").fetchone()[0] == 2
+        assert conn.execute("PRAGMA user_version").fetchone()[0] >= 1
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute(
+                "INSERT INTO citations (source_post_id, target_url) VALUES (1, 'https://b.com/x')"
+            )
+    finally:
+        conn.close()
+        os.unlink(path)
+
+
+def test_meta_roundtrip():
+    conn, path = _temp_db()
+    try:
+        init_db(conn)
+        assert get_meta(conn, "missing", "fallback") == "fallback"
+        set_meta(conn, "k", 5)
+        set_meta(conn, "k", 6)
+        assert get_meta(conn, "k") == "6"
+    finally:
+        conn.close()
+        os.unlink(path)
+
+
+def test_get_posts_since():
+    conn, path = _temp_db()
+    try:
+        init_db(conn)
+        upsert_blogs(conn, [
+            {"name": "Blog A", "feed_url": "https://a.com/feed", "site_url": "https://a.com"},
+        ])
+        blog_id = conn.execute("SELECT id FROM blogs").fetchone()["id"]
+        for i in range(3):
+            insert_post(conn, blog_id, {"title": f"P{i}", "url": f"https://a.com/{i}"})
+        first_id = conn.execute("SELECT MIN(id) FROM posts").fetchone()[0]
+        rows = get_posts_since(conn, first_id)
+        assert [r["title"] for r in rows] == ["P1", "P2"]
+        assert rows[0]["blog_name"] == "Blog A"
+    finally:
+        conn.close()
+        os.unlink(path)
+
+
+def _expected_blog_stats(conn):
+    return [tuple(r) for r in conn.execute(
+        "SELECT blog_id, COUNT(*), MIN(NULLIF(published, '')), MAX(NULLIF(published, '')) "
+        "FROM posts GROUP BY blog_id ORDER BY blog_id"
+    ).fetchall()]
+
+
+def _actual_blog_stats(conn):
+    return [
+        (r["blog_id"], r["post_count"], r["first_published"], r["last_published"])
+        for r in get_blog_stats(conn)
+    ]
+
+
+def test_blog_stats_follow_inserts_updates_and_deletes():
+    conn, path = _temp_db()
+    try:
+        init_db(conn)
+        upsert_blogs(conn, [
+            {"name": "Blog A", "feed_url": "https://a.com/feed", "site_url": "https://a.com"},
+            {"name": "Blog B", "feed_url": "https://b.com/feed", "site_url": "https://b.com"},
+        ])
+        a, b = [r["id"] for r in conn.execute("SELECT id FROM blogs ORDER BY id")]
+        dates = ["2024-03-01", "2024-01-01", "", "2024-05-01", "2024-02-01"]
+        for i, published in enumerate(dates):
+            insert_post(conn, a if i % 2 == 0 else b, {
+                "title": f"P{i}", "url": f"https://x.com/{i}", "published": published,
+            })
+        assert _actual_blog_stats(conn) == _expected_blog_stats(conn)
+
+        # Delete the post holding blog A's first date
+        conn.execute("DELETE FROM posts WHERE published = '2024-03-01'")
+        assert _actual_blog_stats(conn) == _expected_blog_stats(conn)
+
+        # Move a post across blogs and re-date another
+        conn.execute("UPDATE posts SET blog_id = ? WHERE url = 'https://x.com/1'", (a,))
+        conn.execute("UPDATE posts SET published = '2023-12-31' WHERE url = 'https://x.com/4'")
+        assert _actual_blog_stats(conn) == _expected_blog_stats(conn)
+    finally:
+        conn.close()
+        os.unlink(path)
+
+
+def test_blog_stats_cadence_and_summary():
+    conn, path = _temp_db()
+    try:
+        init_db(conn)
+        upsert_blogs(conn, [
+            {"name": "Blog A", "feed_url": "https://a.com/feed", "site_url": "https://a.com"},
+            {"name": "Blog B", "feed_url": "https://b.com/feed", "site_url": "https://b.com"},
+        ])
+        blog_id = conn.execute("SELECT id FROM blogs WHERE name = 'Blog A'").fetchone()[0]
+        for i, published in enumerate(["2024-01-01", "2024-01-11", "2024-01-21", ""]):
+            insert_post(conn, blog_id, {
+                "title": f"P{i}", "url": f"https://a.com/{i}", "published": published,
+            })
+
+        stats = get_blog_stats(conn)
+        assert len(stats) == 1
+        assert stats[0]["blog_name"] == "Blog A"
+        assert stats[0]["post_count"] == 4
+        assert stats[0]["avg_cadence_days"] == 10.0
+
+        summary = get_corpus_summary(conn)
+        assert summary == {
+            "blogs": 2,
+            "posts": 4,
+            "first_published": "2024-01-01",
+            "last_published": "2024-01-21",
+        }
+    finally:
+        conn.close()
+        os.unlink(path)
+
+
+def test_blog_stats_backfilled_by_migration():
+    conn, path = _temp_db()
+    try:
+        init_db(conn)
+        upsert_blogs(conn, [
+            {"name": "Blog A", "feed_url": "https://a.com/feed", "site_url": "https://a.com"},
+        ])
+        blog_id = conn.execute("SELECT id FROM blogs").fetchone()[0]
+        insert_post(conn, blog_id, {"title": "P", "url": "https://a.com/p", "published": "2024-01-01"})
+
+        # Pretend the stats migration never ran
+        conn.executescript("""
+            DROP TRIGGER trg_posts_stats_insert;
+            DROP TRIGGER trg_posts_stats_delete;
+            DROP TRIGGER trg_posts_stats_update;
+            DROP TABLE blog_stats;
+            PRAGMA user_version = 2;
+        """)
+        init_db(conn)
+        assert _actual_blog_stats(conn) == _expected_blog_stats(conn)
+    finally:
+        conn.close()
+        os.unlink(path)
+
+
+def test_canonicalize_url_variants():
+    expected = "https://a.com/posts/hello"
+    assert canonicalize_url("https://a.com/posts/hello") == expected
+    assert canonicalize_url("http://a.com/posts/hello/") == expected
+    assert canonicalize_url("HTTPS://WWW.A.com:443/posts/hello#comments") == expected
+    assert canonicalize_url(
+        "https://a.com/posts/hello?utm_source=rss&utm_medium=feed&fbclid=x"
+    ) == expected
+    # Meaningful query parameters and paths survive
+    assert canonicalize_url("https://a.com/?p=12&utm_source=rss") == "https://a.com?p=12"
+    assert canonicalize_url("https://a.com/Posts/Hello") == "https://a.com/Posts/Hello"
+    assert canonicalize_url("https://a.com:8080/x") == "https://a.com:8080/x"
+
+
+def test_insert_post_rejects_canonical_duplicates():
+    conn, path = _temp_db()
+    try:
+        init_db(conn)
+        upsert_blogs(conn, [
+            {"name": "Blog A", "feed_url": "https://a.com/feed", "site_url": "https://a.com"},
+        ])
+        blog_id = conn.execute("SELECT id FROM blogs").fetchone()["id"]
+        assert insert_post(conn, blog_id, {"title": "P", "url": "https://a.com/p"}) is True
+        assert insert_post(conn, blog_id, {"title": "P", "url": "http://a.com/p/"}) is False
+        assert insert_post(conn, blog_id, {
+            "title": "P", "url": "https://www.a.com/p?utm_campaign=x",
+        }) is False
+        assert conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0] == 1
+    finally:
+        conn.close()
+        os.unlink(path)
+
+
+def test_canonical_url_migration_dedupes_posts():
+    conn, path = _temp_db()
+    try:
+        init_db(conn)
+        upsert_blogs(conn, [
+            {"name": "Blog A", "feed_url": "https://a.com/feed", "site_url": "https://a.com"},
+        ])
+        blog_id = conn.execute("SELECT id FROM blogs").fetchone()["id"]
+
+        # Pretend the canonical URL migration never ran
+        conn.executescript("""
+            DROP INDEX idx_posts_canonical_url;
+            UPDATE posts SET canonical_url = NULL;
+            PRAGMA user_version = 3;
+        """)
+        conn.executemany(
+            "INSERT INTO posts (blog_id, title, url, published) VALUES (?, ?, ?, ?)",
+            [
+                (blog_id, "Original", "https://a.com/p", "2024-01-01"),
+                (blog_id, "Syndicated", "http://a.com/p/?utm_source=rss", "2024-01-01"),
+                (blog_id, "Other", "https://a.com/q", "2024-01-02"),
+            ],
+        )
+        conn.commit()
+
+        init_db(conn)
+        titles = [r["title"] for r in conn.execute("SELECT title FROM posts ORDER BY id")]
+        assert titles == ["Original", "Other"]
+        assert get_corpus_summary(conn)["posts"] == 2
+    finally:
+        conn.close()
+        os.unlink(path)
+
+
+def _seed_long_posts(conn, count=5):
+    init_db(conn)
+    upsert_blogs(conn, [
+        {"name": "Blog A", "feed_url": "https://a.com/feed", "site_url": "https://a.com"},
+        {"name": "Blog B", "feed_url": "https://b.com/feed", "site_url": "https://b.com"},
+    ])
+    blog_id = conn.execute("SELECT id FROM blogs WHERE name = 'Blog A'").fetchone()[0]
+    for i in range(count):
+        insert_post(conn, blog_id, {
+            "title": f"P{i}",
+            "description": f'<p>See <a href="https://b.com/{i}">B</a>. ' + "Long body text. " * 40,
+            "url": f"https://a.com/{i}",
+        })
+    insert_post(conn, blog_id, {"title": "Short", "description": "tiny", "url": "https://a.com/s"})
+    return blog_id
+
+
+def test_compress_posts_is_transparent_to_readers():
+    conn, path = _temp_db()
+    try:
+        blog_id = _seed_long_posts(conn)
+        before = {r["url"]: r["description"] for r in get_all_posts(conn)}
+        conn.execute("INSERT INTO citations (source_post_id, target_url) VALUES (1, 'x')")
+        conn.commit()
+        version = get_meta(conn, "content_version")
+
+        assert compress_posts(conn) == 5
+        stored = conn.execute(
+            "SELECT typeof(description) FROM posts WHERE url = 'https://a.com/0'"
+        ).fetchone()[0]
+        assert stored == "blob"
+        assert {r["url"]: r["description"] for r in get_all_posts(conn)} == before
+
+        # Re-encoding is not an edit: citations and the corpus version survive
+        assert conn.execute("SELECT COUNT(*) FROM citations").fetchone()[0] == 1
+        assert get_meta(conn, "content_version") == version
+
+        # New posts are compressed on insert once compression is enabled
+        insert_post(conn, blog_id, {
+            "title": "New", "description": "Fresh long text. " * 40, "url": "https://a.com/new",
+        })
+        row = conn.execute(
+            "SELECT typeof(description) FROM posts WHERE url = 'https://a.com/new'"
+        ).fetchone()
+        assert row[0] == "blob"
+        assert get_posts_since(conn, 0)[-1]["description"] == "Fresh long text. " * 40
+    finally:
+        conn.close()
+        os.unlink(path)
+
+
+def test_decompress_posts_restores_text():
+    conn, path = _temp_db()
+    try:
+        _seed_long_posts(conn)
+        before = sorted(r["description"] for r in get_all_posts(conn))
+        compress_posts(conn)
+        assert decompress_posts(conn) == 5
+        assert get_meta(conn, "compression_dict") is None
+        raw = sorted(r[0] for r in conn.execute("SELECT description FROM posts"))
+        assert raw == before
+    finally:
+        conn.close()
+        os.unlink(path)
+
+
+def test_post_updates_work_without_app_functions():
+    conn, path = _temp_db()
+    try:
+        _seed_long_posts(conn)
+        compress_posts(conn)
+        conn.execute("INSERT INTO citations (source_post_id, target_url) VALUES (1, 'x')")
+        conn.commit()
+        version = int(get_meta(conn, "content_version"))
+    finally:
+        conn.close()
+
+    # A connection without register_functions(), e.g. the sqlite3 shell
+    plain = sqlite3.connect(path)
+    try:
+        plain.execute("UPDATE posts SET description = 'edited' WHERE id = 1")
+        plain.commit()
+        assert plain.execute("SELECT COUNT(*) FROM citations").fetchone()[0] == 0
+        assert int(get_meta(plain, "content_version")) == version + 1
+    finally:
+        plain.close()
+        os.unlink(path)
+
+
+def _seed_archive_db(db_path):
+    conn = get_connection(db_path)
+    init_db(conn)
+    upsert_blogs(conn, [
+        {"name": "Blog A", "feed_url": "https://a.com/feed", "site_url": "https://a.com"},
+        {"name": "Blog B", "feed_url": "https://b.com/feed", "site_url": "https://b.com"},
+    ])
+    a, b = [r["id"] for r in conn.execute("SELECT id FROM blogs ORDER BY id")]
+    recent = (date.today() - timedelta(days=10)).isoformat()
+    posts = [
+        (a, "https://a.com/old1", "2015-03-01T10:00:00", '<a href="https://b.com/x">B</a>'),
+        (b, "https://b.com/old2", "2016-07-01", "old"),
+        (a, "https://a.com/new", recent, '<a href="https://b.com/y">B</a>'),
+        (b, "https://b.com/undated", "", "no date"),
+        (b, "https://b.com/old3", "2015-12-31", "old again"),
+    ]
+    for blog_id, url, published, description in posts:
+        insert_post(conn, blog_id, {
+            "title": url, "description": description, "url": url, "published": published,
+        })
+    return conn
+
+
+def test_archive_posts_is_transparent_to_readers():
+    from hn_intel.network import extract_citations
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = _seed_archive_db(os.path.join(tmpdir, "hot.db"))
+        try:
+            extract_citations(conn)
+            before_posts = [dict(r) for r in get_all_posts(conn)]
+            before_edges = sorted(get_citation_edges(conn))
+            before_summary = get_corpus_summary(conn)
+
+            moved = archive_posts(conn, horizon_days=365)
+            assert moved == {"2015": 2, "2016": 1}
+            assert sorted(os.listdir(os.path.join(tmpdir, "archive"))) == [
+                "posts_2015.db", "posts_2016.db",
+            ]
+            assert conn.execute("SELECT COUNT(*) FROM main.posts").fetchone()[0] == 2
+
+            assert [dict(r) for r in get_all_posts(conn)] == before_posts
+            assert sorted(get_citation_edges(conn)) == before_edges
+            assert get_corpus_summary(conn) == before_summary
+        finally:
+            conn.close()
+
+        # A fresh connection attaches the archives on demand
+        conn = get_connection(os.path.join(tmpdir, "hot.db"))
+        try:
+            assert [dict(r) for r in get_all_posts(conn)] == before_posts
+        finally:
+            conn.close()
+
+
+def test_archive_recent_window_skips_archives():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = _seed_archive_db(os.path.join(tmpdir, "hot.db"))
+        try:
+            archive_posts(conn, horizon_days=365)
+            conn.close()
+            conn = get_connection(os.path.join(tmpdir, "hot.db"))
+
+            since = (date.today() - timedelta(days=30)).isoformat()
+            urls = {r["url"] for r in get_all_posts(conn, since=since)}
+            assert urls == {"https://a.com/new", "https://b.com/undated"}
+            attached = {r[1] for r in conn.execute("PRAGMA database_list")}
+            assert attached == {"main"}
+
+            # A window reaching into 2016 attaches only that year
+            urls = {r["url"] for r in get_all_posts(conn, since="2016-01-01")}
+            assert "https://b.com/old2" in urls
+            assert "https://a.com/old1" not in urls
+            assert attach_archives(conn, since="2016-01-01") == ["archive_2016"]
+        finally:
+            conn.close()
+
+
+def test_archive_rolls_up_years_beyond_attach_limit():
+    from hn_intel.network import extract_citations
+    from hn_intel.tokens import iter_post_tokens
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "hot.db")
+        conn = _seed_archive_db(db_path)
+        try:
+            a = conn.execute("SELECT id FROM blogs WHERE name = 'Blog A'").fetchone()[0]
+            for year in range(2000, 2015):
+                insert_post(conn, a, {
+                    "title": f"post {year}", "url": f"https://a.com/{year}",
+                    "published": f"{year}-06-01",
+                    "description": '<a href="https://b.com/z">B</a>',
+                })
+            extract_citations(conn)
+            before_posts = [dict(r) for r in get_all_posts(conn)]
+            before_edges = sorted(get_citation_edges(conn))
+
+            moved = archive_posts(conn, horizon_days=365)
+            assert len(moved) == 17
+            names = sorted(os.listdir(os.path.join(tmpdir, "archive")))
+            assert len(names) == MAX_ARCHIVE_FILES
+            assert names[0] == "posts_2000-2009.db"
+
+            assert [dict(r) for r in get_all_posts(conn)] == before_posts
+            assert sorted(get_citation_edges(conn)) == before_edges
+            assert attach_archives(conn, since="2009-01-01")[0] == "archive_2000_2009"
+            assert len(list(iter_post_tokens(conn))) == 1
+
+            # A late post from a rolled-up year joins the range file
+            insert_post(conn, a, {
+                "title": "late", "url": "https://a.com/late", "published": "2003-01-01",
+            })
+            conn.commit()
+            assert archive_posts(conn, horizon_days=365) == {"2003": 1}
+            assert sorted(os.listdir(os.path.join(tmpdir, "archive"))) == names
+            assert len(get_all_posts(conn)) == len(before_posts) + 1
+        finally:
+            conn.close()
+
+        with ReadPool(db_path, size=1) as pool:
+            assert pool.run(lambda c: len(get_all_posts(c))) == len(before_posts) + 1
+
+
+def test_archived_posts_are_not_refetched():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = _seed_archive_db(os.path.join(tmpdir, "hot.db"))
+        try:
+            archive_posts(conn, horizon_days=365)
+            blog_id = conn.execute("SELECT id FROM blogs WHERE name = 'Blog A'").fetchone()[0]
+            assert insert_post(conn, blog_id, {
+                "title": "again", "url": "http://a.com/old1/", "published": "2015-03-01",
+            }) is False
+        finally:
+            conn.close()
@@ -441,6 +441,41 @@ def test_generate_ideas_empty_db():
     conn.close()
 
 
+def test_generate_ideas_reuses_keyword_model(monkeypatch):
+    from hn_intel.analyzer import KeywordModel
+
+    conn = _mem_db()
+    _seed_pain_posts(conn)
+    expected = generate_ideas(conn, top_n=10)
+
+    model = KeywordModel.fit(conn)
+
+    def refit(*args, **kwargs):
+        raise AssertionError("model was refitted")
+
+    monkeypatch.setattr(KeywordModel, "fit", refit)
+    assert generate_ideas(conn, top_n=10, model=model) == expected
+    conn.close()
+
+
+def test_generate_ideas_centrality_backend(monkeypatch):
+    from hn_intel.cache import load_artifact
+    from hn_intel import network
+
+    conn = _mem_db()
+    _seed_pain_posts(conn)
+    generate_ideas(conn, top_n=10, use_cache=True, centrality_backend="sparse")
+    assert load_artifact(conn, "network", {"backend": "sparse"}) is not None
+    assert load_artifact(conn, "network", {}) is None
+
+    def recompute(*args, **kwargs):
+        raise AssertionError("centrality was recomputed")
+
+    monkeypatch.setattr(network, "compute_network", recompute)
+    assert generate_ideas(conn, top_n=10, centrality={}) is not None
+    conn.close()
+
+
 def test_generate_ideas_end_to_end():
     conn = _mem_db()
     _seed_pain_posts(conn)
@@ -0,0 +1,85 @@
+"""Tests for memory-mapped TF-IDF matrix storage."""
+
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+
+from hn_intel.analyzer import KeywordModel, compute_trends
+from hn_intel.clusters import cluster_blogs, compute_blog_vectors
+from hn_intel.db import init_db, insert_post
+from hn_intel.matrices import (
+    load_or_compute_blog_vectors,
+    load_or_fit_keyword_model,
+    open_matrix,
+    save_matrix,
+)
+
+def _mem_db():
+    """Create an in-memory SQLite database with schema initialized."""
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys=ON")
+    init_db(conn)
+    return conn
+
+
+def _row_sums(directory):
+    """Open a stored matrix in a worker process and sum its rows."""
+    return open_matrix(directory, "m").matrix.sum(axis=1).A1.tolist()
+
+
+def test_save_and_open_matrix_zero_copy(tmp_path):
+    matrix = sp.random(50, 20, density=0.2, format="csr", random_state=0)
+    vocabulary = [f"term{i}" for i in range(20)]
+    save_matrix(tmp_path, "m", matrix, vocabulary, rows={"ids": np.arange(50)},
+                version="1.1.0", params={"max_features": 20})
+
+    stored = open_matrix(tmp_path, "m", version="1.1.0", params={"max_features": 20})
+    base = stored.matrix.data
+    while not isinstance(base, np.memmap) and base.base is not None:
+        base = base.base
+    assert isinstance(base, np.memmap)
+    assert not stored.matrix.data.flags.writeable
+    assert (stored.matrix != matrix).nnz == 0
+    assert list(stored.get_feature_names_out()) == vocabulary
+    assert stored.rows["ids"] == list(range(50))
+
+    assert open_matrix(tmp_path, "m", version="2.1.0") is None
+    assert open_matrix(tmp_path, "m", params={"max_features": 10}) is None
+    assert open_matrix(tmp_path, "missing") is None
+
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        sums = pool.submit(_row_sums, str(tmp_path)).result()
+    assert np.allclose(sums, matrix.sum(axis=1).A1)
+
+
+def test_keyword_model_and_blog_vectors_are_reused_until_corpus_changes(tmp_path, seed_posts):
+    conn = _mem_db()
+    ids = seed_posts(conn, blogs=("Alpha", "Beta", "Gamma"))
+    fitted = KeywordModel.fit(conn, max_features=50)
+
+    assert load_or_fit_keyword_model(conn, tmp_path, max_features=50).vectorizer is not None
+    opened = load_or_fit_keyword_model(conn, tmp_path, max_features=50)
+    assert opened.vectorizer is None
+    assert opened.post_ids == fitted.post_ids
+    assert list(opened.feature_names) == list(fitted.feature_names)
+    assert compute_trends(model=opened) == compute_trends(model=fitted)
+
+    vectors, names, vectorizer = compute_blog_vectors(conn)
+    load_or_compute_blog_vectors(conn, tmp_path)
+    stored_vectors, stored_names, stored = load_or_compute_blog_vectors(conn, tmp_path)
+    assert stored_names == names
+    assert (stored_vectors != vectors).nnz == 0
+    assert (cluster_blogs(stored_vectors, stored_names, stored, n_clusters=2)
+            == cluster_blogs(vectors, names, vectorizer, n_clusters=2))
+
+    insert_post(conn, ids["Beta Blog"], {
+        "title": "Rust machine learning", "description": "Machine learning in rust.",
+        "url": "https://beta.com/rust-ml", "published": "2024-06-01",
+    })
+    conn.commit()
+    refitted = load_or_fit_keyword_model(conn, tmp_path, max_features=50)
+    assert refitted.vectorizer is not None
+    assert len(refitted.post_ids) == 13
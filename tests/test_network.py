@@ -8,7 +8,10 @@ from hn_intel.db import init_db, upsert_blogs, insert_post
 from hn_intel.network import (
     extract_citations,
     build_citation_graph,
+    build_citation_matrix,
     compute_centrality,
+    compute_centrality_sparse,
+    pagerank,
     _normalize_domain,
     _domain_from_url,
 )
@@ -231,6 +234,104 @@ def test_extract_citations_shared_platform():
         os.unlink(path)
 
 
+def test_extract_citations_is_idempotent():
+    conn, path = _temp_db()
+    try:
+        _setup_blogs_and_posts(conn)
+        assert extract_citations(conn) == 3
+        assert extract_citations(conn) == 0
+        assert extract_citations(conn, full=True) == 3
+        total = conn.execute("SELECT COUNT(*) FROM citations").fetchone()[0]
+        assert total == 3
+    finally:
+        conn.close()
+        os.unlink(path)
+
+
+def test_extract_citations_only_scans_new_posts():
+    conn, path = _temp_db()
+    try:
+        blog_a, blog_b, blog_c = _setup_blogs_and_posts(conn)
+        extract_citations(conn)
+
+        insert_post(conn, blog_c, {
+            "title": "Second post from C",
+            "description": '<a href="https://a.com/x">A</a> <a href="https://a.com/x">again</a>',
+            "url": "https://c.com/post-2",
+            "published": "2024-01-04",
+            "author": "Author C",
+        })
+        # Duplicate link within one post is stored once
+        assert extract_citations(conn) == 1
+
+        # Editing a post's description rescans it
+        conn.execute(
+            "UPDATE posts SET description = ? WHERE url = ?",
+            ('<a href="https://a.com/self">me</a>', "https://a.com/post-1"),
+        )
+        conn.commit()
+        assert extract_citations(conn) == 0
+        remaining = conn.execute(
+            "SELECT COUNT(*) FROM citations WHERE source_blog_id = ?", (blog_a,)
+        ).fetchone()[0]
+        assert remaining == 0
+    finally:
+        conn.close()
+        os.unlink(path)
+
+
+def test_extract_citations_scans_post_reusing_deleted_id():
+    conn, path = _temp_db()
+    try:
+        blog_a, blog_b, blog_c = _setup_blogs_and_posts(conn)
+        extract_citations(conn)
+        newest = conn.execute("SELECT MAX(id) FROM posts").fetchone()[0]
+        conn.execute("DELETE FROM posts WHERE id = ?", (newest,))
+        conn.commit()
+
+        insert_post(conn, blog_c, {
+            "title": "Replacement",
+            "description": '<a href="https://b.com/z">B</a>',
+            "url": "https://c.com/replacement",
+            "published": "2024-01-05",
+        })
+        reused = conn.execute(
+            "SELECT id FROM posts WHERE url = 'https://c.com/replacement'"
+        ).fetchone()[0]
+        assert reused == newest
+        assert extract_citations(conn) == 1
+        assert conn.execute(
+            "SELECT COUNT(*) FROM citations WHERE source_post_id = ?", (reused,)
+        ).fetchone()[0] == 1
+    finally:
+        conn.close()
+        os.unlink(path)
+
+
+def test_extract_citations_rebuilds_when_blogs_change():
+    conn, path = _temp_db()
+    try:
+        _setup_blogs_and_posts(conn)
+        extract_citations(conn)
+        insert_post(conn, conn.execute("SELECT id FROM blogs WHERE name='Blog C'").fetchone()[0], {
+            "title": "Links to D",
+            "description": '<a href="https://d.com/post">D</a>',
+            "url": "https://c.com/post-3",
+            "published": "2024-01-05",
+            "author": "Author C",
+        })
+        assert extract_citations(conn) == 0
+
+        upsert_blogs(conn, [
+            {"name": "Blog D", "feed_url": "https://d.com/feed", "site_url": "https://d.com"},
+        ])
+        # New blog domain: earlier posts are rescanned and the link now matches
+        assert extract_citations(conn) == 4
+    finally:
+        conn.close()
+        os.unlink(path)
+
+
 def test_build_citation_graph():
     conn, path = _temp_db()
     try:
@@ -302,6 +403,52 @@ def test_compute_centrality():
         os.unlink(path)
 
 
+def test_compute_centrality_sparse_matches_networkx():
+    conn, path = _temp_db()
+    try:
+        _setup_blogs_and_posts(conn)
+        extract_citations(conn)
+        expected = compute_centrality(build_citation_graph(conn))
+        matrix = build_citation_matrix(conn)
+        assert (matrix.number_of_nodes(), matrix.number_of_edges()) == (3, 3)
+
+        centrality = compute_centrality_sparse(matrix)
+        assert set(centrality) == set(expected)
+        for name, metrics in expected.items():
+            assert centrality[name]["in_degree"] == metrics["in_degree"]
+            assert centrality[name]["out_degree"] == metrics["out_degree"]
+            assert abs(centrality[name]["pagerank"] - metrics["pagerank"]) < 1e-12
+            assert abs(centrality[name]["betweenness"] - metrics["betweenness"]) < 1e-12
+
+        warm = compute_centrality_sparse(matrix, previous=centrality, betweenness_samples=0)
+        for name, metrics in centrality.items():
+            assert abs(warm[name]["pagerank"] - metrics["pagerank"]) < 1e-6
+            assert warm[name]["betweenness"] == 0.0
+    finally:
+        conn.close()
+        os.unlink(path)
+
+
+def test_pagerank_warm_start_converges_faster():
+    import networkx as nx
+    import scipy.sparse as sp
+
+    graph = nx.gnp_random_graph(200, 0.03, seed=1, directed=True)
+    adjacency = sp.csr_matrix(nx.to_scipy_sparse_array(graph, nodelist=range(200)))
+    ranks, cold = pagerank(adjacency)
+    expected = nx.pagerank(graph)
+    assert max(abs(ranks[i] - expected[i]) for i in range(200)) < 1e-12
+
+    changed = adjacency.tolil()
+    changed[0, 1] = 3.0
+    changed = changed.tocsr()
+    warm_ranks, warm = pagerank(changed, start=ranks)
+    cold_ranks, cold_again = pagerank(changed)
+    assert warm < cold_again
+    assert abs(warm_ranks - cold_ranks).sum() < 200 * 1e-6
+    assert pagerank(sp.csr_matrix((0, 0)))[1] == 0
+
+
 def test_compute_centrality_empty_graph():
     """compute_centrality should handle an empty graph."""
     import networkx as nx
@@ -7,8 +7,10 @@ import tempfile
 
 import networkx as nx
 import numpy as np
+import pytest
 from click.testing import CliRunner
 
+from hn_intel.analyzer import TrendCube
 from hn_intel.db import init_db, upsert_blogs, insert_post
 from hn_intel.reports import (
     generate_summary_report,
@@ -196,10 +198,45 @@ def test_trend_report_json_content():
         )
         with open(json_path, encoding="utf-8") as f:
             data = json.load(f)
-        assert "periods" in data
-        assert "emerging_topics" in data
-        assert "2024-01" in data["periods"]
+        assert "format" not in data
+        assert data["periods"] == {
+            period: scores for period, scores in sorted(_sample_trends().items())
+        }
         assert len(data["emerging_topics"]) == 2
+        assert TrendCube.from_json(data) == _sample_trends()
+
+
+def test_trend_report_json_csr_format():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _, json_path = generate_trend_report(
+            _sample_trends(), _sample_emerging(), tmpdir, trends_format="csr",
+        )
+        with open(json_path, encoding="utf-8") as f:
+            data = json.load(f)
+        assert data["format"] == "csr"
+        assert data["periods"] == sorted(_sample_trends())
+        assert len(data["indptr"]) == len(data["periods"]) + 1
+        assert len(data["indices"]) == len(data["scores"]) == data["indptr"][-1]
+        assert TrendCube.from_json(data) == _sample_trends()
+
+        with pytest.raises(ValueError):
+            generate_trend_report(_sample_trends(), [], tmpdir, trends_format="xml")
+
+
+def test_trend_report_leading_blogs():
+    leading = {"rust": [{"blog_name": "Beta Blog", "first_mention": "2024-03-10",
+                         "mention_count": 2}]}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        md_path, json_path = generate_trend_report(
+            _sample_trends(), _sample_emerging(), tmpdir, leading_blogs=leading,
+        )
+        with open(md_path, encoding="utf-8") as f:
+            content = f.read()
+        with open(json_path, encoding="utf-8") as f:
+            data = json.load(f)
+    assert "Leading Blogs" in content
+    assert "Beta Blog (2024-03-10, 2)" in content
+    assert data["leading_blogs"] == leading
 
 
 def test_trend_report_empty():
@@ -374,6 +411,278 @@ def test_cli_report_help():
     assert "period" in result.output
 
 
+def _seed_cli_db():
+    """Seed data/hn_intel.db in the current directory with trendable posts."""
+    from hn_intel.db import get_connection
+
+    conn = get_connection()
+    init_db(conn)
+    ids = _seed_data(conn)
+    topics = ["rust compiler", "python packaging", "database indexing"]
+    for i in range(12):
+        blog = ["Alpha Blog", "Beta Blog", "Gamma Blog"][i % 3]
+        insert_post(conn, ids[blog], {
+            "title": f"Notes on {topics[i % 3]}",
+            "description": f"<p>More about {topics[i % 3]} and {topics[(i + 1) % 3]}.</p>",
+            "url": f"https://example.com/cli/{i}",
+            "published": f"2024-{(i % 6) + 1:02d}-05",
+            "author": "C",
+        })
+    conn.close()
+
+
+def test_cli_analyze_parallel_matches_serial(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _seed_cli_db()
+    runner = CliRunner()
+
+    serial = runner.invoke(main, ["analyze", "--n-clusters", "2"])
+    parallel = runner.invoke(main, ["analyze", "--n-clusters", "2", "--workers", "3"])
+    assert serial.exit_code == 0, serial.output
+    assert parallel.exit_code == 0, parallel.output
+    assert serial.output == parallel.output
+
+
+def test_cli_analyze_from_snapshot_matches_database(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    monkeypatch.chdir(tmp_path)
+    _seed_cli_db()
+    runner = CliRunner()
+
+    exported = runner.invoke(main, ["export", "--output-dir", "snap"])
+    assert exported.exit_code == 0, exported.output
+
+    from_db = runner.invoke(main, ["analyze", "--n-clusters", "2", "--no-cache"])
+    from_snapshot = runner.invoke(
+        main, ["--snapshot", "snap", "analyze", "--n-clusters", "2", "--workers", "3"]
+    )
+    assert from_db.exit_code == 0, from_db.output
+    assert from_snapshot.exit_code == 0, from_snapshot.output
+    assert from_snapshot.output == from_db.output
+
+    refused = runner.invoke(main, ["--snapshot", "snap", "fetch"])
+    assert refused.exit_code != 0
+
+
+def test_cli_analyze_incremental_matches_refit(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _seed_cli_db()
+    runner = CliRunner()
+
+    refit = runner.invoke(main, ["analyze", "--n-clusters", "2"])
+    incremental = runner.invoke(main, ["analyze", "--n-clusters", "2", "--incremental"])
+    fixed = runner.invoke(main, ["analyze", "--n-clusters", "2", "--incremental", "fixed"])
+    assert refit.exit_code == 0, refit.output
+    assert incremental.exit_code == 0, incremental.output
+    assert fixed.exit_code == 0, fixed.output
+    assert incremental.output == refit.output
+
+    conn = sqlite3.connect("data/hn_intel.db")
+    assert conn.execute("SELECT COUNT(*) FROM post_terms").fetchone()[0] == \
+        conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+    assert conn.execute("SELECT value FROM meta WHERE key = 'keyword_vocabulary'").fetchone()
+    conn.close()
+
+
+def test_cli_analyze_fixed_updates_cached_trends(tmp_path, monkeypatch):
+    import hn_intel.analyzer as analyzer
+    from hn_intel.cache import load_artifact
+    from hn_intel.db import get_connection
+    from hn_intel.tfidf import load_keyword_model
+
+    monkeypatch.chdir(tmp_path)
+    _seed_cli_db()
+    runner = CliRunner()
+    args = ["analyze", "--n-clusters", "2", "--incremental", "fixed"]
+    assert runner.invoke(main, args).exit_code == 0
+
+    calls = []
+    update_trends = analyzer.update_trends
+    monkeypatch.setattr(analyzer, "update_trends",
+                        lambda trends, model, period, dates: calls.append(dates)
+                        or update_trends(trends, model, period, dates))
+    conn = get_connection()
+    blog_id = conn.execute("SELECT id FROM blogs").fetchone()[0]
+    insert_post(conn, blog_id, {
+        "title": "Notes on rust compiler", "description": "More rust compiler.",
+        "url": "https://example.com/cli/new", "published": "2024-08-05",
+    })
+    conn.close()
+    result = runner.invoke(main, args)
+    assert result.exit_code == 0, result.output
+    assert calls == [["2024-08-05"]]
+
+    conn = get_connection()
+    params = next(json.loads(row[0]) for row in conn.execute(
+        "SELECT params FROM artifacts WHERE stage = 'trends'"))
+    trends, _ = load_artifact(conn, "trends", params)
+    assert trends == analyzer.compute_trends(model=load_keyword_model(conn, mode="fixed"))
+
+    # An edited post changes the corpus beyond new posts: full recompute
+    conn.execute("UPDATE posts SET title = 'Notes on zig' WHERE url = 'https://example.com/cli/0'")
+    conn.commit()
+    conn.close()
+    assert runner.invoke(main, args).exit_code == 0
+    assert len(calls) == 1
+
+
+def test_cli_analyze_shard_dir_matches_in_memory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _seed_cli_db()
+    runner = CliRunner()
+
+    in_memory = runner.invoke(main, ["analyze", "--n-clusters", "2", "--no-cache"])
+    sharded = runner.invoke(main, ["analyze", "--n-clusters", "2", "--no-cache",
+                                   "--shard-dir", "shards", "--chunk-size", "3"])
+    assert in_memory.exit_code == 0, in_memory.output
+    assert sharded.exit_code == 0, sharded.output
+    assert sharded.output == in_memory.output
+    assert os.path.exists(os.path.join("shards", "manifest.json"))
+
+    both = runner.invoke(main, ["analyze", "--incremental", "--shard-dir", "shards"])
+    assert both.exit_code != 0
+    assert "mutually exclusive" in both.output
+
+
+def test_cli_analyze_matrix_dir_reuses_matrices(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _seed_cli_db()
+    runner = CliRunner()
+
+    plain = runner.invoke(main, ["analyze", "--n-clusters", "2", "--no-cache"])
+    first = runner.invoke(main, ["analyze", "--n-clusters", "2", "--no-cache",
+                                 "--matrix-dir", "matrices"])
+    mtime = os.path.getmtime(os.path.join("matrices", "posts.data.npy"))
+    second = runner.invoke(main, ["analyze", "--n-clusters", "2", "--no-cache",
+                                  "--matrix-dir", "matrices"])
+    assert second.exit_code == 0, second.output
+    assert first.output == plain.output
+    assert second.output == plain.output
+    assert os.path.getmtime(os.path.join("matrices", "posts.data.npy")) == mtime
+    assert os.path.exists(os.path.join("matrices", "blogs.vocab.json"))
+
+    both = runner.invoke(main, ["analyze", "--incremental", "--matrix-dir", "matrices"])
+    assert both.exit_code != 0
+    assert "cannot be combined" in both.output
+
+
+def test_cli_report_sparse_centrality_matches_networkx(tmp_path, monkeypatch):
+    from hn_intel.db import get_connection
+
+    monkeypatch.chdir(tmp_path)
+    _seed_cli_db()
+    runner = CliRunner()
+
+    def add_link(i, source, target):
+        conn = get_connection()
+        blog_id = conn.execute("SELECT id FROM blogs WHERE name = ?", (source,)).fetchone()[0]
+        insert_post(conn, blog_id, {
+            "title": f"Link roundup {i}",
+            "description": f'<a href="https://{target}.com/post">a post</a>',
+            "url": f"https://example.com/links/{i}",
+            "published": "2024-06-20",
+        })
+        conn.close()
+
+    def networks():
+        results = []
+        for backend in ("networkx", "sparse"):
+            result = runner.invoke(main, ["report", "--n-clusters", "2", "--centrality", backend,
+                                          "--output-dir", backend])
+            assert result.exit_code == 0, result.output
+            with open(os.path.join(backend, "network.json"), encoding="utf-8") as f:
+                results.append(json.load(f))
+        return results
+
+    add_link(0, "Alpha Blog", "beta")
+    add_link(1, "Beta Blog", "gamma")
+    # The second sparse run warm-starts from the first one's cached PageRank.
+    for round_ in range(2):
+        expected, actual = networks()
+        assert actual["graph_stats"] == expected["graph_stats"]
+        assert expected["graph_stats"]["edges"] == 2 + round_
+        assert set(actual["centrality"]) == set(expected["centrality"])
+        for name, metrics in expected["centrality"].items():
+            assert actual["centrality"][name] == pytest.approx(metrics, abs=1e-6)
+        if not round_:
+            add_link(2, "Gamma Blog", "alpha")
+
+
+def test_cli_report_sketch(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _seed_cli_db()
+    runner = CliRunner()
+
+    result = runner.invoke(main, ["report", "--n-clusters", "2", "--sketch", "--output-dir", "out"])
+    assert result.exit_code == 0, result.output
+    with open(os.path.join("out", "trends.json"), encoding="utf-8") as f:
+        assert isinstance(json.load(f)["sketch_emerging"], list)
+    with open(os.path.join("out", "trends.md"), encoding="utf-8") as f:
+        assert "## Emerging Terms Beyond the Vocabulary" in f.read()
+
+    conn = sqlite3.connect("data/hn_intel.db")
+    assert conn.execute("SELECT SUM(posts) FROM term_sketches").fetchone()[0] == \
+        conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+    conn.close()
+
+
+def test_cli_report_segment_emerging(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _seed_cli_db()
+    runner = CliRunner()
+
+    outputs = []
+    for _ in range(2):  # the second run loads every stage from the cache
+        result = runner.invoke(main, ["report", "--n-clusters", "2", "--segment-blogs", "1",
+                                      "--output-dir", "out"])
+        assert result.exit_code == 0, result.output
+        with open(os.path.join("out", "trends.json"), encoding="utf-8") as f:
+            outputs.append(json.load(f)["segment_emerging"])
+    assert outputs[0] == outputs[1]
+    assert [s["type"] for s in outputs[0]].count("cluster") == 2
+    assert [s["type"] for s in outputs[0]].count("blog") == 1
+    with open(os.path.join("out", "trends.md"), encoding="utf-8") as f:
+        assert "## Emerging Topics by Segment" in f.read()
+
+
+def test_cli_analyze_period_and_smoothing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _seed_cli_db()
+    runner = CliRunner()
+
+    quarterly = runner.invoke(main, ["analyze", "--n-clusters", "2", "--period", "quarter"])
+    assert quarterly.exit_code == 0, quarterly.output
+    assert "Periods: 2" in quarterly.output
+    smoothed = runner.invoke(main, ["analyze", "--n-clusters", "2", "--period", "day",
+                                    "--smoothing", "ewma:0.3"])
+    assert smoothed.exit_code == 0, smoothed.output
+
+    bad = runner.invoke(main, ["analyze", "--smoothing", "median:3"])
+    assert bad.exit_code != 0
+    assert "rolling:N" in bad.output
+
+
+def test_cli_in_memory_write_back(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _seed_cli_db()
+    runner = CliRunner()
+
+    args = ["analyze", "--n-clusters", "2"]
+    in_memory = runner.invoke(main, ["--in-memory"] + args)
+    assert in_memory.exit_code == 0, in_memory.output
+    on_disk = sqlite3.connect("data/hn_intel.db")
+    assert on_disk.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0] == 0
+
+    saved = runner.invoke(main, ["--in-memory", "--write-back"] + args)
+    assert saved.exit_code == 0, saved.output
+    assert saved.output == in_memory.output
+    assert on_disk.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0] == 3
+    on_disk.close()
+
+    assert runner.invoke(main, ["--write-back", "status"]).exit_code != 0
+    assert runner.invoke(main, ["--in-memory", "fetch"]).exit_code != 0
+
+
 def test_cli_main_group_lists_commands():
     runner = CliRunner()
     result = runner.invoke(main, ["--help"])
@@ -382,3 +691,43 @@ def test_cli_main_group_lists_commands():
     assert "report" in result.output
     assert "fetch" in result.output
     assert "status" in result.output
+
+
+def test_cli_readonly_profile(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _seed_cli_db()
+    runner = CliRunner()
+
+    for command in (["analyze", "--n-clusters", "2"], ["report", "--n-clusters", "2"], ["ideas"]):
+        result = runner.invoke(main, ["--profile", "readonly"] + command)
+        assert result.exit_code == 0, result.output
+
+    monkeypatch.setenv("HN_INTEL_DB_PROFILE", "readonly")
+    for command in (["fetch"], ["db", "clear-cache"], ["analyze", "--sketch"]):
+        result = runner.invoke(main, command)
+        assert result.exit_code == 2
+        assert "readonly" in result.output
+
+
+def test_cli_readonly_profile_needs_current_schema(tmp_path, monkeypatch):
+    import sqlite3
+
+    monkeypatch.chdir(tmp_path)
+    runner = CliRunner()
+
+    missing = runner.invoke(main, ["--profile", "readonly", "status"])
+    assert missing.exit_code == 1
+    assert "writable profile" in missing.output
+
+    # A database from before the latest migration
+    assert runner.invoke(main, ["status"]).exit_code == 0
+    conn = sqlite3.connect(os.path.join("data", "hn_intel.db"))
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    conn.execute(f"PRAGMA user_version={version - 1}")
+    conn.close()
+    old = runner.invoke(main, ["--profile", "readonly", "analyze"])
+    assert old.exit_code == 1
+    assert "older schema" in old.output
+
+    assert runner.invoke(main, ["status"]).exit_code == 0
+    assert runner.invoke(main, ["--profile", "readonly", "status"]).exit_code == 0
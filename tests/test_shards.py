@@ -0,0 +1,61 @@
+"""Tests for out-of-core keyword extraction into CSR shards."""
+
+import sqlite3
+
+import numpy as np
+import pytest
+
+from hn_intel.analyzer import KeywordModel, compute_trends
+from hn_intel.db import init_db
+from hn_intel.shards import KeywordShards, extract_keyword_shards, load_sharded_model
+
+def _mem_db():
+    """Create an in-memory SQLite database with schema initialized."""
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys=ON")
+    init_db(conn)
+    return conn
+
+
+def test_shards_match_in_memory_fit(tmp_path, seed_posts):
+    conn = _mem_db()
+    seed_posts(conn, count=14, undated={13})
+    fitted = KeywordModel.fit(conn, max_features=20)
+
+    shards = extract_keyword_shards(conn, tmp_path, max_features=20, chunk_size=4)
+    assert len(shards) == 4
+    assert shards.n_docs == 14
+    assert list(shards.feature_names) == list(fitted.feature_names)
+    matrix = shards.to_csr()
+    for attr in ("indptr", "indices", "data"):
+        assert np.array_equal(getattr(matrix, attr), getattr(fitted.matrix, attr))
+    assert [pid for _, ids, _ in shards for pid in ids] == fitted.post_ids
+
+    sharded = load_sharded_model(tmp_path)
+    for period, smoothing in [("month", None), ("week", None), ("month", "rolling:2")]:
+        expected = compute_trends(model=fitted, period=period, smoothing=smoothing)
+        trends = compute_trends(model=sharded, period=period, smoothing=smoothing)
+        assert list(trends) == list(expected)
+        assert np.allclose(trends.matrix.toarray(), expected.matrix.toarray())
+
+
+def test_extraction_replaces_old_shards(tmp_path, seed_posts):
+    conn = _mem_db()
+    seed_posts(conn, count=14, undated={13})
+    extract_keyword_shards(conn, tmp_path, chunk_size=2)
+    assert len(list(tmp_path.glob("shard-*.npz"))) == 7
+
+    shards = extract_keyword_shards(conn, tmp_path, chunk_size=10)
+    assert len(list(tmp_path.glob("shard-*.npz"))) == 2
+    assert len(KeywordShards(tmp_path)) == len(shards) == 2
+
+
+def test_empty_corpus_and_missing_shards(tmp_path):
+    conn = _mem_db()
+    model = load_sharded_model(extract_keyword_shards(conn, tmp_path).directory)
+    assert len(model.shards) == 0
+    assert compute_trends(model=model) == {}
+
+    with pytest.raises(FileNotFoundError):
+        KeywordShards(tmp_path / "missing")
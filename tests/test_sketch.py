@@ -0,0 +1,96 @@
+"""Tests for the streaming term sketches."""
+
+import sqlite3
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from hn_intel.db import init_db, insert_post, upsert_blogs
+from hn_intel.sketch import (
+    CountMinSketch,
+    SpaceSaving,
+    load_term_sketches,
+    sketch_emerging_topics,
+    update_term_sketches,
+)
+
+WORDS = ["database", "compiler", "kernel", "browser", "network", "storage", "parser", "runtime"]
+
+
+def _mem_db():
+    """Create an in-memory SQLite database with schema initialized."""
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys=ON")
+    init_db(conn)
+    return conn
+
+
+def _seed_months(conn, months, start=0, new_term_from=None):
+    """Insert 10 posts per month; from new_term_from on, half mention 'zorblax'."""
+    upsert_blogs(conn, [
+        {"name": "Alpha Blog", "feed_url": "https://alpha.com/feed", "site_url": "https://alpha.com"},
+    ])
+    blog_id = conn.execute("SELECT id FROM blogs").fetchone()["id"]
+    for month in range(start, start + months):
+        for i in range(10):
+            words = [WORDS[(month + i + k) % len(WORDS)] for k in range(3)]
+            if new_term_from is not None and month >= new_term_from and i % 2:
+                words.append("zorblax")
+            insert_post(conn, blog_id, {
+                "title": " ".join(words),
+                "description": f"<p>Notes on {words[0]} internals.</p>",
+                "url": f"https://alpha.com/{month}/{i}",
+                "published": f"2024-{month + 1:02d}-{i + 10}",
+            })
+    conn.commit()
+
+
+def test_count_min_never_underestimates_and_space_saving_keeps_heavy_hitters():
+    rng = np.random.default_rng(0)
+    terms = [f"term{i}" for i in range(2000)]
+    true = Counter()
+    cms = CountMinSketch(width=256, depth=4)
+    heavy = SpaceSaving(capacity=20)
+    for _ in range(20):
+        batch = Counter(rng.choice(terms, size=300, p=None).tolist())
+        batch.update({"hot": 50, "warm": 20})
+        true.update(batch)
+        cms.add(list(batch), np.array(list(batch.values())))
+        heavy.update(batch)
+
+    estimates = cms.estimate(terms + ["hot", "warm"])
+    assert (estimates >= np.array([true[t] for t in terms + ["hot", "warm"]])).all()
+    top = heavy.top()
+    assert [term for term, _, _ in top[:2]] == ["hot", "warm"]
+    assert all(count - error <= true[term] <= count for term, count, error in top)
+
+    restored = CountMinSketch.from_bytes(cms.to_bytes(), 256, 4)
+    assert np.array_equal(restored.counts, cms.counts)
+
+
+def test_updates_are_incremental_and_surface_new_terms():
+    conn = _mem_db()
+    _seed_months(conn, 6, new_term_from=4)
+    assert update_term_sketches(conn, width=1024) == 60
+    assert update_term_sketches(conn, width=1024) == 0
+
+    _seed_months(conn, 1, start=6, new_term_from=4)
+    assert update_term_sketches(conn, width=1024) == 10
+    sketches = load_term_sketches(conn)
+    assert [s.period for s in sketches] == [f"2024-{m:02d}" for m in range(1, 8)]
+    assert [s.posts for s in sketches] == [10] * 7
+
+    emerging = sketch_emerging_topics(sketches, window=3)
+    assert emerging[0]["keyword"] == "zorblax"
+    assert emerging[0]["recent_mentions"] == 15
+    assert emerging[0]["acceleration"] > 2.0
+    assert "zorblax" not in {e["keyword"] for e in sketch_emerging_topics(
+        sketches, window=3, exclude=["zorblax"])}
+    assert sketch_emerging_topics(sketches, window=7) == []
+
+    # A different sketch shape recounts everything.
+    assert update_term_sketches(conn, width=512) == 70
+    with pytest.raises(ValueError):
+        update_term_sketches(conn, period="year")
@@ -0,0 +1,119 @@
+"""Tests for columnar snapshot export and import."""
+
+import os
+import sqlite3
+import tempfile
+from datetime import date
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from hn_intel.db import (  # noqa: E402
+    archive_posts,
+    compress_posts,
+    get_all_posts,
+    get_citation_edges,
+    get_connection,
+    init_db,
+    insert_post,
+    upsert_blogs,
+)
+from hn_intel.network import extract_citations  # noqa: E402
+from hn_intel.snapshot import (  # noqa: E402
+    export_snapshot,
+    import_snapshot,
+    open_snapshot,
+    read_table,
+)
+
+
+def _seed(db_path):
+    conn = get_connection(db_path)
+    init_db(conn)
+    upsert_blogs(conn, [
+        {"name": "Blog A", "feed_url": "https://a.com/feed", "site_url": "https://a.com"},
+        {"name": "Blog B", "feed_url": "https://b.com/feed", "site_url": "https://b.com"},
+    ])
+    a, b = [r["id"] for r in conn.execute("SELECT id FROM blogs ORDER BY id")]
+    posts = [
+        (a, "https://a.com/1", "2015-03-01", '<a href="https://b.com/x">B</a> ' + "x" * 300),
+        (b, "https://b.com/2", "2023-07-01", "plain"),
+        (a, "https://a.com/3", "2024-01-15", '<a href="https://b.com/y">B</a>'),
+        (b, "https://b.com/4", "", "undated"),
+    ]
+    for blog_id, url, published, description in posts:
+        insert_post(conn, blog_id, {
+            "title": url, "description": description, "url": url, "published": published,
+        })
+    extract_citations(conn)
+    return conn
+
+
+def _mem_db():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys=ON")
+    init_db(conn)
+    return conn
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_export_import_round_trip(fmt):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = _seed(os.path.join(tmpdir, "hot.db"))
+        compress_posts(conn, min_bytes=100)
+        archive_posts(conn, horizon_days=(date.today() - date(2020, 1, 1)).days)
+        before_posts = [dict(r) for r in get_all_posts(conn)]
+        before_edges = sorted(get_citation_edges(conn))
+
+        counts = export_snapshot(conn, os.path.join(tmpdir, "snap"), fmt=fmt)
+        conn.close()
+        assert counts == {"blogs": 2, "posts": 4, "citations": 2}
+
+        target = _mem_db()
+        assert import_snapshot(target, os.path.join(tmpdir, "snap")) == counts
+        assert [dict(r) for r in get_all_posts(target)] == before_posts
+        assert sorted(get_citation_edges(target)) == before_edges
+        # Imported citations are kept by the next incremental extraction
+        assert extract_citations(target) == 0
+        assert target.execute("SELECT COUNT(*) FROM citations").fetchone()[0] == 2
+
+
+def test_read_table_projection_and_date_window():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = _seed(os.path.join(tmpdir, "hot.db"))
+        export_snapshot(conn, tmpdir)
+        conn.close()
+
+        table = read_table(tmpdir, "posts", columns=["title", "published"],
+                           since="2023-01-01", until="2024-01-01")
+        assert table.column_names == ["title", "published"]
+        assert table.column("title").to_pylist() == ["https://b.com/2"]
+
+
+def test_export_column_projection_and_window():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = _seed(os.path.join(tmpdir, "hot.db"))
+        counts = export_snapshot(conn, tmpdir, columns={"posts": ["title"]}, since="2020-01-01")
+        conn.close()
+
+        assert counts == {"blogs": 2, "posts": 2, "citations": 1}
+        assert read_table(tmpdir, "posts").column_names == ["id", "title"]
+        with pytest.raises(ValueError):
+            export_snapshot(_mem_db(), tmpdir, columns={"posts": ["nope"]})
+
+
+def test_open_snapshot_filters_posts_and_citations():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = _seed(os.path.join(tmpdir, "hot.db"))
+        export_snapshot(conn, tmpdir)
+        conn.close()
+
+        snap = open_snapshot(tmpdir, since="2020-01-01")
+        urls = [r["url"] for r in get_all_posts(snap)]
+        assert urls == ["https://b.com/2", "https://a.com/3"]
+        assert snap.execute("SELECT COUNT(*) FROM citations").fetchone()[0] == 1
+
+        with pytest.raises(FileNotFoundError):
+            open_snapshot(os.path.join(tmpdir, "missing"))
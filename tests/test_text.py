@@ -0,0 +1,46 @@
+"""Tests for the shared HTML-to-text normalizer."""
+
+import hn_intel.text as text_module
+from hn_intel.text import clear_memo, strip_html
+
+
+def test_strip_html_replaces_tags_and_decodes_entities():
+    assert strip_html("<p>Hello <b>world</b></p>") == "Hello  world"
+    assert strip_html("Fish &amp; chips &lt;3") == "Fish & chips <3"
+    assert strip_html(None) == ""
+    assert strip_html("plain text") == "plain text"
+
+
+def test_strip_html_drops_script_style_and_comments():
+    html = (
+        "<p>Intro</p><SCRIPT type='text/javascript'>var tag = '<b>';</Script >"
+        "<style>p { color: red }</style><!-- a > b -->outro"
+    )
+    assert strip_html(html) == "Intro    outro"
+    assert strip_html("<script>unclosed") == "unclosed"
+
+
+def test_strip_html_memo_is_bounded(monkeypatch):
+    clear_memo()
+    monkeypatch.setattr(text_module, "MEMO_CHARS", 1000)
+    texts = [f"<p>{'word ' * 60}{i}</p>" for i in range(10)]
+    first = [strip_html(t) for t in texts]
+    assert [strip_html(t) for t in texts] == first
+    assert 0 < len(text_module._memo) < len(texts)
+    assert text_module._memo_chars <= 1000
+    clear_memo()
+    assert not text_module._memo
+
+
+def test_strip_html_memo_is_keyed_by_content(monkeypatch):
+    clear_memo()
+    calls = []
+    strip = text_module._strip
+    monkeypatch.setattr(text_module, "_strip", lambda t: calls.append(t) or strip(t))
+    text = f"<p>{'word ' * 60}</p>"
+    first = strip_html(text)
+    # An equal string built separately is served from the memo.
+    assert strip_html(text.encode().decode()) == first
+    assert strip_html(text.replace("word", "wort")) != first
+    assert len(calls) == 2
+    clear_memo()
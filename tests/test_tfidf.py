@@ -0,0 +1,102 @@
+"""Tests for the incremental TF-IDF keyword model."""
+
+import sqlite3
+
+import numpy as np
+import pytest
+
+from hn_intel.analyzer import KeywordModel, compute_trends, update_trends
+from hn_intel.db import init_db, insert_post
+from hn_intel.tfidf import freeze_vocabulary, load_keyword_model, update_term_counts
+
+def _mem_db():
+    """Create an in-memory SQLite database with schema initialized."""
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys=ON")
+    init_db(conn)
+    return conn
+
+
+def _dense(model):
+    return model.matrix.toarray()
+
+
+def test_dynamic_model_matches_refit(seed_posts):
+    conn = _mem_db()
+    seed_posts(conn)
+    assert update_term_counts(conn)["added"] == 12
+
+    for max_features in (500, 5):
+        fitted = KeywordModel.fit(conn, max_features=max_features)
+        loaded = load_keyword_model(conn, max_features=max_features)
+        assert list(loaded.feature_names) == list(fitted.feature_names)
+        assert loaded.post_ids == fitted.post_ids
+        assert np.allclose(_dense(loaded), _dense(fitted))
+
+
+def test_counts_follow_added_changed_and_deleted_posts(seed_posts):
+    conn = _mem_db()
+    ids = seed_posts(conn)
+    update_term_counts(conn)
+
+    insert_post(conn, ids["Alpha Blog"], {
+        "title": "Rust kubernetes operators",
+        "description": "Writing kubernetes operators in Rust.",
+        "url": "https://alpha.com/rust-k8s", "published": "2024-06-01",
+    })
+    conn.execute("UPDATE posts SET title = 'Machine learning at scale' "
+                 "WHERE url = 'https://alpha.com/0'")
+    conn.execute("DELETE FROM posts WHERE url = 'https://beta.com/7'")
+    conn.commit()
+
+    result = update_term_counts(conn)
+    assert (result["added"], result["removed"]) == (2, 2)
+    assert result["dates"] == ["2024-01-10", "2024-03-17", "2024-06-01"]
+    assert update_term_counts(conn)["added"] == 0
+
+    fitted = KeywordModel.fit(conn)
+    loaded = load_keyword_model(conn)
+    assert list(loaded.feature_names) == list(fitted.feature_names)
+    assert np.allclose(_dense(loaded), _dense(fitted))
+
+
+def test_fixed_vocabulary_keeps_columns_and_updates_affected_periods(seed_posts):
+    conn = _mem_db()
+    ids = seed_posts(conn)
+    update_term_counts(conn)
+    assert freeze_vocabulary(conn) > 0
+    before = load_keyword_model(conn, mode="fixed")
+    trends = compute_trends(model=before)
+
+    insert_post(conn, ids["Beta Blog"], {
+        "title": "Kubernetes machine learning platforms",
+        "description": "Running machine learning on kubernetes.",
+        "url": "https://beta.com/k8s-ml", "published": "2024-06-03",
+    })
+    conn.commit()
+    dates = update_term_counts(conn)["dates"]
+    after = load_keyword_model(conn, mode="fixed")
+
+    assert list(after.feature_names) == list(before.feature_names)
+    updated = update_trends(trends, after, "month", dates)
+    assert set(updated) == set(trends) | {"2024-06"}
+    assert updated == compute_trends(model=after)
+
+
+def test_hashing_mode_columns_are_stable(seed_posts):
+    conn = _mem_db()
+    seed_posts(conn)
+    update_term_counts(conn)
+    model = load_keyword_model(conn, mode="hashing", n_features=1024)
+
+    assert model.matrix.shape == (12, 1024)
+    names = list(model.feature_names)
+    assert names.count("webassembly") == 1
+    column = names.index("webassembly")
+    again = load_keyword_model(conn, mode="hashing", n_features=1024)
+    assert list(again.feature_names).index("webassembly") == column
+    assert "webassembly" in compute_trends(model=model)["2024-04"]
+
+    with pytest.raises(ValueError):
+        load_keyword_model(conn, mode="nope")
@@ -0,0 +1,140 @@
+"""Tests for the pre-tokenized document store."""
+
+import sqlite3
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, TfidfVectorizer
+
+from hn_intel import tokens
+from hn_intel.db import get_all_posts, init_db, insert_post, upsert_blogs
+from hn_intel.tokens import (
+    TOKEN_PATTERN,
+    TokenAnalyzer,
+    fit_vectorizer,
+    get_post_tokens,
+    post_text,
+    tokenize,
+    tokenize_new_posts,
+)
+
+
+def _mem_db():
+    """Create an in-memory SQLite database with schema initialized."""
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys=ON")
+    init_db(conn)
+    return conn
+
+
+def _seed(conn):
+    upsert_blogs(conn, [
+        {"name": "Alpha Blog", "feed_url": "https://alpha.com/feed", "site_url": "https://alpha.com"},
+    ])
+    blog_id = conn.execute("SELECT id FROM blogs").fetchone()["id"]
+    insert_post(conn, blog_id, {
+        "title": "Rust Compiler Internals",
+        "description": "<p>The borrow checker &amp; the MIR in the Rust compiler.</p>",
+        "url": "https://alpha.com/1",
+    })
+    insert_post(conn, blog_id, {
+        "title": "Python packaging",
+        "description": "Wheels, sdists and the 3rd-party resolver in pip2024.",
+        "url": "https://alpha.com/2",
+    })
+    return blog_id
+
+
+def test_token_analyzer_matches_sklearn_word_analyzer():
+    text = "The Rust compiler's borrow checker is the best borrow checker, 2nd to none in 2024."
+    for stop_words, ngram_range in [(None, (1, 1)), (ENGLISH_STOP_WORDS, (1, 2)),
+                                    (ENGLISH_STOP_WORDS, (2, 3))]:
+        expected = TfidfVectorizer(
+            stop_words=None if stop_words is None else list(stop_words),
+            ngram_range=ngram_range, token_pattern=TOKEN_PATTERN,
+        ).build_analyzer()(text)
+        assert TokenAnalyzer(stop_words, ngram_range)(tokenize(text)) == expected
+
+
+def test_get_post_tokens_tokenizes_each_post_once(monkeypatch):
+    conn = _mem_db()
+    _seed(conn)
+    posts = get_all_posts(conn)
+    first = get_post_tokens(conn, posts)
+    assert first == [tokenize(post_text(p)) for p in posts]
+    assert conn.execute("SELECT COUNT(*) FROM post_tokens").fetchone()[0] == 2
+
+    calls = []
+    monkeypatch.setattr(tokens, "tokenize", lambda text: calls.append(text) or [])
+    assert get_post_tokens(conn, posts) == first
+    assert calls == []
+
+
+def test_post_tokens_dropped_when_post_changes():
+    conn = _mem_db()
+    _seed(conn)
+    assert tokenize_new_posts(conn) == 2
+    assert tokenize_new_posts(conn) == 0
+
+    conn.execute("UPDATE posts SET author = 'someone' WHERE url = 'https://alpha.com/1'")
+    assert conn.execute("SELECT COUNT(*) FROM post_tokens").fetchone()[0] == 2
+
+    conn.execute("UPDATE posts SET title = 'Zig compiler' WHERE url = 'https://alpha.com/1'")
+    conn.execute("DELETE FROM posts WHERE url = 'https://alpha.com/2'")
+    assert conn.execute("SELECT COUNT(*) FROM post_tokens").fetchone()[0] == 0
+
+    tokens_by_title = get_post_tokens(conn, get_all_posts(conn))
+    assert tokens_by_title[0][:2] == ["zig", "compiler"]
+
+
+def test_strip_html_migration_clears_stored_tokens_and_counts():
+    from hn_intel.tfidf import update_term_counts
+
+    conn = _mem_db()
+    _seed(conn)
+    tokenize_new_posts(conn)
+    update_term_counts(conn)
+    counts = conn.execute("SELECT term, df, tf FROM terms ORDER BY term").fetchall()
+
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    conn.execute(f"PRAGMA user_version={version - 1}")
+    init_db(conn)
+    assert conn.execute("SELECT COUNT(*) FROM post_tokens").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM post_terms").fetchone()[0] == 0
+    assert conn.execute("SELECT SUM(df) + SUM(tf) FROM terms").fetchone()[0] == 0
+
+    update_term_counts(conn)
+    assert conn.execute("SELECT term, df, tf FROM terms ORDER BY term").fetchall() == counts
+
+
+def test_get_post_tokens_on_read_only_connection_does_not_store():
+    conn = _mem_db()
+    _seed(conn)
+    conn.execute("PRAGMA query_only=ON")
+    posts = get_all_posts(conn)
+    assert get_post_tokens(conn, posts) == [tokenize(post_text(p)) for p in posts]
+    assert conn.execute("SELECT COUNT(*) FROM post_tokens").fetchone()[0] == 0
+
+
+def test_fit_vectorizer_sharded_matches_serial():
+    words = ["rust", "compiler", "borrow", "checker", "python", "wheels", "kubernetes", "the"]
+    documents = [[words[(i * 7 + j * 3) % len(words)] for j in range(i % 9)] for i in range(40)]
+    for options in [{"max_features": 5, "min_df": 3, "max_df": 0.7}, {"max_features": None}]:
+        def vectorizer():
+            return TfidfVectorizer(analyzer=TokenAnalyzer(ENGLISH_STOP_WORDS, (1, 2)), **options)
+
+        serial_vectorizer = vectorizer()
+        serial = serial_vectorizer.fit_transform(documents)
+        sharded_vectorizer = vectorizer()
+        sharded = fit_vectorizer(sharded_vectorizer, documents, jobs=3)
+
+        assert sharded_vectorizer.vocabulary_ == serial_vectorizer.vocabulary_
+        assert np.array_equal(sharded_vectorizer.idf_, serial_vectorizer.idf_)
+        for attr in ("indptr", "indices", "data"):
+            assert np.array_equal(getattr(sharded, attr), getattr(serial, attr))
+        fresh = documents[:5]
+        assert (sharded_vectorizer.transform(fresh) != serial_vectorizer.transform(fresh)).nnz == 0
+
+    with pytest.raises(ValueError, match="no terms remain"):
+        fit_vectorizer(TfidfVectorizer(analyzer=TokenAnalyzer(), min_df=40), documents, jobs=2)